@@ -1,9 +1,11 @@
 from typing import Generator
 from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
 from ..chat import ChatManager
 from ..chat.database import get_db
+from ..chat.conversation_store import get_conversation_store as create_conversation_store
 from ..vector_store import EmbeddingGenerator, PineconeManager
+from ..document_processing.file_tracker import FileTracker
+from ..document_processing.jobs import JobQueue
 from ..core.config import settings
 from ..core.logging import logger
 
@@ -29,21 +31,73 @@ def get_embedding_generator() -> EmbeddingGenerator:
             detail="Erro ao inicializar sistema de embeddings"
         )
 
+# Fila de jobs de ingestão compartilhada pelas requisições; os documentos são
+# processados pelos workers (ingestion_worker.py), fora do servidor da API
+_job_queue = None
+
+def get_job_queue() -> JobQueue:
+    """Retorna a fila de jobs de ingestão"""
+    global _job_queue
+    if _job_queue is None:
+        try:
+            _job_queue = JobQueue()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar fila de jobs: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="Erro ao inicializar fila de jobs de ingestão"
+            )
+    return _job_queue
+
+# Registro de documentos compartilhado pelas requisições (acesso serializado entre threads)
+_file_tracker = None
+
+def get_file_tracker() -> FileTracker:
+    """Retorna o registro de documentos"""
+    global _file_tracker
+    if _file_tracker is None:
+        try:
+            _file_tracker = FileTracker()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar registro de documentos: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="Erro ao inicializar registro de documentos"
+            )
+    return _file_tracker
+
+# Armazenamento de conversas compartilhado pelas requisições (CONVERSATION_BACKEND)
+_conversation_store = None
+
+def get_conversation_store():
+    """Retorna o armazenamento de conversas"""
+    global _conversation_store
+    if _conversation_store is None:
+        try:
+            _conversation_store = create_conversation_store()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar armazenamento de conversas: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="Erro ao inicializar armazenamento de conversas"
+            )
+    return _conversation_store
+
 def get_chat_manager(
-    db: Session = Depends(get_db),
+    conversation_store = Depends(get_conversation_store),
     pinecone: PineconeManager = Depends(get_pinecone),
     embedding_generator: EmbeddingGenerator = Depends(get_embedding_generator)
 ) -> ChatManager:
-    """Retorna uma instância do ChatManager"""
+    """Retorna uma instância do ChatManager, com o armazenamento de conversas compartilhado"""
     try:
         return ChatManager(
-            db=db,
             pinecone_manager=pinecone,
-            embedding_generator=embedding_generator
+            embedding_generator=embedding_generator,
+            conversation_store=conversation_store
         )
     except Exception as e:
         logger.error(f"Erro ao inicializar ChatManager: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Erro ao inicializar gerenciador de chat"
-        ) 
\ No newline at end of file
+        )
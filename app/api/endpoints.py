@@ -1,27 +1,41 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, File, UploadFile, Query
+from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from pathlib import Path
 import asyncio
+import hashlib
+import re
+import uuid
+import aiofiles
+import aiofiles.os
 
 from .models import (
     ConversationCreate,
     ConversationResponse,
     MessageCreate,
     MessageResponse,
+    MessageSearchResult,
     ConversationStats,
     PeriodStats,
     DateRange,
     DocumentResponse,
-    ProcessingStatus
+    ProcessingStatus,
+    JobStatus
 )
-from .dependencies import get_chat_manager, get_db
+from .dependencies import get_chat_manager, get_db, get_job_queue, get_conversation_store, get_file_tracker
 from ..chat import ChatManager, Conversation, Message
 from ..analytics.conversation_analyzer import ConversationAnalyzer
 from ..document_processing.file_tracker import FileTracker
+from ..document_processing.jobs import JobQueue
+from ..document_processing.pipeline import PRIORITY_INTERACTIVE
+from ..core.config import settings
 from ..core.logging import logger
 
+# Tamanho dos blocos lidos do upload e gravados em disco
+_UPLOAD_BLOCK_SIZE = 1024 * 1024
+
 app = FastAPI(
     title="Sistema Gestor RAG API",
     description="API completa para o Sistema de RAG (Retrieval Augmented Generation)",
@@ -45,7 +59,7 @@ async def create_conversation(
 ):
     """Cria uma nova conversa"""
     try:
-        db_conversation = chat_manager.create_conversation(conversation.title)
+        db_conversation = await chat_manager.acreate_conversation(conversation.title)
         return db_conversation
     except Exception as e:
         logger.error(f"Erro ao criar conversa: {str(e)}")
@@ -69,6 +83,20 @@ async def list_conversations(
         logger.error(f"Erro ao listar conversas: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro ao listar conversas")
 
+@app.get("/conversations/search", response_model=List[MessageSearchResult], tags=["Conversas"])
+async def search_conversations(
+    q: str = Query(..., min_length=1, description="Termos a buscar no conteúdo das mensagens"),
+    user_id: str = Query("default_user", description="Usuário dono das conversas"),
+    limit: int = Query(10, ge=1, le=100, description="Limite de resultados"),
+    store = Depends(get_conversation_store)
+):
+    """Busca mensagens em todas as conversas do usuário, ordenadas por relevância"""
+    try:
+        return await store.asearch_messages(q, user_id, limit)
+    except Exception as e:
+        logger.error(f"Erro ao buscar conversas: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao buscar conversas")
+
 @app.get("/conversations/{conversation_id}", response_model=ConversationResponse)
 async def get_conversation(
     conversation_id: int,
@@ -138,45 +166,122 @@ async def list_messages(
         )
 
 # Rotas de Documentos
+def _safe_filename(filename: Optional[str]) -> str:
+    """Reduz o nome enviado pelo cliente a um nome de arquivo simples e suportado"""
+    name = Path((filename or "").replace("\\", "/")).name
+    name = re.sub(r"[^\w.\- ]", "_", name).strip(" .")
+    if not name or name.startswith("."):
+        raise HTTPException(status_code=400, detail="Nome de arquivo inválido")
+    if Path(name).suffix.lower() not in settings.SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Formato de arquivo não suportado")
+    return name
+
+async def _save_upload(file: UploadFile, filename: str, temp_path: Path):
+    """
+    Grava o upload em blocos no arquivo temporário, calculando os hashes na cópia
+
+    Retorna (hash do conteúdo, ID do arquivo, tamanho), com o mesmo ID gerado pelo
+    FileTracker, sem ler o arquivo novamente.
+    """
+    content_hash = hashlib.sha256()
+    id_hash = hashlib.sha256()
+    size_bytes = 0
+    async with aiofiles.open(temp_path, "wb") as buffer:
+        while block := await file.read(_UPLOAD_BLOCK_SIZE):
+            content_hash.update(block)
+            id_hash.update(block)
+            size_bytes += len(block)
+            await buffer.write(block)
+    id_hash.update(filename.encode())
+    return content_hash.hexdigest(), id_hash.hexdigest()[:12], size_bytes
+
 @app.post("/documents/upload/", response_model=ProcessingStatus, tags=["Documentos"])
 async def upload_document(
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = BackgroundTasks(),
-    chat_manager: ChatManager = Depends(get_chat_manager)
+    job_queue: JobQueue = Depends(get_job_queue),
+    file_tracker: FileTracker = Depends(get_file_tracker)
 ):
     """Upload e processamento de novo documento"""
+    filename = _safe_filename(file.filename)
+    file_path = file_tracker.documents_dir / filename
+    temp_path = file_tracker.documents_dir / f".upload-{uuid.uuid4().hex}.part"
     try:
-        # Salva o arquivo
-        file_path = f"documents/{file.filename}"
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Inicia processamento em background
-        background_tasks.add_task(process_document, file_path, chat_manager)
-        
-        return {"status": "processing", "message": "Documento em processamento"}
+        # Grava o arquivo em blocos, sem carregá-lo inteiro na memória
+        content_hash, file_id, size_bytes = await _save_upload(file, filename, temp_path)
+
+        # Conteúdo já recebido: descarta a cópia sem processá-la novamente
+        existing = await asyncio.to_thread(file_tracker.find_by_content_hash, content_hash)
+        if existing and existing["status"] != "error":
+            await aiofiles.os.remove(temp_path)
+            return {
+                "status": "duplicate",
+                "message": f"Documento idêntico já enviado: {existing['filename']}",
+                "document_id": existing["id"]
+            }
+
+        # Registra o documento antes de movê-lo para o diretório monitorado: o monitor de
+        # arquivos ignora arquivos já registrados com o mesmo conteúdo, e o documento é
+        # ingerido apenas pelo job
+        await asyncio.to_thread(
+            file_tracker.track_document, filename, file_path, size_bytes,
+            file_id=file_id, content_hash=content_hash
+        )
+        # Move o arquivo completo para o destino de forma atômica; os hashes ficam em
+        # cache, e verificações posteriores do arquivo não o leem novamente
+        await aiofiles.os.replace(temp_path, file_path)
+        await asyncio.to_thread(file_tracker.remember_hash, file_path, content_hash, file_id)
+
+        # Cria o job com prioridade interativa, à frente da ingestão em massa; os
+        # workers de ingestão processam o documento e atualizam seu status
+        job_id = await asyncio.to_thread(
+            job_queue.enqueue, str(file_path), document_id=file_id, priority=PRIORITY_INTERACTIVE
+        )
+
+        return {
+            "status": "queued",
+            "message": "Documento na fila de processamento",
+            "document_id": file_id,
+            "job_id": job_id
+        }
     except Exception as e:
         logger.error(f"Erro no upload do documento: {str(e)}")
+        if await aiofiles.os.path.exists(temp_path):
+            await aiofiles.os.remove(temp_path)
         raise HTTPException(status_code=500, detail="Erro no upload do documento")
 
+@app.get("/documents/jobs/{job_id}", response_model=JobStatus, tags=["Documentos"])
+async def get_document_job(
+    job_id: int,
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    """Obtém o status e o andamento de um job de ingestão"""
+    try:
+        job = await asyncio.to_thread(job_queue.get, job_id)
+    except Exception as e:
+        logger.error(f"Erro ao obter job de ingestão: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro ao obter job de ingestão")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
 @app.get("/documents/", response_model=List[DocumentResponse], tags=["Documentos"])
-async def list_documents():
+async def list_documents(file_tracker: FileTracker = Depends(get_file_tracker)):
     """Lista todos os documentos processados"""
     try:
-        file_tracker = FileTracker()
-        documents = file_tracker.get_all_documents()
+        documents = await asyncio.to_thread(file_tracker.get_all_documents)
         return documents
     except Exception as e:
         logger.error(f"Erro ao listar documentos: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro ao listar documentos")
 
 @app.delete("/documents/{document_id}", tags=["Documentos"])
-async def delete_document(document_id: str):
+async def delete_document(
+    document_id: str,
+    file_tracker: FileTracker = Depends(get_file_tracker)
+):
     """Remove um documento do sistema"""
     try:
-        file_tracker = FileTracker()
-        success = file_tracker.remove_document(document_id)
+        success = await asyncio.to_thread(file_tracker.remove_document, document_id)
         if success:
             return {"status": "success", "message": "Documento removido com sucesso"}
         raise HTTPException(status_code=404, detail="Documento não encontrado")
@@ -186,14 +291,18 @@ async def delete_document(document_id: str):
 
 # Rotas de Analytics
 @app.get("/analytics/overview", tags=["Analytics"])
-async def get_system_overview(db: Session = Depends(get_db)):
+async def get_system_overview(
+    db: Session = Depends(get_db),
+    file_tracker: FileTracker = Depends(get_file_tracker)
+):
     """Obtém visão geral do sistema"""
     try:
         analyzer = ConversationAnalyzer(db)
+        documents = await asyncio.to_thread(file_tracker.get_all_documents)
         return {
             "total_conversations": db.query(Conversation).count(),
             "total_messages": db.query(Message).count(),
-            "total_documents": len(FileTracker().get_all_documents()),
+            "total_documents": len(documents),
             "recent_activity": analyzer.get_recent_activity()
         }
     except Exception as e:
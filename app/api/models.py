@@ -33,6 +33,15 @@ class ConversationResponse(ConversationBase):
     class Config:
         from_attributes = True
 
+class MessageSearchResult(BaseModel):
+    conversation_id: str
+    title: Optional[str] = None
+    message_id: str
+    role: str
+    timestamp: datetime
+    snippet: str
+    score: float
+
 class ConversationStats(BaseModel):
     total_messages: int
     average_response_time: float
@@ -67,6 +76,25 @@ class DocumentResponse(BaseModel):
 class ProcessingStatus(BaseModel):
     status: str
     message: str
+    document_id: Optional[str] = None
+    job_id: Optional[int] = None
+
+class JobStatus(BaseModel):
+    id: int
+    file_path: str
+    document_id: Optional[str] = None
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    worker_id: Optional[str] = None
+    progress: Optional[Dict] = None
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 class SystemOverview(BaseModel):
     total_conversations: int
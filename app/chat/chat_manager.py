@@ -8,7 +8,7 @@ from ..core.config import settings
 from ..core.logging import logger
 from ..vector_store.pinecone_store import PineconeManager
 from ..vector_store.embeddings import EmbeddingGenerator
-from .conversation_store import ConversationStore, Conversation
+from .conversation_store import ConversationStore, Conversation, get_conversation_store
 import re
 
 class ChatManager:
@@ -23,7 +23,7 @@ class ChatManager:
     ):
         self.pinecone_manager = pinecone_manager
         self.embedding_generator = embedding_generator
-        self.conversation_store = conversation_store or ConversationStore()
+        self.conversation_store = conversation_store or get_conversation_store()
         self.api_key = api_key or settings.OPENAI_API_KEY
         self.model = model or settings.OPENAI_MODEL
         self.user_id = user_id
@@ -98,6 +98,32 @@ class ChatManager:
         
         return conversation
     
+    async def acreate_conversation(self, title: str = None) -> Conversation:
+        """Cria uma nova conversa sem bloquear o loop de eventos"""
+        metadata = {"title": title or f"Conversa {datetime.now().strftime('%Y-%m-%d %H:%M')}"}
+        
+        conversation = await self.conversation_store.acreate_conversation(
+            user_id=self.user_id,
+            metadata=metadata
+        )
+        await self.conversation_store.aadd_message_to_conversation(
+            conversation_id=conversation.conversation_id,
+            user_id=self.user_id,
+            role="system",
+            content=self.system_template
+        )
+        
+        logger.info(
+            f"Nova conversa criada",
+            extra={
+                "conversation_id": conversation.conversation_id,
+                "user_id": self.user_id,
+                "title": metadata["title"]
+            }
+        )
+        
+        return conversation
+    
     def get_conversation(self, conversation_id: str) -> Optional[Conversation]:
         """Recupera uma conversa pelo ID"""
         return self.conversation_store.get_conversation(
@@ -105,6 +131,13 @@ class ChatManager:
             user_id=self.user_id
         )
     
+    async def aget_conversation(self, conversation_id: str) -> Optional[Conversation]:
+        """Recupera uma conversa pelo ID sem bloquear o loop de eventos"""
+        return await self.conversation_store.aget_conversation(
+            conversation_id=conversation_id,
+            user_id=self.user_id
+        )
+    
     def list_conversations(self, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
         """Lista as conversas do usuário atual"""
         return self.conversation_store.list_conversations(
@@ -113,6 +146,30 @@ class ChatManager:
             offset=offset
         )
     
+    async def alist_conversations(self, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """Lista as conversas do usuário atual sem bloquear o loop de eventos"""
+        return await self.conversation_store.alist_conversations(
+            user_id=self.user_id,
+            limit=limit,
+            offset=offset
+        )
+    
+    def search_conversations(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Busca mensagens nas conversas do usuário atual"""
+        return self.conversation_store.search_messages(
+            query=query,
+            user_id=self.user_id,
+            limit=limit
+        )
+    
+    async def asearch_conversations(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Busca mensagens nas conversas do usuário atual sem bloquear o loop de eventos"""
+        return await self.conversation_store.asearch_messages(
+            query=query,
+            user_id=self.user_id,
+            limit=limit
+        )
+    
     def delete_conversation(self, conversation_id: str) -> bool:
         """Exclui uma conversa"""
         return self.conversation_store.delete_conversation(
@@ -120,6 +177,13 @@ class ChatManager:
             user_id=self.user_id
         )
     
+    async def adelete_conversation(self, conversation_id: str) -> bool:
+        """Exclui uma conversa sem bloquear o loop de eventos"""
+        return await self.conversation_store.adelete_conversation(
+            conversation_id=conversation_id,
+            user_id=self.user_id
+        )
+    
     async def get_context(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """Busca contexto relevante para a query"""
         return await self.pinecone_manager.search(
@@ -128,22 +192,54 @@ class ChatManager:
             top_k=top_k
         )
     
-    def _format_context(self, context_results: List[Dict[str, Any]]) -> str:
-        """Formata os resultados do contexto em um texto"""
+    def _format_context(self, context_results: List[Dict[str, Any]], max_tokens: int = None) -> str:
+        """Formata os resultados do contexto em um texto, respeitando o orçamento de tokens"""
         if not context_results:
             return "Nenhum contexto relevante encontrado."
+        
+        max_tokens = max_tokens or settings.CONTEXT_MAX_TOKENS
+        used_tokens = 0
             
         context_text = "Contexto relevante:\n\n"
         for i, result in enumerate(context_results):
             metadata = result["metadata"]
+            
+            # Usa a contagem de tokens gravada no chunking, sem tokenizar novamente
+            token_count = metadata.get("token_count")
+            if token_count is not None:
+                if i > 0 and used_tokens + token_count > max_tokens:
+                    logger.info(f"Orçamento de contexto atingido: {used_tokens} tokens em {i} trechos")
+                    break
+                used_tokens += token_count
             source = metadata.get("source", "Fonte desconhecida")
             source_name = source.split("/")[-1] if "/" in source else source
             
-            context_text += f"Trecho {i+1} (Fonte: {source_name}):\n"
+            location = source_name
+            if metadata.get("page") is not None:
+                location += f", página {int(metadata['page'])}"
+            if metadata.get("section"):
+                location += f", seção {metadata['section']}"
+            
+            context_text += f"Trecho {i+1} (Fonte: {location}):\n"
             # Aqui adicionamos o texto do chunk ao contexto
             context_text += f"{metadata.get('text', '[Texto não disponível]')}\n\n"
         return context_text
     
+    def _get_sources(self, context_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Lista as fontes dos trechos de contexto, com página e seção quando disponíveis"""
+        sources = []
+        for result in context_results:
+            metadata = result["metadata"]
+            source = metadata.get("source", "Fonte desconhecida")
+            page = metadata.get("page")
+            sources.append({
+                "title": source.split("/")[-1] if "/" in source else source,
+                "page": int(page) if page is not None else None,
+                "section": metadata.get("section"),
+                "score": result.get("score")
+            })
+        return sources
+    
     def _get_conversation_messages(self, conversation: Conversation) -> List:
         """Converte mensagens da conversa para o formato do LangChain"""
         # Converte para formato do LangChain
@@ -356,28 +452,39 @@ class ChatManager:
         content: str,
         context_results: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
-        """Envia uma mensagem e obtém resposta"""
+        """
+        Envia uma mensagem e obtém resposta
+
+        A conversa é lida uma única vez (ou obtida do cache do armazenamento), e as
+        mensagens do usuário e do assistente são gravadas juntas ao fim do turno; em
+        caso de erro, a mensagem do usuário é gravada sozinha. Turnos da mesma
+        conversa são executados um de cada vez, cada um vendo as mensagens do anterior.
+        """
+        async with self.conversation_store.conversation_lock(conversation_id, self.user_id):
+            return await self._send_message(conversation_id, content, context_results)
+    
+    async def _send_message(
+        self,
+        conversation_id: str,
+        content: str,
+        context_results: Optional[List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Executa um turno da conversa (chamado por send_message com o lock da conversa)"""
+        unsaved = False
         try:
             # Recupera a conversa
-            conversation = self.get_conversation(conversation_id)
+            conversation = await self.aget_conversation(conversation_id)
             if not conversation:
                 logger.error(f"Conversa não encontrada: {conversation_id}")
                 raise ValueError(f"Conversa não encontrada: {conversation_id}")
             
-            # Adiciona mensagem do usuário
-            user_message_id = self.conversation_store.add_message_to_conversation(
-                conversation_id=conversation_id,
-                user_id=self.user_id,
-                role="user",
-                content=content
-            )
-            
             # 1. CLASSIFICAÇÃO - Determina o tipo da mensagem
             message_type = await self._classify_message_intent(content, conversation)
             requires_vector_search = message_type == "SISTEMA"
             
-            # Recarrega a conversa com a nova mensagem do usuário
-            conversation = self.get_conversation(conversation_id)
+            # Adiciona mensagem do usuário (gravada junto com a resposta)
+            conversation.add_message("user", content)
+            unsaved = True
             
             # Variáveis para controle do fluxo
             context_relevance = {
@@ -561,30 +668,21 @@ class ChatManager:
                     "doc_id": best_context["metadata"].get("doc_id", ""),
                     "chunk_index": best_context["metadata"].get("chunk_index", 0),
                     "similarity_score": best_context["score"],
-                    "relevance_level": context_relevance["relevance_level"]
+                    "relevance_level": context_relevance["relevance_level"],
+                    "sources": self._get_sources(context_results)
                 })
             
-            # Salva resposta
-            assistant_message_id = self.conversation_store.add_message_to_conversation(
-                conversation_id=conversation_id,
-                user_id=self.user_id,
-                role="assistant",
-                content=response.content,
-                metadata=metadata
-            )
-            
-            # Recarrega a conversa para obter a mensagem completa
-            conversation = self.get_conversation(conversation_id)
-            assistant_message = None
-            for msg in conversation.messages:
-                if msg["id"] == assistant_message_id:
-                    assistant_message = msg
-                    break
+            # Salva as mensagens do usuário e do assistente em uma única gravação
+            conversation.add_message("assistant", response.content, metadata)
+            unsaved = False
+            await self.conversation_store.asave_conversation(conversation)
             
-            return assistant_message or {"role": "assistant", "content": response.content}
+            return conversation.messages[-1]
             
         except Exception as e:
             logger.error(f"Erro ao processar mensagem: {str(e)}")
+            if unsaved:
+                await self.conversation_store.asave_conversation(conversation)
             raise 
 
     async def get_response(self, conversation_id: str, message: str) -> Dict[str, Any]:
@@ -632,4 +730,14 @@ class ChatManager:
             role=role,
             content=content,
             metadata=metadata
-        ) 
\ No newline at end of file
+        )
+    
+    async def aadd_message(self, conversation_id: str, role: str, content: str, metadata: Dict[str, Any] = None) -> str:
+        """Adiciona uma mensagem à conversa sem bloquear o loop de eventos"""
+        return await self.conversation_store.aadd_message_to_conversation(
+            conversation_id=conversation_id,
+            user_id=self.user_id,
+            role=role,
+            content=content,
+            metadata=metadata
+        )
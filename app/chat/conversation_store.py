@@ -1,10 +1,30 @@
 import os
+import re
+import copy
 import json
 import uuid
+import asyncio
+import sqlite3
+import weakref
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from ..core.config import settings
 from ..core.logging import logger
 
+def _new_message(role: str, content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Cria o registro de uma mensagem"""
+    return {
+        "id": str(uuid.uuid4()),
+        "role": role,
+        "content": content,
+        "timestamp": datetime.now().isoformat(),
+        "metadata": metadata or {}
+    }
+
 class Conversation:
     """Representa uma conversa entre o usuário e o sistema"""
     
@@ -18,13 +38,7 @@ class Conversation:
     
     def add_message(self, role: str, content: str, metadata: Dict[str, Any] = None):
         """Adiciona uma mensagem à conversa"""
-        message = {
-            "id": str(uuid.uuid4()),
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat(),
-            "metadata": metadata or {}
-        }
+        message = _new_message(role, content, metadata)
         self.messages.append(message)
         self.updated_at = message["timestamp"]
         return message["id"]
@@ -38,6 +52,15 @@ class Conversation:
             ]
         return self.messages
     
+    def copy(self) -> "Conversation":
+        """Cópia da conversa; alterar a cópia (mensagens ou metadados) não altera a original"""
+        conversation = Conversation(self.conversation_id, self.user_id)
+        conversation.created_at = self.created_at
+        conversation.updated_at = self.updated_at
+        conversation.messages = [dict(message) for message in self.messages]
+        conversation.metadata = copy.deepcopy(self.metadata)
+        return conversation
+    
     def to_dict(self):
         """Converte a conversa para um dicionário"""
         return {
@@ -62,12 +85,175 @@ class Conversation:
         conversation.metadata = data.get("metadata", {})
         return conversation
 
+class AsyncStoreMixin:
+    """
+    Versões assíncronas dos métodos do armazenamento de conversas
 
-class ConversationStore:
-    """Gerencia o armazenamento e recuperação de conversas"""
+    As operações rodam em um executor de threads dedicado à E/S das conversas, sem
+    bloquear o loop de eventos. As operações de uma mesma conversa são executadas na
+    ordem em que foram chamadas (um asyncio.Lock por conversa), e conversas diferentes
+    são lidas e gravadas em paralelo. Sequências de operações que precisam ver o
+    resultado umas das outras (como um turno do chat: leitura, resposta do modelo e
+    gravação) usam conversation_lock.
+    """
+    
+    def _init_async(self, io_workers: int = None):
+        """Cria o executor de E/S (as threads só são iniciadas no primeiro uso)"""
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=io_workers or settings.CONVERSATION_IO_WORKERS,
+            thread_name_prefix="conversation-io"
+        )
+        # Locks por (user_id, conversation_id), descartados quando nenhuma operação os usa
+        self._conversation_locks: "weakref.WeakValueDictionary[Tuple[str, str], asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._turn_locks: "weakref.WeakValueDictionary[Tuple[str, str], asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+    
+    def _close_async(self):
+        """Aguarda as operações pendentes e encerra o executor de E/S"""
+        self._io_executor.shutdown(wait=True)
+    
+    def conversation_lock(self, conversation_id: str, user_id: str = "default_user") -> asyncio.Lock:
+        """
+        Lock de uma sequência de operações na conversa, compartilhado por quem usa este armazenamento
+
+        É independente do lock de cada operação: as operações assíncronas podem ser
+        chamadas enquanto ele é mantido.
+        """
+        key = (user_id, conversation_id)
+        lock = self._turn_locks.get(key)
+        if lock is None:
+            lock = self._turn_locks[key] = asyncio.Lock()
+        return lock
+    
+    async def _run_io(self, key: Optional[Tuple[str, str]], func, *args, **kwargs):
+        """Executa uma operação no executor de E/S, em ordem com as demais da mesma conversa"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        if key is None:
+            return await loop.run_in_executor(self._io_executor, call)
+        
+        lock = self._conversation_locks.get(key)
+        if lock is None:
+            lock = self._conversation_locks[key] = asyncio.Lock()
+        await lock.acquire()
+        try:
+            future = loop.run_in_executor(self._io_executor, call)
+        except BaseException:
+            lock.release()
+            raise
+        # O lock só é liberado quando a operação termina, mesmo que quem a aguarda seja
+        # cancelado: a próxima operação da conversa nunca começa antes da anterior acabar
+        future.add_done_callback(lambda _: lock.release())
+        return await asyncio.shield(future)
+    
+    async def acreate_conversation(self, user_id: str = "default_user", metadata: Dict[str, Any] = None) -> Conversation:
+        """Versão assíncrona de create_conversation"""
+        return await self._run_io(None, self.create_conversation, user_id, metadata)
     
-    def __init__(self, storage_dir: str = "data/conversations"):
+    async def asave_conversation(self, conversation: Conversation) -> bool:
+        """Versão assíncrona de save_conversation"""
+        key = (conversation.user_id, conversation.conversation_id)
+        return await self._run_io(key, self.save_conversation, conversation)
+    
+    async def arewrite_conversation(self, conversation: Conversation) -> bool:
+        """Versão assíncrona de rewrite_conversation"""
+        key = (conversation.user_id, conversation.conversation_id)
+        return await self._run_io(key, self.rewrite_conversation, conversation)
+    
+    async def acompact_conversation(self, conversation_id: str, user_id: str = "default_user") -> bool:
+        """Versão assíncrona de compact_conversation"""
+        return await self._run_io((user_id, conversation_id), self.compact_conversation, conversation_id, user_id)
+    
+    async def aget_conversation(self, conversation_id: str, user_id: str = "default_user") -> Optional[Conversation]:
+        """Versão assíncrona de get_conversation"""
+        return await self._run_io((user_id, conversation_id), self.get_conversation, conversation_id, user_id)
+    
+    async def alist_conversations(self, user_id: str = "default_user", limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """Versão assíncrona de list_conversations"""
+        return await self._run_io(None, self.list_conversations, user_id, limit, offset)
+    
+    async def acount_conversations(self, user_id: str = "default_user") -> int:
+        """Versão assíncrona de count_conversations"""
+        return await self._run_io(None, self.count_conversations, user_id)
+    
+    async def asearch_messages(self, query: str, user_id: str = "default_user", limit: int = 10) -> List[Dict[str, Any]]:
+        """Versão assíncrona de search_messages"""
+        return await self._run_io(None, self.search_messages, query, user_id, limit)
+    
+    async def adelete_conversation(self, conversation_id: str, user_id: str = "default_user") -> bool:
+        """Versão assíncrona de delete_conversation"""
+        return await self._run_io((user_id, conversation_id), self.delete_conversation, conversation_id, user_id)
+    
+    async def aadd_message_to_conversation(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        user_id: str = "default_user",
+        metadata: Dict[str, Any] = None
+    ) -> Optional[str]:
+        """Versão assíncrona de add_message_to_conversation"""
+        return await self._run_io(
+            (user_id, conversation_id),
+            self.add_message_to_conversation,
+            conversation_id, role, content, user_id, metadata
+        )
+
+class ConversationStore(AsyncStoreMixin):
+    """
+    Gerencia o armazenamento e recuperação de conversas
+
+    Cada conversa é um arquivo JSONL: a primeira linha é o cabeçalho (datas e
+    metadados) e cada linha seguinte é um registro acrescentado ao fim do arquivo,
+    uma mensagem ou uma atualização dos metadados. Adicionar uma mensagem grava
+    apenas a sua linha, e a conversa é lida linha a linha. Quando os registros de
+    atualização acumulam mais que compact_after linhas, ou há uma linha incompleta
+    (escrita interrompida), o arquivo é reescrito só com o estado atual (compactação).
+
+    save_conversation acrescenta ao arquivo apenas as mensagens (identificadas pelo
+    id) que ele ainda não tem, sem remover as gravadas por outra chamada ou outro
+    processo; para descartar mensagens (por exemplo, ao limpar a conversa), use
+    rewrite_conversation. Conversas no formato JSON anterior são convertidas na
+    primeira leitura.
+
+    As conversas lidas ou salvas ficam em um cache LRU de até cache_size conversas,
+    com gravação imediata em disco (write-through). Uma entrada vale enquanto o mtime
+    e o tamanho do arquivo forem os da última leitura ou gravação deste armazenamento;
+    alterações feitas por outro processo invalidam a entrada. get_conversation
+    retorna uma cópia da conversa em cache: alterações nela só são vistas pelas
+    demais leituras depois de gravadas com save_conversation.
+
+    Os métodos com prefixo "a" (aget_conversation, aadd_message_to_conversation,
+    asave_conversation etc.) são as versões assíncronas, executadas em um executor
+    de E/S próprio (ver AsyncStoreMixin).
+
+    Cada usuário tem um índice de resumos (SQLite) com datas, número de mensagens,
+    título, metadados e uma prévia da última mensagem de cada conversa, atualizado a
+    cada gravação: listar e contar conversas não abre os arquivos das conversas. O
+    índice é reconstruído a partir dos arquivos se não existir.
+    """
+    
+    def __init__(
+        self,
+        storage_dir: str = "data/conversations",
+        compact_after: int = settings.CONVERSATION_COMPACT_AFTER,
+        cache_size: int = settings.CONVERSATION_CACHE_SIZE
+    ):
         self.storage_dir = storage_dir
+        self.compact_after = compact_after
+        self.cache_size = cache_size
+        # Conversas lidas ou salvas (cópias do estado gravado), com o número de registros
+        # e (mtime, tamanho) do arquivo
+        self._cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        # Serializa a reorganização do cache entre as threads do executor de E/S
+        self._cache_lock = threading.Lock()
+        # Índices de resumos por usuário, com acesso serializado entre threads
+        self._indexes: Dict[str, sqlite3.Connection] = {}
+        self._index_lock = threading.RLock()
+        self._init_async()
         self._ensure_storage_exists()
     
     def _ensure_storage_exists(self):
@@ -85,7 +271,225 @@ class ConversationStore:
     def _get_conversation_path(self, conversation_id: str, user_id: str):
         """Obtém o caminho do arquivo de uma conversa"""
         user_dir = self._get_user_dir(user_id)
-        return os.path.join(user_dir, f"{conversation_id}.json")
+        return os.path.join(user_dir, f"{conversation_id}.jsonl")
+    
+    def _get_legacy_path(self, conversation_id: str, user_id: str):
+        """Obtém o caminho de uma conversa no formato JSON anterior"""
+        return os.path.join(self._get_user_dir(user_id), f"{conversation_id}.json")
+    
+    def _header(self, conversation: Conversation) -> Dict[str, Any]:
+        """Cabeçalho do arquivo da conversa"""
+        return {
+            "type": "conversation",
+            "conversation_id": conversation.conversation_id,
+            "user_id": conversation.user_id,
+            "created_at": conversation.created_at,
+            "updated_at": conversation.updated_at,
+            "metadata": conversation.metadata
+        }
+    
+    def _get_index(self, user_id: str) -> sqlite3.Connection:
+        """Obtém o índice de resumos do usuário, reconstruindo-o na primeira abertura"""
+        with self._index_lock:
+            conn = self._indexes.get(user_id)
+            if conn is not None:
+                return conn
+            
+            conn = sqlite3.connect(
+                os.path.join(self._get_user_dir(user_id), "_index.sqlite"),
+                timeout=30,
+                check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    conversation_id TEXT PRIMARY KEY,
+                    created_at TEXT,
+                    updated_at TEXT,
+                    message_count INTEGER NOT NULL,
+                    title TEXT,
+                    metadata TEXT,
+                    last_message TEXT
+                );
+                CREATE INDEX IF NOT EXISTS ix_summaries_updated_at ON summaries (updated_at);
+            """)
+            self._indexes[user_id] = conn
+            if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+                self._rebuild_index(user_id)
+                with conn:
+                    conn.execute("PRAGMA user_version = 1")
+            return conn
+    
+    def _rebuild_index(self, user_id: str):
+        """Reconstrói o índice de resumos do usuário a partir dos arquivos das conversas"""
+        user_dir = self._get_user_dir(user_id)
+        conversation_ids = {
+            os.path.splitext(file_name)[0] for file_name in os.listdir(user_dir)
+            if file_name.endswith('.jsonl') or file_name.endswith('.json')
+        }
+        # Lê os arquivos diretamente, sem passar pelo cache: a reconstrução roda com o
+        # lock dos índices e não deve preencher o cache nem compactar arquivos
+        for conversation_id in conversation_ids:
+            file_path = os.path.join(user_dir, f"{conversation_id}.jsonl")
+            try:
+                if os.path.exists(file_path):
+                    conversation = self._load(file_path)[0]
+                else:
+                    with open(self._get_legacy_path(conversation_id, user_id), 'r', encoding='utf-8') as f:
+                        conversation = Conversation.from_dict(json.load(f))
+            except Exception as e:
+                logger.error(f"Erro ao ler conversa {conversation_id} para o índice: {str(e)}")
+                continue
+            self._index_conversation(conversation)
+        logger.info(f"Índice de conversas reconstruído para {user_id}: {len(conversation_ids)} conversas")
+    
+    def _preview(self, message: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Prévia da última mensagem (sem metadados, conteúdo truncado), em JSON"""
+        if not message:
+            return None
+        return json.dumps({
+            "id": message.get("id"),
+            "role": message.get("role"),
+            "content": message.get("content", "")[:settings.CONVERSATION_PREVIEW_CHARS],
+            "timestamp": message.get("timestamp")
+        }, ensure_ascii=False)
+    
+    def _index_conversation(self, conversation: Conversation):
+        """Atualiza o resumo da conversa no índice"""
+        with self._index_lock:
+            conn = self._get_index(conversation.user_id)
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO summaries "
+                    "(conversation_id, created_at, updated_at, message_count, title, metadata, last_message) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        conversation.conversation_id,
+                        conversation.created_at,
+                        conversation.updated_at,
+                        len(conversation.messages),
+                        conversation.metadata.get("title"),
+                        json.dumps(conversation.metadata, ensure_ascii=False, default=str),
+                        self._preview(conversation.messages[-1] if conversation.messages else None)
+                    )
+                )
+    
+    def _index_message(self, conversation_id: str, user_id: str, message: Dict[str, Any]) -> bool:
+        """Registra uma mensagem nova no resumo da conversa; retorna False se a conversa não estiver no índice"""
+        with self._index_lock:
+            conn = self._get_index(user_id)
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE summaries SET message_count = message_count + 1, updated_at = ?, "
+                    "last_message = ? WHERE conversation_id = ?",
+                    (message["timestamp"], self._preview(message), conversation_id)
+                )
+            return cursor.rowcount > 0
+    
+    def close(self):
+        """Encerra o executor de E/S e fecha os índices de resumos abertos"""
+        self._close_async()
+        with self._index_lock:
+            for conn in self._indexes.values():
+                conn.close()
+            self._indexes.clear()
+    
+    def _file_version(self, file_path: str) -> Optional[Tuple[int, int]]:
+        """Versão do arquivo da conversa: (mtime_ns, tamanho), ou None se ele não existir"""
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _remember(self, conversation: Conversation, records: int, file_path: str):
+        """Registra no cache uma cópia da conversa gravada e a versão atual do arquivo"""
+        key = (conversation.user_id, conversation.conversation_id)
+        entry = {
+            "conversation": conversation.copy(),
+            "records": records,
+            "version": self._file_version(file_path)
+        }
+        with self._cache_lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def _cached(self, conversation_id: str, user_id: str, file_path: str) -> Optional[Dict[str, Any]]:
+        """Retorna a entrada do cache se o arquivo não mudou desde a última leitura ou gravação"""
+        key = (user_id, conversation_id)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        with self._cache_lock:
+            if entry["version"] != self._file_version(file_path):
+                self._cache.pop(key, None)
+                return None
+            if key in self._cache:
+                self._cache.move_to_end(key)
+        return entry
+    
+    def _write(self, conversation: Conversation):
+        """Reescreve o arquivo da conversa com o estado atual, de forma atômica"""
+        file_path = self._get_conversation_path(conversation.conversation_id, conversation.user_id)
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self._header(conversation), ensure_ascii=False) + "\n")
+            for message in conversation.messages:
+                f.write(json.dumps({"type": "message", "message": message}, ensure_ascii=False) + "\n")
+        os.replace(temp_path, file_path)
+        self._remember(conversation, len(conversation.messages), file_path)
+        self._index_conversation(conversation)
+    
+    def _append(self, file_path: str, records: List[Dict[str, Any]]):
+        """Acrescenta registros ao fim do arquivo da conversa"""
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with open(file_path, 'a+b') as f:
+            # Uma escrita interrompida pode ter deixado a última linha sem quebra de linha
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = "\n" + data
+            f.write(data.encode('utf-8'))
+    
+    def _load(self, file_path: str) -> Tuple[Conversation, int, bool]:
+        """
+        Lê uma conversa linha a linha
+
+        Retorna a conversa, o número de registros após o cabeçalho e se havia linhas
+        inválidas.
+        """
+        records = 0
+        damaged = False
+        with open(file_path, 'r', encoding='utf-8') as f:
+            conversation = Conversation.from_dict(json.loads(f.readline()))
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    damaged = True
+                    continue
+                records += 1
+                if record["type"] == "message":
+                    conversation.messages.append(record["message"])
+                    conversation.updated_at = record["message"]["timestamp"]
+                elif record["type"] == "update":
+                    conversation.updated_at = record["updated_at"]
+                    conversation.metadata = record["metadata"]
+        return conversation, records, damaged
+    
+    def _migrate_legacy(self, conversation_id: str, user_id: str) -> Optional[Conversation]:
+        """Converte uma conversa do formato JSON anterior para JSONL"""
+        legacy_path = self._get_legacy_path(conversation_id, user_id)
+        if not os.path.exists(legacy_path):
+            return None
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            conversation = Conversation.from_dict(json.load(f))
+        self._write(conversation)
+        os.remove(legacy_path)
+        logger.info(f"Conversa convertida para JSONL: {conversation_id}")
+        return conversation
     
     def create_conversation(self, user_id: str = "default_user", metadata: Dict[str, Any] = None) -> Conversation:
         """Cria uma nova conversa"""
@@ -108,84 +512,195 @@ class ConversationStore:
         return conversation
     
     def save_conversation(self, conversation: Conversation) -> bool:
-        """Salva uma conversa no armazenamento"""
+        """
+        Salva uma conversa no armazenamento
+
+        Apenas as mensagens que o arquivo ainda não tem e a atualização dos metadados
+        são acrescentadas; mensagens gravadas por outras chamadas ou por outro processo
+        desde a leitura da conversa são mantidas.
+        """
         try:
             file_path = self._get_conversation_path(
                 conversation.conversation_id, 
                 conversation.user_id
             )
+            if not os.path.exists(file_path) and not self._migrate_legacy(
+                conversation.conversation_id, conversation.user_id
+            ):
+                self._write(conversation)
+                return True
+            
+            entry = self._cached(conversation.conversation_id, conversation.user_id, file_path)
+            if entry:
+                stored, records, damaged = entry["conversation"].copy(), entry["records"], False
+            else:
+                stored, records, damaged = self._load(file_path)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(conversation.to_dict(), f, ensure_ascii=False, indent=2)
+            stored_ids = {message["id"] for message in stored.messages}
+            new_messages = [message for message in conversation.messages if message["id"] not in stored_ids]
+            # Data que a releitura do arquivo obtém das mensagens acrescentadas
+            replayed_at = new_messages[-1]["timestamp"] if new_messages else stored.updated_at
+            appended = [{"type": "message", "message": message} for message in new_messages]
+            stored.messages.extend(new_messages)
+            stored.updated_at = max(stored.updated_at, conversation.updated_at, replayed_at)
+            if stored.updated_at != replayed_at or conversation.metadata != stored.metadata:
+                stored.metadata = copy.deepcopy(conversation.metadata)
+                appended.append({
+                    "type": "update",
+                    "updated_at": stored.updated_at,
+                    "metadata": stored.metadata
+                })
             
+            if appended:
+                self._append(file_path, appended)
+                self._index_conversation(stored)
+            records += len(appended)
+            if damaged or records - len(stored.messages) >= self.compact_after:
+                self._write(stored)
+            else:
+                self._remember(stored, records, file_path)
             return True
         except Exception as e:
             logger.error(f"Erro ao salvar conversa: {str(e)}")
             return False
     
+    def compact_conversation(self, conversation_id: str, user_id: str = "default_user") -> bool:
+        """Reescreve o arquivo da conversa apenas com o estado atual"""
+        conversation = self.get_conversation(conversation_id, user_id)
+        if not conversation:
+            return False
+        self._write(conversation)
+        return True
+    
+    def rewrite_conversation(self, conversation: Conversation) -> bool:
+        """Reescreve o arquivo com as mensagens da conversa, descartando as demais (por exemplo, após limpá-la)"""
+        try:
+            self._write(conversation)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao reescrever conversa: {str(e)}")
+            return False
+    
     def get_conversation(self, conversation_id: str, user_id: str = "default_user") -> Optional[Conversation]:
         """Recupera uma conversa pelo ID"""
         try:
             file_path = self._get_conversation_path(conversation_id, user_id)
+            entry = self._cached(conversation_id, user_id, file_path)
+            if entry:
+                return entry["conversation"].copy()
             
             if not os.path.exists(file_path):
-                logger.warning(f"Conversa não encontrada: {conversation_id}")
-                return None
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+                conversation = self._migrate_legacy(conversation_id, user_id)
+                if conversation is None:
+                    logger.warning(f"Conversa não encontrada: {conversation_id}")
+                return conversation
             
-            return Conversation.from_dict(data)
+            conversation, records, damaged = self._load(file_path)
+            if damaged or records - len(conversation.messages) >= self.compact_after:
+                self._write(conversation)
+            else:
+                self._remember(conversation, records, file_path)
+            return conversation
         except Exception as e:
             logger.error(f"Erro ao recuperar conversa {conversation_id}: {str(e)}")
             return None
     
     def list_conversations(self, user_id: str = "default_user", limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
-        """Lista as conversas de um usuário"""
+        """Lista as conversas de um usuário pelo índice de resumos, da mais recente para a mais antiga"""
         try:
-            user_dir = self._get_user_dir(user_id)
-            
-            # Lista todos os arquivos JSON no diretório do usuário
-            files = [f for f in os.listdir(user_dir) if f.endswith('.json')]
-            
-            # Ordena por data de modificação (mais recente primeiro)
-            files.sort(key=lambda x: os.path.getmtime(os.path.join(user_dir, x)), reverse=True)
+            sql = (
+                "SELECT conversation_id, created_at, updated_at, message_count, metadata, last_message "
+                "FROM summaries ORDER BY updated_at DESC, conversation_id"
+            )
+            params: Tuple = ()
+            if limit > 0:
+                sql += " LIMIT ? OFFSET ?"
+                params = (limit, offset)
             
-            # Aplica paginação
-            paginated_files = files[offset:offset+limit] if limit > 0 else files
+            with self._index_lock:
+                rows = self._get_index(user_id).execute(sql, params).fetchall()
             
-            # Carrega os metadados básicos de cada conversa
-            conversations = []
-            for file_name in paginated_files:
-                conversation_id = file_name.replace('.json', '')
-                conversation = self.get_conversation(conversation_id, user_id)
-                
-                if conversation:
-                    # Inclui apenas os metadados básicos e a última mensagem
-                    conversations.append({
-                        "conversation_id": conversation.conversation_id,
-                        "created_at": conversation.created_at,
-                        "updated_at": conversation.updated_at,
-                        "message_count": len(conversation.messages),
-                        "last_message": conversation.messages[-1] if conversation.messages else None,
-                        "metadata": conversation.metadata
-                    })
-            
-            return conversations
+            return [
+                {
+                    "conversation_id": conversation_id,
+                    "created_at": created_at,
+                    "updated_at": updated_at,
+                    "message_count": message_count,
+                    "last_message": json.loads(last_message) if last_message else None,
+                    "metadata": json.loads(metadata) if metadata else {}
+                }
+                for conversation_id, created_at, updated_at, message_count, metadata, last_message in rows
+            ]
         except Exception as e:
             logger.error(f"Erro ao listar conversas do usuário {user_id}: {str(e)}")
             return []
     
+    def count_conversations(self, user_id: str = "default_user") -> int:
+        """Conta as conversas de um usuário pelo índice de resumos"""
+        try:
+            with self._index_lock:
+                return self._get_index(user_id).execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        except Exception as e:
+            logger.error(f"Erro ao contar conversas do usuário {user_id}: {str(e)}")
+            return 0
+    
+    def search_messages(self, query: str, user_id: str = "default_user", limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Busca mensagens de todas as conversas do usuário que contêm todos os termos
+
+        Lê cada conversa do usuário; os resultados são ordenados pelo número de
+        ocorrências dos termos. Para buscas frequentes ou volumosas, use o backend
+        SQLite (CONVERSATION_BACKEND=sqlite), que tem índice de texto completo.
+        """
+        terms = [term.lower() for term in re.findall(r"\w+", query)]
+        if not terms:
+            return []
+        try:
+            results = []
+            for summary in self.list_conversations(user_id, limit=0):
+                conversation = self.get_conversation(summary["conversation_id"], user_id)
+                if not conversation:
+                    continue
+                for message in conversation.messages:
+                    content = message["content"].lower()
+                    if all(term in content for term in terms):
+                        results.append({
+                            "conversation_id": conversation.conversation_id,
+                            "title": conversation.metadata.get("title"),
+                            "message_id": message["id"],
+                            "role": message["role"],
+                            "timestamp": message["timestamp"],
+                            "snippet": message["content"][:settings.CONVERSATION_PREVIEW_CHARS],
+                            "score": float(sum(content.count(term) for term in terms))
+                        })
+            results.sort(key=lambda result: (result["score"], result["timestamp"]), reverse=True)
+            return results[:limit]
+        except Exception as e:
+            logger.error(f"Erro ao buscar mensagens do usuário {user_id}: {str(e)}")
+            return []
+    
     def delete_conversation(self, conversation_id: str, user_id: str = "default_user") -> bool:
         """Exclui uma conversa"""
         try:
-            file_path = self._get_conversation_path(conversation_id, user_id)
+            paths = [
+                path for path in (
+                    self._get_conversation_path(conversation_id, user_id),
+                    self._get_legacy_path(conversation_id, user_id)
+                )
+                if os.path.exists(path)
+            ]
             
-            if not os.path.exists(file_path):
+            if not paths:
                 logger.warning(f"Conversa não encontrada para exclusão: {conversation_id}")
                 return False
             
-            os.remove(file_path)
+            for path in paths:
+                os.remove(path)
+            self._cache.pop((user_id, conversation_id), None)
+            with self._index_lock:
+                conn = self._get_index(user_id)
+                with conn:
+                    conn.execute("DELETE FROM summaries WHERE conversation_id = ?", (conversation_id,))
             logger.info(f"Conversa excluída: {conversation_id}")
             return True
         except Exception as e:
@@ -200,18 +715,38 @@ class ConversationStore:
         user_id: str = "default_user",
         metadata: Dict[str, Any] = None
     ) -> Optional[str]:
-        """Adiciona uma mensagem a uma conversa existente"""
-        conversation = self.get_conversation(conversation_id, user_id)
-        
-        if not conversation:
-            logger.warning(f"Tentativa de adicionar mensagem a conversa inexistente: {conversation_id}")
+        """Adiciona uma mensagem a uma conversa existente, acrescentando uma linha ao arquivo"""
+        try:
+            file_path = self._get_conversation_path(conversation_id, user_id)
+            entry = self._cached(conversation_id, user_id, file_path)
+            if not entry and not os.path.exists(file_path) and not self._migrate_legacy(conversation_id, user_id):
+                logger.warning(f"Tentativa de adicionar mensagem a conversa inexistente: {conversation_id}")
+                return None
+            
+            message = _new_message(role, content, metadata)
+            self._append(file_path, [{"type": "message", "message": message}])
+            
+            # Mantém a conversa em cache igual ao arquivo
+            if entry:
+                entry["conversation"].messages.append(message)
+                entry["conversation"].updated_at = message["timestamp"]
+                self._remember(entry["conversation"], entry["records"] + 1, file_path)
+            
+            if not self._index_message(conversation_id, user_id, message):
+                conversation = self.get_conversation(conversation_id, user_id)
+                if conversation:
+                    self._index_conversation(conversation)
+            return message["id"]
+        except Exception as e:
+            logger.error(f"Erro ao adicionar mensagem à conversa {conversation_id}: {str(e)}")
             return None
-        
-        # Adiciona a mensagem
-        message_id = conversation.add_message(role, content, metadata)
-        
-        # Salva a conversa atualizada
-        if self.save_conversation(conversation):
-            return message_id
-        
-        return None 
\ No newline at end of file
+
+def get_conversation_store(backend: str = None):
+    """Retorna o armazenamento de conversas configurado (CONVERSATION_BACKEND: jsonl ou sqlite)"""
+    backend = (backend or settings.CONVERSATION_BACKEND).lower()
+    if backend == "sqlite":
+        from .sqlite_conversation_store import SQLiteConversationStore
+        return SQLiteConversationStore()
+    if backend == "jsonl":
+        return ConversationStore()
+    raise ValueError(f"Backend de conversas não suportado: {backend}")
@@ -0,0 +1,373 @@
+import os
+import re
+import json
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from .conversation_store import AsyncStoreMixin, Conversation, _new_message
+from ..core.config import settings
+from ..core.logging import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    conversation_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_conversations_user_updated ON conversations (user_id, updated_at);
+
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY,
+    message_id TEXT NOT NULL UNIQUE,
+    conversation_id TEXT NOT NULL REFERENCES conversations (conversation_id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_messages_conversation_timestamp ON messages (conversation_id, timestamp);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content,
+    content='messages',
+    content_rowid='seq',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, content) VALUES (new.seq, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.seq, old.content);
+END;
+"""
+
+def _fts_query(query: str) -> str:
+    """Converte o texto buscado em uma consulta FTS5 com todos os termos, sem operadores"""
+    return " ".join(f'"{term}"' for term in re.findall(r"\w+", query))
+
+class SQLiteConversationStore(AsyncStoreMixin):
+    """
+    Armazena as conversas em um banco SQLite, com a mesma interface do ConversationStore
+    
+    As mensagens ficam em uma tabela indexada por (conversation_id, timestamp), e um
+    índice FTS5 sobre o conteúdo permite buscar mensagens de todas as conversas do
+    usuário com ordenação por relevância (bm25). O banco usa WAL, e o acesso à conexão
+    é serializado entre threads (incluindo as do executor dos métodos assíncronos).
+    """
+    
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.CONVERSATION_DB_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(_SCHEMA)
+        self._init_async()
+    
+    def close(self):
+        """Encerra o executor de E/S e fecha a conexão com o banco"""
+        self._close_async()
+        with self._lock:
+            self.conn.close()
+    
+    def _insert_messages(self, conversation_id: str, messages: List[Dict[str, Any]]):
+        """Insere mensagens de uma conversa (dentro de uma transação já aberta)"""
+        self.conn.executemany(
+            "INSERT INTO messages (message_id, conversation_id, role, content, timestamp, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    message["id"],
+                    conversation_id,
+                    message["role"],
+                    message["content"],
+                    message["timestamp"],
+                    json.dumps(message.get("metadata", {}), ensure_ascii=False, default=str)
+                )
+                for message in messages
+            ]
+        )
+    
+    def create_conversation(self, user_id: str = "default_user", metadata: Dict[str, Any] = None) -> Conversation:
+        """Cria uma nova conversa"""
+        conversation = Conversation(user_id=user_id)
+        
+        if metadata:
+            conversation.metadata = metadata
+        
+        # Salva a conversa
+        self.save_conversation(conversation)
+        
+        logger.info(
+            f"Nova conversa criada",
+            extra={
+                "conversation_id": conversation.conversation_id,
+                "user_id": user_id
+            }
+        )
+        
+        return conversation
+    
+    def _upsert_header(self, conversation: Conversation) -> bool:
+        """
+        Grava o cabeçalho da conversa (dentro de uma transação já aberta)
+
+        A data de atualização nunca retrocede, e a conversa não é gravada se o ID
+        pertencer a outro usuário.
+        """
+        return self.conn.execute(
+            "INSERT INTO conversations (conversation_id, user_id, created_at, updated_at, message_count, metadata) "
+            "VALUES (?, ?, ?, ?, 0, ?) "
+            "ON CONFLICT (conversation_id) DO UPDATE SET "
+            "updated_at = MAX(conversations.updated_at, excluded.updated_at), metadata = excluded.metadata "
+            "WHERE conversations.user_id = excluded.user_id",
+            (
+                conversation.conversation_id,
+                conversation.user_id,
+                conversation.created_at,
+                conversation.updated_at,
+                json.dumps(conversation.metadata, ensure_ascii=False, default=str)
+            )
+        ).rowcount > 0
+    
+    def _update_message_count(self, conversation_id: str):
+        """Recalcula o número de mensagens da conversa (dentro de uma transação já aberta)"""
+        self.conn.execute(
+            "UPDATE conversations SET message_count = "
+            "(SELECT COUNT(*) FROM messages WHERE conversation_id = ?) WHERE conversation_id = ?",
+            (conversation_id, conversation_id)
+        )
+    
+    def save_conversation(self, conversation: Conversation) -> bool:
+        """
+        Salva uma conversa no armazenamento
+
+        Apenas as mensagens que ainda não estão no banco são inseridas, e o cabeçalho
+        é atualizado. Mensagens gravadas por outra requisição ou processo depois que a
+        conversa foi lida são preservadas; para remover mensagens, use
+        rewrite_conversation.
+        """
+        try:
+            with self._lock, self.conn:
+                if not self._upsert_header(conversation):
+                    logger.error(f"Conversa {conversation.conversation_id} pertence a outro usuário")
+                    return False
+                stored = {
+                    row[0] for row in self.conn.execute(
+                        "SELECT message_id FROM messages WHERE conversation_id = ?",
+                        (conversation.conversation_id,)
+                    )
+                }
+                self._insert_messages(
+                    conversation.conversation_id,
+                    [message for message in conversation.messages if message["id"] not in stored]
+                )
+                self._update_message_count(conversation.conversation_id)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao salvar conversa: {str(e)}")
+            return False
+    
+    def rewrite_conversation(self, conversation: Conversation) -> bool:
+        """Substitui todas as mensagens gravadas pelas da conversa (por exemplo, após limpá-la)"""
+        try:
+            with self._lock, self.conn:
+                if not self._upsert_header(conversation):
+                    logger.error(f"Conversa {conversation.conversation_id} pertence a outro usuário")
+                    return False
+                self.conn.execute(
+                    "DELETE FROM messages WHERE conversation_id = ?", (conversation.conversation_id,)
+                )
+                self._insert_messages(conversation.conversation_id, conversation.messages)
+                self._update_message_count(conversation.conversation_id)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao reescrever conversa: {str(e)}")
+            return False
+    
+    def compact_conversation(self, conversation_id: str, user_id: str = "default_user") -> bool:
+        """Mantido pela compatibilidade com o ConversationStore: o banco não precisa de compactação"""
+        return self.get_conversation(conversation_id, user_id) is not None
+    
+    def get_conversation(self, conversation_id: str, user_id: str = "default_user") -> Optional[Conversation]:
+        """Recupera uma conversa pelo ID"""
+        try:
+            with self._lock:
+                row = self.conn.execute(
+                    "SELECT created_at, updated_at, metadata FROM conversations "
+                    "WHERE conversation_id = ? AND user_id = ?",
+                    (conversation_id, user_id)
+                ).fetchone()
+                if row is None:
+                    logger.warning(f"Conversa não encontrada: {conversation_id}")
+                    return None
+                messages = self.conn.execute(
+                    "SELECT message_id, role, content, timestamp, metadata FROM messages "
+                    "WHERE conversation_id = ? ORDER BY timestamp, seq",
+                    (conversation_id,)
+                ).fetchall()
+            
+            conversation = Conversation(conversation_id=conversation_id, user_id=user_id)
+            conversation.created_at, conversation.updated_at = row[0], row[1]
+            conversation.metadata = json.loads(row[2])
+            conversation.messages = [
+                {
+                    "id": message_id,
+                    "role": role,
+                    "content": content,
+                    "timestamp": timestamp,
+                    "metadata": json.loads(metadata)
+                }
+                for message_id, role, content, timestamp, metadata in messages
+            ]
+            return conversation
+        except Exception as e:
+            logger.error(f"Erro ao recuperar conversa {conversation_id}: {str(e)}")
+            return None
+    
+    def list_conversations(self, user_id: str = "default_user", limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """Lista as conversas de um usuário, da mais recente para a mais antiga"""
+        try:
+            sql = (
+                "SELECT c.conversation_id, c.created_at, c.updated_at, c.message_count, c.metadata, "
+                "m.message_id, m.role, m.content, m.timestamp "
+                "FROM conversations c LEFT JOIN messages m ON m.seq = ("
+                "    SELECT seq FROM messages WHERE conversation_id = c.conversation_id "
+                "    ORDER BY timestamp DESC, seq DESC LIMIT 1"
+                ") "
+                "WHERE c.user_id = ? ORDER BY c.updated_at DESC, c.conversation_id"
+            )
+            params: Tuple = (user_id,)
+            if limit > 0:
+                sql += " LIMIT ? OFFSET ?"
+                params += (limit, offset)
+            
+            with self._lock:
+                rows = self.conn.execute(sql, params).fetchall()
+            
+            return [
+                {
+                    "conversation_id": conversation_id,
+                    "created_at": created_at,
+                    "updated_at": updated_at,
+                    "message_count": message_count,
+                    "last_message": {
+                        "id": message_id,
+                        "role": role,
+                        "content": content[:settings.CONVERSATION_PREVIEW_CHARS],
+                        "timestamp": timestamp
+                    } if message_id else None,
+                    "metadata": json.loads(metadata)
+                }
+                for (
+                    conversation_id, created_at, updated_at, message_count, metadata,
+                    message_id, role, content, timestamp
+                ) in rows
+            ]
+        except Exception as e:
+            logger.error(f"Erro ao listar conversas do usuário {user_id}: {str(e)}")
+            return []
+    
+    def count_conversations(self, user_id: str = "default_user") -> int:
+        """Conta as conversas de um usuário"""
+        try:
+            with self._lock:
+                return self.conn.execute(
+                    "SELECT COUNT(*) FROM conversations WHERE user_id = ?", (user_id,)
+                ).fetchone()[0]
+        except Exception as e:
+            logger.error(f"Erro ao contar conversas do usuário {user_id}: {str(e)}")
+            return 0
+    
+    def search_messages(self, query: str, user_id: str = "default_user", limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Busca mensagens de todas as conversas do usuário que contêm todos os termos
+        
+        Os resultados são ordenados por relevância (bm25) e trazem um trecho da
+        mensagem com os termos encontrados entre colchetes.
+        """
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+        try:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT m.conversation_id, c.metadata, m.message_id, m.role, m.timestamp, "
+                    "snippet(messages_fts, 0, '[', ']', '…', 16), bm25(messages_fts) AS score "
+                    "FROM messages_fts "
+                    "JOIN messages m ON m.seq = messages_fts.rowid "
+                    "JOIN conversations c ON c.conversation_id = m.conversation_id "
+                    "WHERE messages_fts MATCH ? AND c.user_id = ? "
+                    "ORDER BY score LIMIT ?",
+                    (fts_query, user_id, limit)
+                ).fetchall()
+            
+            return [
+                {
+                    "conversation_id": conversation_id,
+                    "title": json.loads(metadata).get("title"),
+                    "message_id": message_id,
+                    "role": role,
+                    "timestamp": timestamp,
+                    "snippet": snippet,
+                    # bm25 é negativo: quanto menor, mais relevante
+                    "score": -score
+                }
+                for conversation_id, metadata, message_id, role, timestamp, snippet, score in rows
+            ]
+        except Exception as e:
+            logger.error(f"Erro ao buscar mensagens do usuário {user_id}: {str(e)}")
+            return []
+    
+    def delete_conversation(self, conversation_id: str, user_id: str = "default_user") -> bool:
+        """Exclui uma conversa e suas mensagens"""
+        try:
+            with self._lock, self.conn:
+                deleted = self.conn.execute(
+                    "DELETE FROM conversations WHERE conversation_id = ? AND user_id = ?",
+                    (conversation_id, user_id)
+                ).rowcount
+            
+            if not deleted:
+                logger.warning(f"Conversa não encontrada para exclusão: {conversation_id}")
+                return False
+            
+            logger.info(f"Conversa excluída: {conversation_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao excluir conversa {conversation_id}: {str(e)}")
+            return False
+    
+    def add_message_to_conversation(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        user_id: str = "default_user",
+        metadata: Dict[str, Any] = None
+    ) -> Optional[str]:
+        """Adiciona uma mensagem a uma conversa existente"""
+        try:
+            message = _new_message(role, content, metadata)
+            with self._lock, self.conn:
+                updated = self.conn.execute(
+                    "UPDATE conversations SET updated_at = ?, message_count = message_count + 1 "
+                    "WHERE conversation_id = ? AND user_id = ?",
+                    (message["timestamp"], conversation_id, user_id)
+                ).rowcount
+                if not updated:
+                    logger.warning(f"Tentativa de adicionar mensagem a conversa inexistente: {conversation_id}")
+                    return None
+                self._insert_messages(conversation_id, [message])
+            return message["id"]
+        except Exception as e:
+            logger.error(f"Erro ao adicionar mensagem à conversa {conversation_id}: {str(e)}")
+            return None
@@ -26,6 +26,55 @@ class Settings(BaseSettings):
     # Configurações de Chunking
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    CHUNKING_MODE: str = os.getenv("CHUNKING_MODE", "characters")  # characters, tokens ou content
+    CHUNK_SIZE_TOKENS: int = int(os.getenv("CHUNK_SIZE_TOKENS", "512"))
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+    
+    # Configurações de Embeddings
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "2048"))
+    EMBEDDING_MAX_TOKENS_PER_REQUEST: int = int(os.getenv("EMBEDDING_MAX_TOKENS_PER_REQUEST", "250000"))
+    INGESTION_BATCH_SIZE: int = int(os.getenv("INGESTION_BATCH_SIZE", "100"))
+    EMBEDDING_DIMENSIONS: int = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+    # Limites e preço usados na estimativa do dry-run
+    EMBEDDING_REQUESTS_PER_MINUTE: int = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "3000"))
+    EMBEDDING_TOKENS_PER_MINUTE: int = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+    EMBEDDING_PRICE_PER_MILLION_TOKENS: float = float(os.getenv("EMBEDDING_PRICE_PER_MILLION_TOKENS", "0.10"))
+    PINECONE_UPSERTS_PER_SECOND: float = float(os.getenv("PINECONE_UPSERTS_PER_SECOND", "20"))
+    CONTEXT_MAX_TOKENS: int = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+    
+    # Configurações de Deduplicação
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.9"))  # 0 desativa
+    DEDUP_ACTION: str = os.getenv("DEDUP_ACTION", "skip")  # skip ou link
+    DEDUP_NUM_PERM: int = int(os.getenv("DEDUP_NUM_PERM", "128"))
+    DEDUP_INDEX_PATH: str = os.getenv("DEDUP_INDEX_PATH", "data/dedup_index.sqlite")
+    
+    # Configurações do Pipeline de Ingestão
+    PIPELINE_EXTRACT_WORKERS: int = int(os.getenv("PIPELINE_EXTRACT_WORKERS", "2"))
+    PIPELINE_CHUNK_WORKERS: int = int(os.getenv("PIPELINE_CHUNK_WORKERS", "1"))
+    PIPELINE_EMBED_WORKERS: int = int(os.getenv("PIPELINE_EMBED_WORKERS", "4"))
+    PIPELINE_UPSERT_WORKERS: int = int(os.getenv("PIPELINE_UPSERT_WORKERS", "2"))
+    PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+    PIPELINE_SLICE_CHUNKS: int = int(os.getenv("PIPELINE_SLICE_CHUNKS", "500"))
+    PIPELINE_REPORT_INTERVAL: int = int(os.getenv("PIPELINE_REPORT_INTERVAL", "30"))  # segundos; 0 desativa
+    CHECKPOINT_DB_PATH: str = os.getenv("CHECKPOINT_DB_PATH", "data/ingestion_checkpoints.sqlite")  # vazio desativa
+    WATCHER_DEBOUNCE_SECONDS: float = float(os.getenv("WATCHER_DEBOUNCE_SECONDS", "2"))
+    WATCHER_SIZE_CHECK_SECONDS: float = float(os.getenv("WATCHER_SIZE_CHECK_SECONDS", "1"))
+    
+    # Configurações da Fila de Jobs de Ingestão
+    JOB_WORKER_CONCURRENCY: int = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+    JOB_HEARTBEAT_SECONDS: float = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+    JOB_STALE_SECONDS: float = float(os.getenv("JOB_STALE_SECONDS", "60"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_DELAY_SECONDS: float = float(os.getenv("JOB_RETRY_DELAY_SECONDS", "30"))
+    
+    # Configurações de Conversas
+    CONVERSATION_BACKEND: str = os.getenv("CONVERSATION_BACKEND", "jsonl")
+    CONVERSATION_DB_PATH: str = os.getenv("CONVERSATION_DB_PATH", "data/conversations.sqlite")
+    CONVERSATION_COMPACT_AFTER: int = int(os.getenv("CONVERSATION_COMPACT_AFTER", "50"))
+    CONVERSATION_CACHE_SIZE: int = int(os.getenv("CONVERSATION_CACHE_SIZE", "256"))
+    CONVERSATION_PREVIEW_CHARS: int = int(os.getenv("CONVERSATION_PREVIEW_CHARS", "200"))
+    CONVERSATION_IO_WORKERS: int = int(os.getenv("CONVERSATION_IO_WORKERS", "4"))
     
     # Configurações de Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -36,6 +85,14 @@ class Settings(BaseSettings):
     # Configurações de Documentos
     DOCUMENTS_DIR: str = os.getenv("DOCUMENTS_DIR", "documents")
     SUPPORTED_EXTENSIONS: set = {".pdf", ".docx", ".txt"}
+    FILE_TRACKER_DB_PATH: str = os.getenv("FILE_TRACKER_DB_PATH", "data/file_tracker.sqlite")
+    PDF_EXTRACTION_WORKERS: int = int(os.getenv("PDF_EXTRACTION_WORKERS", "0"))  # 0 usa todos os núcleos
+    PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+    PDF_EXTRACTOR: str = os.getenv("PDF_EXTRACTOR", "pypdf2")  # pypdf2, pdfminer ou auto
+    DOCX_EXTRACTOR: str = os.getenv("DOCX_EXTRACTOR", "python-docx")  # python-docx, docx2txt ou auto
+    EXTRACTOR_AUTO_THRESHOLD_MB: float = float(os.getenv("EXTRACTOR_AUTO_THRESHOLD_MB", "20"))
+    MAX_DOCUMENT_MEMORY_MB: int = int(os.getenv("MAX_DOCUMENT_MEMORY_MB", "256"))
+    EXTRACTION_CACHE_DIR: str = os.getenv("EXTRACTION_CACHE_DIR", "data/extraction_cache")  # vazio desativa
     
     class Config:
         case_sensitive = True
@@ -1,7 +1,8 @@
 from .extractors import DocumentProcessor
-from .chunking import TextChunker
+from .chunking import TextChunker, TokenChunker, ContentDefinedChunker, get_chunker
+from .pipeline import IngestionPipeline
 from .file_watcher import FileWatcher
 
-__all__ = ['DocumentProcessor', 'TextChunker', 'FileWatcher']
+__all__ = ['DocumentProcessor', 'TextChunker', 'TokenChunker', 'ContentDefinedChunker', 'get_chunker', 'IngestionPipeline', 'FileWatcher']
 
 # Pacote app.document_processing 
\ No newline at end of file
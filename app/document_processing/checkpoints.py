@@ -0,0 +1,109 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from ..core.config import settings
+from ..core.logging import logger
+
+class CheckpointStore:
+    """
+    Checkpoints da ingestão em disco (SQLite): os lotes de chunks já enviados ao índice
+    vetorial, por documento e hash do conteúdo
+
+    Um documento interrompido no meio da ingestão é retomado sem gerar novamente os
+    embeddings dos lotes concluídos. A posição (chunk_index) de cada chunk gravado
+    também é registrada, para que os chunks retomados na mesma posição não tenham o
+    metadata atualizado. Os checkpoints são apagados quando o documento termina e o
+    manifesto é salvo.
+    """
+    def __init__(self, db_path: str = settings.CHECKPOINT_DB_PATH):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Compartilhado entre as threads do pipeline de ingestão, com acesso serializado
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                doc_id TEXT NOT NULL,
+                file_hash TEXT NOT NULL,
+                batch_index INTEGER NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                chunk_indexes TEXT,
+                PRIMARY KEY (doc_id, file_hash, batch_index)
+            );
+        """)
+        # Bancos criados antes do registro das posições
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(checkpoints)")}
+        if "chunk_indexes" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE checkpoints ADD COLUMN chunk_indexes TEXT")
+
+    def get_chunk_ids(self, doc_id: str, file_hash: str) -> Set[str]:
+        """
+        Retorna os IDs dos chunks já armazenados em ingestões interrompidas do documento
+
+        Checkpoints de outra versão do documento também são retornados: os IDs são
+        derivados do conteúdo, então chunks iguais continuam válidos, e os demais são
+        excluídos como obsoletos ao fim da ingestão.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT file_hash, batch_index, chunk_ids FROM checkpoints WHERE doc_id = ?",
+                (doc_id,)
+            ).fetchall()
+
+        chunk_ids = set()
+        batches = 0
+        for row_hash, _, ids in rows:
+            chunk_ids.update(json.loads(ids))
+            batches += row_hash == file_hash
+        if rows:
+            logger.info(
+                f"Retomando ingestão de {doc_id}: {len(chunk_ids)} chunks já armazenados "
+                f"({batches} lotes desta versão, {len(rows) - batches} de versões anteriores)"
+            )
+        return chunk_ids
+
+    def get_chunk_indexes(self, doc_id: str) -> Dict[str, int]:
+        """Retorna a posição (chunk_index) gravada no índice vetorial de cada chunk dos checkpoints"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT chunk_ids, chunk_indexes FROM checkpoints WHERE doc_id = ? AND chunk_indexes IS NOT NULL "
+                "ORDER BY rowid",
+                (doc_id,)
+            ).fetchall()
+        indexes = {}
+        for ids, positions in rows:
+            indexes.update(zip(json.loads(ids), json.loads(positions)))
+        return indexes
+
+    def record(
+        self,
+        doc_id: str,
+        file_hash: str,
+        batch_index: int,
+        chunk_ids: List[str],
+        chunk_indexes: Optional[List[int]] = None
+    ):
+        """Registra um lote de chunks concluído e, opcionalmente, a posição de cada chunk"""
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints (doc_id, file_hash, batch_index, chunk_ids, chunk_indexes) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        doc_id, file_hash, batch_index, json.dumps(chunk_ids),
+                        json.dumps(chunk_indexes) if chunk_indexes is not None else None
+                    )
+                )
+
+    def clear(self, doc_id: str):
+        """Remove os checkpoints de um documento concluído"""
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM checkpoints WHERE doc_id = ?", (doc_id,))
+
+    def close(self):
+        """Fecha a conexão com o banco de checkpoints"""
+        self.conn.close()
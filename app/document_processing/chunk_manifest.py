@@ -0,0 +1,63 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from ..core.logging import logger
+
+def make_chunk_id(doc_id: str, text: str, seen: Dict[str, int]) -> str:
+    """
+    Gera o ID estável do vetor a partir do documento e do conteúdo do chunk
+
+    Chunks com o mesmo texto no mesmo documento recebem um sufixo com a ordem
+    de ocorrência, controlada pelo dicionário seen.
+    """
+    doc_key = hashlib.sha256(doc_id.encode('utf-8')).hexdigest()[:12]
+    chunk_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+    occurrence = seen.get(chunk_hash, 0)
+    seen[chunk_hash] = occurrence + 1
+    chunk_id = f"{doc_key}-{chunk_hash}"
+    return f"{chunk_id}-{occurrence}" if occurrence else chunk_id
+
+class ChunkManifest:
+    """Registro, por documento, dos IDs dos vetores armazenados no Pinecone e da posição de cada um"""
+    def __init__(self, manifest_dir: str = "data/chunk_manifests"):
+        self.manifest_dir = Path(manifest_dir)
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+
+    def _get_path(self, doc_id: str) -> Path:
+        """Retorna o caminho do manifesto do documento"""
+        doc_key = hashlib.sha256(doc_id.encode('utf-8')).hexdigest()[:12]
+        return self.manifest_dir / f"{doc_key}.json"
+
+    def load(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna o manifesto do documento, ou None se ele nunca foi registrado"""
+        path = self._get_path(doc_id)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Erro ao carregar manifesto de {doc_id}: {str(e)}")
+            return {}
+
+    def get_chunk_ids(self, doc_id: str) -> List[str]:
+        """Retorna os IDs registrados na última ingestão do documento"""
+        return (self.load(doc_id) or {}).get("chunk_ids", [])
+
+    def save(self, doc_id: str, source: str, chunk_ids: List[str], chunk_indexes: Optional[List[int]] = None):
+        """Salva os IDs dos chunks da ingestão atual do documento e, opcionalmente, suas posições"""
+        path = self._get_path(doc_id)
+        temp_path = path.with_suffix(".tmp")
+        manifest = {"doc_id": doc_id, "source": source, "chunk_ids": chunk_ids}
+        if chunk_indexes is not None:
+            manifest["chunk_indexes"] = chunk_indexes
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        temp_path.replace(path)
+
+    def delete(self, doc_id: str):
+        """Remove o manifesto do documento"""
+        path = self._get_path(doc_id)
+        if path.exists():
+            path.unlink()
@@ -1,59 +1,135 @@
-from typing import List
+import re
+import math
+import zlib
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from ..core.config import settings
 from ..core.logging import logger
+from .tokenization import get_encoding, count_tokens
+
+# Finais de sentença reconhecidos: '. ', '! ', '? ' e '\n\n'.
+# O lookahead gera uma posição para cada ocorrência, inclusive sobrepostas
+# (ex.: '\n\n\n'), reproduzindo exatamente o comportamento de str.find.
+_SENTENCE_END = re.compile(r'(?=[.!?] |\n\n)')
+_SENTENCE_END_LENGTH = 2
+
+# Tokens examinados de cada lado de um corte; um caractere UTF-8 tem até 4 bytes
+_MAX_TOKENS_PER_CHAR = 4
+
+# Palavras usadas no hash deslizante do chunking definido pelo conteúdo
+_WORD = re.compile(r'\S+')
+_AVERAGE_WORD_LENGTH = 6
+
+class _PageBuffer:
+    """Janela de texto pendente durante o chunking em streaming, com o mapa de páginas"""
+    def __init__(self):
+        self.text = ""
+        self.offsets = []  # Posição no buffer onde cada página começa
+        self.pages = []    # Número da página correspondente a cada posição
+
+    def append(self, text: str, page: int):
+        """Adiciona o texto de uma página ao final do buffer"""
+        self.offsets.append(len(self.text))
+        self.pages.append(page)
+        self.text += text
+
+    def page_at(self, offset: int) -> Optional[int]:
+        """Retorna a página que contém a posição informada"""
+        index = bisect_right(self.offsets, offset) - 1
+        return self.pages[max(index, 0)] if self.pages else None
+
+    def discard(self, length: int):
+        """Descarta o início do buffer que já não é necessário"""
+        if length <= 0:
+            return
+        self.text = self.text[length:]
+        first = max(bisect_right(self.offsets, length) - 1, 0)
+        self.offsets = [max(offset - length, 0) for offset in self.offsets[first:]]
+        self.pages = self.pages[first:]
+
+    def page_span(self, start: int, end: int) -> Tuple[Optional[int], Optional[int]]:
+        """Páginas do primeiro e do último caractere não branco do intervalo"""
+        segment = self.text[start:end]
+        first = start + len(segment) - len(segment.lstrip())
+        last = start + len(segment.rstrip()) - 1
+        return self.page_at(first), self.page_at(max(last, first))
+
+def _iter_pages(pages: Iterable[str]) -> Iterator[Tuple[str, int]]:
+    """Numera as páginas a partir de 1 e ignora as que não têm texto"""
+    for page_number, page in enumerate(pages, 1):
+        if page and page.strip():
+            yield page + "\n", page_number
 
 class TextChunker:
     def __init__(
         self,
         chunk_size: int = settings.CHUNK_SIZE,
-        chunk_overlap: int = settings.CHUNK_OVERLAP
+        chunk_overlap: int = settings.CHUNK_OVERLAP,
+        encoding=None
     ):
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size deve ser positivo: {chunk_size}")
+        if chunk_overlap < 0 or chunk_overlap >= chunk_size:
+            raise ValueError(
+                f"chunk_overlap deve estar entre 0 e chunk_size - 1: {chunk_overlap}"
+            )
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-    
-    def _find_sentence_end(self, text: str, position: int) -> int:
+        self._encoding = encoding
+
+    @property
+    def encoding(self):
+        """Encoder do tiktoken do modelo de embedding (carregado sob demanda)"""
+        if self._encoding is None:
+            self._encoding = get_encoding()
+        return self._encoding
+
+    def _find_sentence_boundaries(self, text: str) -> List[int]:
+        """Localiza, em uma única passada, o início de todos os finais de sentença"""
+        return [match.start() for match in _SENTENCE_END.finditer(text)]
+
+    def _find_sentence_end(self, boundaries: List[int], text_length: int, position: int) -> int:
         """Encontra o fim da sentença mais próximo após a posição especificada"""
-        sentence_endings = ['. ', '! ', '? ', '\n\n']
-        min_end = len(text)
-        
-        for ending in sentence_endings:
-            pos = text.find(ending, position)
-            if pos != -1 and pos < min_end:
-                min_end = pos + len(ending)
-        
+        index = bisect_left(boundaries, position)
+        if index < len(boundaries):
+            end = boundaries[index] + _SENTENCE_END_LENGTH
+            if end < text_length:
+                return end
+
         # Se não encontrar um fim de sentença, retorna o próprio position
-        return min_end if min_end < len(text) else position
+        return position
 
     def create_chunks(self, text: str) -> List[str]:
         """Divide o texto em chunks respeitando o fim das sentenças"""
         logger.info("Iniciando processo de chunking do texto")
-        
+
         chunks = []
         start = 0
         text_length = len(text)
+        boundaries = self._find_sentence_boundaries(text)
 
         while start < text_length:
             # Define o fim do chunk atual
             end = start + self.chunk_size
-            
+
             if end >= text_length:
                 # Se chegamos ao fim do texto
                 chunk = text[start:].strip()
                 if chunk:
                     chunks.append(chunk)
                 break
-            
+
             # Encontra o fim da sentença mais próximo
-            end = self._find_sentence_end(text, end)
-            
+            end = self._find_sentence_end(boundaries, text_length, end)
+
             # Extrai o chunk
             chunk = text[start:end].strip()
             if chunk:
                 chunks.append(chunk)
-            
-            # Atualiza a posição inicial para o próximo chunk
-            start = end - self.chunk_overlap
-        
+
+            # Atualiza a posição inicial para o próximo chunk, sempre avançando
+            start = max(end - self.chunk_overlap, start + 1)
+
         logger.info(
             f"Chunking concluído",
             extra={
@@ -61,5 +137,526 @@ class TextChunker:
                 "avg_chunk_size": sum(len(c) for c in chunks) / len(chunks) if chunks else 0
             }
         )
-        
-        return chunks 
\ No newline at end of file
+
+        return chunks
+
+    def create_chunks_with_metadata(self, text: str) -> List[Dict[str, Any]]:
+        """Divide o texto em chunks e anexa a contagem de tokens de cada um aos metadados"""
+        chunks = self.create_chunks(text)
+        token_counts = count_tokens(chunks, encoding=self.encoding)
+        return [
+            {"text": chunk, "metadata": {"token_count": token_count}}
+            for chunk, token_count in zip(chunks, token_counts)
+        ]
+
+    def _drain(self, buffer: _PageBuffer, state: Dict[str, int], final: bool) -> Iterator[Tuple[str, int, int]]:
+        """Emite os chunks cujo corte já pode ser decidido com o texto do buffer"""
+        text = buffer.text
+        start = state["start"]
+
+        while start < len(text):
+            end = start + self.chunk_size
+
+            if end >= len(text):
+                # Só é o último chunk se não houver mais páginas
+                if not final:
+                    break
+                chunk = text[start:].strip()
+                if chunk:
+                    yield (chunk, *buffer.page_span(start, len(text)))
+                start = len(text)
+                break
+
+            # Procura o fim de sentença a partir do corte sem reler o trecho já examinado.
+            # Sem fim de sentença em mais de 2 * chunk_size de texto, o corte é feito em
+            # chunk_size, para que o texto não fique retido até o fim do documento
+            match = _SENTENCE_END.search(text, max(end, state["scanned"]))
+            if match and match.start() + _SENTENCE_END_LENGTH < len(text):
+                end = match.start() + _SENTENCE_END_LENGTH
+            elif not final and len(text) - start <= 2 * self.chunk_size:
+                # O fim da sentença pode estar na próxima página
+                state["scanned"] = max(end, len(text) - _SENTENCE_END_LENGTH)
+                break
+
+            chunk = text[start:end].strip()
+            if chunk:
+                yield (chunk, *buffer.page_span(start, end))
+
+            start = max(end - self.chunk_overlap, start + 1)
+            state["scanned"] = 0
+
+        # Mantém no buffer apenas o que ainda será usado (overlap e texto pendente)
+        buffer.discard(start)
+        if state["scanned"]:
+            state["scanned"] -= start
+        state["start"] = 0
+
+    def _iter_page_chunks(self, pages: Iterable[str]) -> Iterator[Tuple[str, int, int]]:
+        """Gera (texto, página inicial, página final) consumindo as páginas sob demanda"""
+        buffer = _PageBuffer()
+        state = {"start": 0, "scanned": 0}
+        for page_text, page_number in _iter_pages(pages):
+            buffer.append(page_text, page_number)
+            yield from self._drain(buffer, state, final=False)
+        yield from self._drain(buffer, state, final=True)
+
+    def _with_token_counts(
+        self,
+        items: Iterable[Tuple[str, Dict[str, Any]]],
+        batch_size: int
+    ) -> Iterator[Dict[str, Any]]:
+        """Anexa token_count aos chunks, tokenizando em lotes com encode_batch"""
+        pending = []
+
+        def flush():
+            token_counts = count_tokens([chunk for chunk, _ in pending], encoding=self.encoding)
+            for (chunk, metadata), token_count in zip(pending, token_counts):
+                # Metadados nulos ou vazios não são aceitos pelo Pinecone
+                metadata = {key: value for key, value in metadata.items() if value not in (None, "")}
+                metadata["token_count"] = token_count
+                yield {"text": chunk, "metadata": metadata}
+            pending.clear()
+
+        for item in items:
+            pending.append(item)
+            if len(pending) >= batch_size:
+                yield from flush()
+        yield from flush()
+
+    def iter_chunks(self, pages: Iterable[str], batch_size: int = 64) -> Iterator[Dict[str, Any]]:
+        """
+        Divide em chunks um iterador de páginas (ou parágrafos) à medida que é consumido.
+
+        Entre uma página e outra só é mantido o texto ainda não emitido e a janela de
+        overlap, de modo que a memória não cresce com o tamanho do documento.
+
+        Args:
+            pages: Iterador com o texto de cada página, na ordem (a primeira é a página 1)
+            batch_size: Número de chunks tokenizados por chamada a encode_batch
+
+        Yields:
+            Dict com "text" e "metadata" (page, page_end e token_count)
+        """
+        items = (
+            (chunk, {"page": page_start, "page_end": page_end})
+            for chunk, page_start, page_end in self._iter_page_chunks(pages)
+        )
+        return self._with_token_counts(items, batch_size)
+
+    def _block_size(self, text: str) -> int:
+        """Tamanho de um bloco na unidade do chunker (caracteres)"""
+        return len(text)
+
+    def _split_block(self, text: str) -> Iterator[str]:
+        """Divide um bloco maior que o chunk respeitando o fim das sentenças"""
+        for chunk, _, _ in self._iter_page_chunks([text]):
+            yield chunk
+
+    def _split_table(self, text: str) -> Iterator[str]:
+        """Divide uma tabela grande em grupos de linhas inteiras"""
+        rows = []
+        size = 0
+        for row in text.split("\n"):
+            row_size = self._block_size(row)
+            if row_size > self.chunk_size:
+                if rows:
+                    yield "\n".join(rows)
+                rows, size = [], 0
+                yield from self._split_block(row)
+                continue
+            if rows and size + row_size > self.chunk_size:
+                yield "\n".join(rows)
+                rows, size = [], 0
+            rows.append(row)
+            size += row_size
+        if rows:
+            yield "\n".join(rows)
+
+    def _iter_block_chunks(self, blocks: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Agrupa blocos consecutivos da mesma seção sem ultrapassar o tamanho do chunk"""
+        pack = []
+        pack_size = 0
+
+        def block_metadata(group, block_type):
+            pages = [block["page"] for block in group if block.get("page") is not None]
+            return {
+                "page": pages[0] if pages else None,
+                "page_end": pages[-1] if pages else None,
+                "section": " > ".join(group[-1].get("heading_path") or []),
+                "block_type": block_type
+            }
+
+        def flush():
+            nonlocal pack, pack_size
+            text = "\n".join(block["text"].strip() for block in pack).strip()
+            if text:
+                yield text, block_metadata(pack, "paragraph")
+            pack, pack_size = [], 0
+
+        for block in blocks:
+            text = (block.get("text") or "").strip()
+            if not text:
+                continue
+            block = {**block, "text": text}
+            block_type = block.get("block_type", "paragraph")
+            size = self._block_size(text)
+
+            # Títulos seguidos de outro título ainda não têm conteúdo: são mantidos e
+            # entram no próximo chunk com conteúdo, em vez de formar um chunk só de títulos
+            pending_headings = bool(pack) and all(b.get("block_type") == "heading" for b in pack)
+
+            # Um novo título ou uma mudança de seção sempre iniciam um novo chunk
+            if pack and not pending_headings and (
+                block_type == "heading"
+                or block.get("heading_path") != pack[-1].get("heading_path")
+            ):
+                yield from flush()
+
+            if block_type == "table" or size > self.chunk_size:
+                # Os títulos pendentes são mantidos junto ao início da tabela ou do bloco grande
+                if pending_headings:
+                    text = "\n".join([b["text"] for b in pack] + [text])
+                    pack, pack_size = [], 0
+                yield from flush()
+                if block_type == "table":
+                    for part in self._split_table(text):
+                        yield part, block_metadata([block], "table")
+                else:
+                    for part in self._split_block(text):
+                        yield part, block_metadata([block], "paragraph")
+                continue
+
+            if pack and not pending_headings and self._pack_is_full(pack, pack_size, size):
+                yield from flush()
+
+            pack.append(block)
+            pack_size += size
+
+        yield from flush()
+
+    def _pack_is_full(self, pack: List[Dict[str, Any]], pack_size: int, size: int) -> bool:
+        """Indica se o próximo bloco deve iniciar um novo chunk"""
+        return pack_size + size > self.chunk_size
+
+    def iter_block_chunks(self, blocks: Iterable[Dict[str, Any]], batch_size: int = 64) -> Iterator[Dict[str, Any]]:
+        """
+        Divide em chunks os blocos estruturados de um documento (ver DocumentProcessor.iter_blocks).
+
+        Parágrafos consecutivos da mesma seção são agrupados até o tamanho do chunk;
+        títulos e mudanças de seção sempre iniciam um novo chunk, títulos consecutivos
+        entram juntos no chunk do conteúdo seguinte e tabelas formam chunks próprios. Blocos maiores que o chunk são divididos no fim das sentenças.
+
+        Yields:
+            Dict com "text" e "metadata" (page, page_end, section, block_type e token_count)
+        """
+        return self._with_token_counts(self._iter_block_chunks(blocks), batch_size)
+
+class TokenChunker(TextChunker):
+    """Chunker que mede tamanho e overlap em tokens do modelo de embedding"""
+    def __init__(
+        self,
+        chunk_size: int = settings.CHUNK_SIZE_TOKENS,
+        chunk_overlap: int = settings.CHUNK_OVERLAP_TOKENS,
+        encoding=None
+    ):
+        super().__init__(chunk_size, chunk_overlap, encoding)
+
+    def _split_sentences(self, text: str, final: bool = True) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Divide o texto em sentenças, preservando os separadores.
+
+        Retorna os intervalos (início, fim) das sentenças e a posição até onde o texto
+        foi consumido; com final=False, o trecho após o último fim de sentença fica pendente.
+        """
+        spans = []
+        previous = 0
+        for boundary in self._find_sentence_boundaries(text):
+            end = boundary + _SENTENCE_END_LENGTH
+            if end > previous:
+                spans.append((previous, end))
+                previous = end
+        if final and previous < len(text):
+            spans.append((previous, len(text)))
+            previous = len(text)
+        return spans, previous
+
+    def _is_clean_cut(self, tokens: List[int], position: int) -> bool:
+        """Indica se cortar os tokens na posição não divide um caractere multibyte"""
+        if position <= 0 or position >= len(tokens):
+            return True
+        before = tokens[max(0, position - _MAX_TOKENS_PER_CHAR):position]
+        after = tokens[position:position + _MAX_TOKENS_PER_CHAR]
+        return self.encoding.decode(before + after) == self.encoding.decode(before) + self.encoding.decode(after)
+
+    def _split_long_sentence(self, tokens: List[int]) -> List[str]:
+        """
+        Divide uma sentença maior que o chunk em janelas de tokens
+
+        Os cortes recuam (no fim da janela) ou avançam (no início do overlap) até um
+        limite em que a decodificação não divide um caractere multibyte.
+        """
+        windows = []
+        start = 0
+        while True:
+            end = min(start + self.chunk_size, len(tokens))
+            cut = end
+            while cut > start + 1 and not self._is_clean_cut(tokens, cut):
+                cut -= 1
+            if cut > start + 1 or self._is_clean_cut(tokens, cut):
+                end = cut
+            windows.append(self.encoding.decode(tokens[start:end]))
+            if end >= len(tokens):
+                return windows
+            start = max(end - self.chunk_overlap, start + 1)
+            while start < end and not self._is_clean_cut(tokens, start):
+                start += 1
+
+    def _iter_sentences(self, pages: Iterable[str]) -> Iterator[Tuple[str, List[int], int, int]]:
+        """Gera (sentença, tokens, página inicial, página final) a partir das páginas"""
+        buffer = _PageBuffer()
+        page_iter = _iter_pages(pages)
+        final = False
+
+        while not final:
+            item = next(page_iter, None)
+            if item is None:
+                final = True
+            else:
+                buffer.append(*item)
+
+            spans, consumed = self._split_sentences(buffer.text, final=final)
+            sentences = [buffer.text[start:end] for start, end in spans]
+            pending = "" if final else buffer.text[consumed:]
+            if not sentences and not pending:
+                continue
+            # Uma chamada a encode_batch por página; o trecho pendente é medido em tokens
+            # na mesma chamada
+            sentence_tokens = self.encoding.encode_batch(
+                sentences + [pending] if pending else sentences, disallowed_special=()
+            )
+            if pending:
+                pending_tokens = sentence_tokens.pop()
+                if len(pending_tokens) > 2 * self.chunk_size:
+                    # Texto sem fim de sentença não fica retido até o fim do documento: o trecho
+                    # pendente (que termina em uma quebra de página) é tratado como uma sentença
+                    spans.append((consumed, len(buffer.text)))
+                    sentences.append(pending)
+                    sentence_tokens.append(pending_tokens)
+                    consumed = len(buffer.text)
+            for (start, end), sentence, tokens in zip(spans, sentences, sentence_tokens):
+                yield (sentence, tokens, *buffer.page_span(start, end))
+            buffer.discard(consumed)
+
+    def _pack_sentences(
+        self,
+        sentences: Iterable[Tuple[str, List[int], Any, Any]]
+    ) -> Iterator[Tuple[str, Any, Any]]:
+        """Agrupa sentenças inteiras em chunks de até chunk_size tokens"""
+        current = []  # Tuplas (texto, número de tokens, página inicial, página final)
+        current_tokens = 0
+
+        def flush():
+            chunk = "".join(item[0] for item in current).strip()
+            if chunk:
+                yield chunk, current[0][2], current[-1][3]
+
+        for sentence, tokens, page_start, page_end in sentences:
+            size = len(tokens)
+
+            if size > self.chunk_size:
+                # Sentença sozinha excede o chunk: fecha o atual e divide por tokens
+                yield from flush()
+                for window in self._split_long_sentence(tokens):
+                    if window.strip():
+                        yield window.strip(), page_start, page_end
+                current, current_tokens = [], 0
+                continue
+
+            if current and current_tokens + size > self.chunk_size:
+                yield from flush()
+
+                # Mantém as últimas sentenças que cabem no overlap
+                overlap = []
+                overlap_tokens = 0
+                for item in reversed(current):
+                    if overlap_tokens + item[1] > self.chunk_overlap:
+                        break
+                    overlap.insert(0, item)
+                    overlap_tokens += item[1]
+                while overlap and overlap_tokens + size > self.chunk_size:
+                    overlap_tokens -= overlap.pop(0)[1]
+                current, current_tokens = overlap, overlap_tokens
+
+            current.append((sentence, size, page_start, page_end))
+            current_tokens += size
+
+        if current:
+            yield from flush()
+
+    def create_chunks(self, text: str) -> List[str]:
+        """Agrupa sentenças inteiras em chunks de até chunk_size tokens"""
+        logger.info("Iniciando processo de chunking do texto por tokens")
+
+        spans, _ = self._split_sentences(text)
+        sentences = [text[start:end] for start, end in spans]
+        sentence_tokens = self.encoding.encode_batch(sentences, disallowed_special=())
+
+        chunks = [
+            chunk
+            for chunk, _, _ in self._pack_sentences(
+                (sentence, tokens, None, None)
+                for sentence, tokens in zip(sentences, sentence_tokens)
+            )
+        ]
+
+        logger.info(
+            f"Chunking por tokens concluído",
+            extra={"total_chunks": len(chunks)}
+        )
+
+        return chunks
+
+    def _iter_page_chunks(self, pages: Iterable[str]) -> Iterator[Tuple[str, int, int]]:
+        """Gera (texto, página inicial, página final) consumindo as páginas sob demanda"""
+        return self._pack_sentences(self._iter_sentences(pages))
+
+    def _block_size(self, text: str) -> int:
+        """Tamanho de um bloco na unidade do chunker (tokens)"""
+        return len(self.encoding.encode_batch([text], disallowed_special=())[0])
+
+class ContentDefinedChunker(TextChunker):
+    """
+    Chunker definido pelo conteúdo: os cortes são escolhidos por um hash deslizante
+    sobre as últimas 32 palavras e ajustados para o fim da sentença seguinte.
+
+    Como cada corte depende apenas do texto ao seu redor, uma edição local altera
+    somente os chunks vizinhos; os demais mantêm o mesmo texto (e o mesmo ID), e a
+    reingestão só precisa gerar embeddings para os chunks alterados. Não há overlap
+    entre os chunks, para que o conteúdo de um não dependa do corte do anterior.
+    """
+    def __init__(
+        self,
+        chunk_size: int = settings.CHUNK_SIZE,
+        min_size: int = None,
+        max_size: int = None,
+        encoding=None
+    ):
+        super().__init__(chunk_size, 0, encoding)
+        self.min_size = min_size or chunk_size // 2
+        self.max_size = max_size or chunk_size * 2
+        if not 0 < self.min_size <= chunk_size <= self.max_size:
+            raise ValueError(
+                f"Tamanhos inválidos: min_size={self.min_size}, "
+                f"chunk_size={chunk_size}, max_size={self.max_size}"
+            )
+
+        # Probabilidade de corte por palavra ajustada para que o tamanho médio
+        # fique próximo de chunk_size
+        expected_words = max(2.0, (chunk_size - self.min_size) / _AVERAGE_WORD_LENGTH)
+        bits = max(1, round(math.log2(expected_words)))
+        self._mask = ((1 << bits) - 1) << (32 - bits)
+
+    def _roll(self, value: int, word: str) -> int:
+        """Atualiza o hash deslizante com mais uma palavra (janela de 32 palavras)"""
+        return ((value << 1) + zlib.crc32(word.encode('utf-8'))) & 0xFFFFFFFF
+
+    def _drain(self, buffer: _PageBuffer, state: Dict[str, Any], final: bool) -> Iterator[Tuple[str, int, int]]:
+        """Emite os chunks cujo corte já pode ser decidido com o texto do buffer"""
+        text = buffer.text
+
+        while True:
+            start = state["start"]
+
+            if state["candidate"] is None:
+                for match in _WORD.finditer(text, state["scan"]):
+                    length = match.end() - start
+                    if length > self.max_size:
+                        if state["scan"] > start:
+                            # Corte forçado na palavra anterior para não exceder max_size
+                            state["candidate"] = state["scan"]
+                        else:
+                            # Uma palavra maior que max_size é cortada em max_size
+                            state["candidate"] = state["scan"] = start + self.max_size
+                        break
+                    state["scan"] = match.end()
+                    state["hash"] = self._roll(state["hash"], match.group())
+                    if length >= self.min_size and not state["hash"] & self._mask:
+                        state["candidate"] = match.end()
+                        break
+                else:
+                    break
+
+            candidate = state["candidate"]
+            end = candidate
+            # Ajusta o corte para o fim da sentença seguinte, sem passar de max_size
+            # (a pontuação faz parte da palavra, por isso a busca começa um caractere antes)
+            match = _SENTENCE_END.search(text, candidate - 1)
+            limit = start + self.max_size
+            if match and match.start() + _SENTENCE_END_LENGTH <= limit:
+                end = match.start() + _SENTENCE_END_LENGTH
+            elif match is None and not final and len(text) < limit:
+                # O fim da sentença pode estar na próxima página
+                break
+
+            chunk = text[start:end].strip()
+            if chunk:
+                yield (chunk, *buffer.page_span(start, end))
+            state["start"] = end
+            state["candidate"] = None
+
+        if final and state["start"] < len(text):
+            chunk = text[state["start"]:].strip()
+            if chunk:
+                yield (chunk, *buffer.page_span(state["start"], len(text)))
+            state["start"] = len(text)
+
+        # Mantém no buffer apenas o texto ainda não emitido
+        discarded = state["start"]
+        buffer.discard(discarded)
+        state["start"] = 0
+        state["scan"] = max(state["scan"] - discarded, 0)
+        if state["candidate"] is not None:
+            state["candidate"] -= discarded
+
+    def _iter_page_chunks(self, pages: Iterable[str]) -> Iterator[Tuple[str, int, int]]:
+        """Gera (texto, página inicial, página final) consumindo as páginas sob demanda"""
+        buffer = _PageBuffer()
+        state = {"start": 0, "scan": 0, "hash": 0, "candidate": None}
+        for page_text, page_number in _iter_pages(pages):
+            buffer.append(page_text, page_number)
+            yield from self._drain(buffer, state, final=False)
+        yield from self._drain(buffer, state, final=True)
+
+    def create_chunks(self, text: str) -> List[str]:
+        """Divide o texto em chunks com cortes definidos pelo conteúdo"""
+        logger.info("Iniciando processo de chunking definido pelo conteúdo")
+        chunks = [chunk for chunk, _, _ in self._iter_page_chunks([text])]
+        logger.info(
+            f"Chunking definido pelo conteúdo concluído",
+            extra={"total_chunks": len(chunks)}
+        )
+        return chunks
+
+    def _pack_is_full(self, pack: List[Dict[str, Any]], pack_size: int, size: int) -> bool:
+        """
+        Fecha o chunk após um bloco escolhido pelo hash do seu conteúdo, com
+        probabilidade proporcional ao tamanho do bloco, respeitando min_size e max_size
+        """
+        if pack_size + size > self.max_size:
+            return True
+        if pack_size < self.min_size:
+            return False
+        last = pack[-1]["text"]
+        probability = min(1.0, len(last) / (self.chunk_size - self.min_size or 1))
+        return zlib.crc32(last.encode('utf-8')) / 0xFFFFFFFF < probability
+
+def get_chunker(mode: str = None) -> TextChunker:
+    """Retorna o chunker configurado (CHUNKING_MODE: characters, tokens ou content)"""
+    mode = (mode or settings.CHUNKING_MODE).lower()
+    if mode == "tokens":
+        return TokenChunker()
+    if mode == "content":
+        return ContentDefinedChunker()
+    if mode == "characters":
+        return TextChunker()
+    raise ValueError(f"Modo de chunking não suportado: {mode}")
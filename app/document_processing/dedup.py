@@ -0,0 +1,230 @@
+import re
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ..core.config import settings
+from ..core.logging import logger
+
+_WORD = re.compile(r'\w+')
+
+# Primo maior que 2^32 usado nas permutações (a * x + b) mod p
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# Tamanho de um vetor de embedding (floats de 32 bits), usado no relatório de economia
+VECTOR_BYTES = settings.EMBEDDING_DIMENSIONS * 4
+
+class MinHasher:
+    """Calcula assinaturas MinHash de textos a partir de shingles de palavras"""
+    def __init__(self, num_perm: int = settings.DEDUP_NUM_PERM, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text: str) -> List[str]:
+        """Retorna os shingles (sequências de palavras) normalizados do texto"""
+        words = _WORD.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            return [" ".join(words)]
+        return [
+            " ".join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        ]
+
+    def signature(self, text: str) -> np.ndarray:
+        """Retorna a assinatura MinHash (num_perm valores de 32 bits) do texto"""
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in set(self._shingles(text))),
+            dtype=np.uint64
+        )
+        # a, b e os hashes têm 32 bits, então a * x + b cabe em 64 bits sem overflow
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+def _optimal_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Escolhe o número de bandas e de linhas por banda do LSH
+
+    Usa a maior similaridade de corte (1/b)^(1/r) que não ultrapassa o threshold,
+    favorecendo a revocação; os candidatos são confirmados pela similaridade estimada.
+    """
+    best = (num_perm, 1)
+    best_cut = 0.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        cut = (1 / bands) ** (1 / rows)
+        if best_cut < cut <= threshold:
+            best, best_cut = (bands, rows), cut
+    return best
+
+class NearDuplicateIndex:
+    """
+    Índice LSH em disco (SQLite) das assinaturas MinHash dos chunks já armazenados,
+    usado para evitar embeddings de chunks quase idênticos a chunks de outros documentos
+    """
+    def __init__(
+        self,
+        db_path: str = settings.DEDUP_INDEX_PATH,
+        threshold: float = settings.DEDUP_THRESHOLD,
+        num_perm: int = settings.DEDUP_NUM_PERM
+    ):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Threshold de deduplicação inválido: {threshold}")
+
+        self.db_path = db_path
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = _optimal_bands(num_perm, threshold)
+        self.stats = {"duplicates": 0, "tokens_saved": 0, "bytes_saved": 0}
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Compartilhado entre as threads do pipeline de ingestão, com acesso serializado
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                chunk_id TEXT PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket BLOB NOT NULL,
+                chunk_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_buckets ON buckets (band, bucket);
+            CREATE INDEX IF NOT EXISTS idx_buckets_chunk ON buckets (chunk_id);
+            CREATE TABLE IF NOT EXISTS links (
+                chunk_id TEXT PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                source TEXT,
+                canonical_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_links_canonical ON links (canonical_id);
+        """)
+        logger.info(
+            f"Índice de deduplicação inicializado: {db_path} "
+            f"(threshold={threshold}, bandas={self.bands}, linhas={self.rows})"
+        )
+
+    def _band_buckets(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        """Divide a assinatura em bandas para a busca LSH"""
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def find_duplicate(self, signature: np.ndarray, exclude_doc_id: str = None) -> Optional[Tuple[str, float]]:
+        """
+        Retorna (chunk_id, similaridade) do chunk mais parecido acima do threshold
+
+        Chunks do próprio documento são ignorados, pois podem ser versões anteriores
+        que serão substituídas na reingestão.
+        """
+        with self._lock:
+            candidates = set()
+            for band, bucket in self._band_buckets(signature):
+                rows = self.conn.execute(
+                    "SELECT chunk_id FROM buckets WHERE band = ? AND bucket = ?",
+                    (band, bucket)
+                )
+                candidates.update(row[0] for row in rows)
+
+            best = None
+            for chunk_id in candidates:
+                row = self.conn.execute(
+                    "SELECT doc_id, signature FROM signatures WHERE chunk_id = ?",
+                    (chunk_id,)
+                ).fetchone()
+                if row is None or row[0] == exclude_doc_id:
+                    continue
+                similarity = float(np.mean(np.frombuffer(row[1], dtype=np.uint32) == signature))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (chunk_id, similarity)
+            return best
+
+    def add(self, chunk_id: str, doc_id: str, signature: np.ndarray):
+        """Registra a assinatura de um chunk armazenado no índice vetorial"""
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO signatures (chunk_id, doc_id, signature) VALUES (?, ?, ?)",
+                    (chunk_id, doc_id, signature.tobytes())
+                )
+                self.conn.execute("DELETE FROM buckets WHERE chunk_id = ?", (chunk_id,))
+                self.conn.executemany(
+                    "INSERT INTO buckets (band, bucket, chunk_id) VALUES (?, ?, ?)",
+                    [(band, bucket, chunk_id) for band, bucket in self._band_buckets(signature)]
+                )
+
+    def link(self, chunk_id: str, doc_id: str, source: str, canonical_id: str) -> List[str]:
+        """
+        Vincula um chunk duplicado à cópia existente e retorna as fontes vinculadas a ela
+
+        O vínculo é registrado para todo chunk ignorado, para que o documento seja
+        ingerido novamente se a cópia existente for removida.
+        """
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO links (chunk_id, doc_id, source, canonical_id) VALUES (?, ?, ?, ?)",
+                    (chunk_id, doc_id, source, canonical_id)
+                )
+            rows = self.conn.execute(
+                "SELECT DISTINCT source FROM links WHERE canonical_id = ? ORDER BY source",
+                (canonical_id,)
+            )
+            return [row[0] for row in rows]
+
+    def remove(self, chunk_ids: List[str]) -> List[str]:
+        """
+        Remove chunks excluídos do índice vetorial, junto com seus vínculos
+
+        Retorna as fontes dos documentos que tinham chunks ignorados como duplicatas
+        dos chunks removidos: o conteúdo deles deixa de estar no índice vetorial, e
+        eles precisam ser ingeridos novamente.
+        """
+        removed = set(chunk_ids)
+        with self._lock:
+            with self.conn:
+                dependents = set()
+                for chunk_id in chunk_ids:
+                    rows = self.conn.execute(
+                        "SELECT chunk_id, source FROM links WHERE canonical_id = ?", (chunk_id,)
+                    )
+                    dependents.update(source for linked_id, source in rows if linked_id not in removed and source)
+                for chunk_id in chunk_ids:
+                    self.conn.execute("DELETE FROM signatures WHERE chunk_id = ?", (chunk_id,))
+                    self.conn.execute("DELETE FROM buckets WHERE chunk_id = ?", (chunk_id,))
+                    self.conn.execute(
+                        "DELETE FROM links WHERE chunk_id = ? OR canonical_id = ?",
+                        (chunk_id, chunk_id)
+                    )
+        return sorted(dependents)
+
+    def record_skip(self, text: str, token_count: int = None):
+        """Contabiliza um chunk que não precisou de embedding nem de armazenamento"""
+        with self._lock:
+            self.stats["duplicates"] += 1
+            self.stats["tokens_saved"] += token_count or 0
+            self.stats["bytes_saved"] += VECTOR_BYTES + len(text.encode('utf-8'))
+
+    def report(self) -> Dict[str, int]:
+        """Registra no log e retorna a economia obtida com a deduplicação"""
+        logger.info(
+            f"Deduplicação: {self.stats['duplicates']} chunks quase duplicados ignorados, "
+            f"{self.stats['tokens_saved']} tokens e "
+            f"{self.stats['bytes_saved'] / 1024:.1f} KiB economizados"
+        )
+        return dict(self.stats)
+
+    def close(self):
+        """Fecha a conexão com o banco do índice"""
+        self.conn.close()
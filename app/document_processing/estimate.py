@@ -0,0 +1,58 @@
+from typing import Any, Dict, List
+from ..core.config import settings
+from ..core.logging import logger
+
+def estimate_ingestion(results: List[Dict[str, Any]], elapsed_seconds: float) -> Dict[str, Any]:
+    """
+    Projeta o custo e o tempo de uma ingestão a partir dos resumos de uma execução
+    em dry-run do pipeline
+
+    As etapas do pipeline rodam em paralelo, então o tempo projetado é o da etapa
+    mais lenta: a extração e o chunking locais (medidos no dry-run), os embeddings
+    (limitados por requisições e tokens por minuto) ou os upserts (requisições por
+    segundo).
+    """
+    succeeded = [result for result in results if result["success"]]
+    totals = {
+        "documents": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "chunks": sum(result["chunks"] for result in succeeded),
+        "reused": sum(result["reused"] for result in succeeded),
+        "new_chunks": sum(result["new_chunks"] for result in succeeded),
+        "tokens": sum(result["tokens"] for result in succeeded),
+        "embedding_requests": sum(result["embedding_requests"] for result in succeeded),
+        "upsert_requests": sum(result["upsert_requests"] for result in succeeded),
+        "text_bytes": sum(result["text_bytes"] for result in succeeded)
+    }
+    totals["vector_bytes"] = totals["new_chunks"] * settings.EMBEDDING_DIMENSIONS * 4
+    totals["cost_usd"] = totals["tokens"] / 1_000_000 * settings.EMBEDDING_PRICE_PER_MILLION_TOKENS
+
+    embedding_seconds = 60 * max(
+        totals["embedding_requests"] / settings.EMBEDDING_REQUESTS_PER_MINUTE,
+        totals["tokens"] / settings.EMBEDDING_TOKENS_PER_MINUTE
+    )
+    upsert_seconds = totals["upsert_requests"] / settings.PINECONE_UPSERTS_PER_SECOND
+    totals["seconds"] = {
+        "local": elapsed_seconds,
+        "embedding": embedding_seconds,
+        "upsert": upsert_seconds,
+        "projected": max(elapsed_seconds, embedding_seconds, upsert_seconds)
+    }
+    return totals
+
+def log_estimate(estimate: Dict[str, Any]):
+    """Registra no log o relatório da estimativa"""
+    seconds = estimate["seconds"]
+    logger.info(
+        "Estimativa de ingestão (dry-run):\n"
+        f"  Documentos: {estimate['documents']} ({estimate['failed']} com erro)\n"
+        f"  Chunks: {estimate['chunks']} ({estimate['new_chunks']} novos, {estimate['reused']} reaproveitados)\n"
+        f"  Tokens para embedding: {estimate['tokens']} (US$ {estimate['cost_usd']:.4f})\n"
+        f"  Requisições de embedding: {estimate['embedding_requests']}\n"
+        f"  Requisições de upsert: {estimate['upsert_requests']}\n"
+        f"  Vetores: {estimate['vector_bytes'] / 1024 ** 2:.1f} MiB "
+        f"(+ {estimate['text_bytes'] / 1024 ** 2:.1f} MiB de texto nos metadados)\n"
+        f"  Tempo projetado: {seconds['projected'] / 3600:.2f} h "
+        f"(local {seconds['local']:.0f}s, embeddings {seconds['embedding']:.0f}s, "
+        f"upsert {seconds['upsert']:.0f}s)"
+    )
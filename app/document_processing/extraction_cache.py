@@ -0,0 +1,189 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from ..core.logging import logger
+
+# Tamanho dos blocos lidos ao calcular o hash dos arquivos
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+# Entradas acumuladas em memória antes de cada gravação no cache
+_STORE_BATCH_SIZE = 16
+
+# Arquivos modificados há menos que isso não entram no cache de hashes: uma nova
+# escrita no mesmo instante poderia manter o tamanho e o mtime com outro conteúdo
+_HASH_CACHE_MIN_AGE_NS = 2 * 10**9
+
+def file_hash(file_path: str) -> str:
+    """Calcula o SHA-256 do conteúdo do arquivo lendo-o em blocos"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """
+    Cache em disco (SQLite) do texto extraído dos documentos, compactado com zlib
+
+    Cada entrada é identificada por (hash do arquivo, tipo, versão do extrator, posição),
+    onde o tipo é "pages" (texto de cada página) ou "blocks" (blocos estruturados
+    serializados). Uma extração só é considerada em cache depois de concluída.
+
+    Os hashes dos arquivos ficam em cache por (caminho, tamanho, mtime_ns, inode), para
+    que a extração, em outro processo, e os checkpoints do pipeline não leiam o mesmo
+    arquivo inalterado várias vezes.
+    """
+    def __init__(self, cache_dir: str = "data/extraction_cache"):
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.db_path = str(Path(cache_dir) / "extraction_cache.sqlite")
+        # Uma conexão por thread para as operações curtas. As leituras e gravações são
+        # geradores de longa duração, retomados em threads quaisquer do pipeline de
+        # ingestão: cada gerador abre a própria conexão (_connect) e a fecha ao terminar,
+        # sem compartilhá-la com outros geradores da mesma thread
+        self._local = threading.local()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                file_hash TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                version TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (file_hash, kind, version, position)
+            );
+            CREATE TABLE IF NOT EXISTS extractions (
+                file_hash TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                version TEXT NOT NULL,
+                entries INTEGER NOT NULL,
+                PRIMARY KEY (file_hash, kind, version)
+            );
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+        """)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexão com o banco do cache para a thread atual"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre uma conexão com o banco do cache, usável por uma thread de cada vez"""
+        return sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+
+    def hash_file(self, file_path: str) -> str:
+        """Retorna o SHA-256 do conteúdo do arquivo, sem lê-lo se estiver inalterado desde o último cálculo"""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        row = self.conn.execute(
+            "SELECT content_hash FROM file_hashes "
+            "WHERE path = ? AND size_bytes = ? AND mtime_ns = ? AND inode = ?",
+            (path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        ).fetchone()
+        if row:
+            return row[0]
+
+        content_hash = file_hash(path)
+        if time.time_ns() - stat.st_mtime_ns >= _HASH_CACHE_MIN_AGE_NS:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO file_hashes (path, size_bytes, mtime_ns, inode, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime_ns, stat.st_ino, content_hash)
+                )
+        return content_hash
+
+    def get(self, file_hash: str, kind: str, version: str) -> Optional[Iterator[str]]:
+        """Retorna as entradas de uma extração concluída, na ordem, ou None se não estiver em cache"""
+        row = self.conn.execute(
+            "SELECT entries FROM extractions WHERE file_hash = ? AND kind = ? AND version = ?",
+            (file_hash, kind, version)
+        ).fetchone()
+        if row is None:
+            return None
+        return self._read_entries(file_hash, kind, version)
+
+    def _read_entries(self, file_hash: str, kind: str, version: str) -> Iterator[str]:
+        """Lê as entradas de uma extração com uma conexão própria do gerador"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "SELECT data FROM entries WHERE file_hash = ? AND kind = ? AND version = ? "
+                "ORDER BY position",
+                (file_hash, kind, version)
+            )
+            for (data,) in cursor:
+                yield zlib.decompress(data).decode('utf-8')
+        finally:
+            conn.close()
+
+    def store(self, file_hash: str, kind: str, version: str, items: Iterable[str]) -> Iterator[str]:
+        """
+        Repassa as entradas extraídas gravando-as no cache
+
+        A extração só é registrada como concluída quando todas as entradas forem
+        consumidas; uma extração interrompida é refeita na próxima leitura. As entradas
+        são gravadas em lotes de _STORE_BATCH_SIZE, cada um em uma transação curta: o
+        banco não fica bloqueado para escrita enquanto o documento é extraído ou
+        enquanto o consumidor processa as entradas.
+        """
+        key = (file_hash, kind, version)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM extractions WHERE file_hash = ? AND kind = ? AND version = ?", key
+                )
+                conn.execute(
+                    "DELETE FROM entries WHERE file_hash = ? AND kind = ? AND version = ?", key
+                )
+
+            def flush(rows):
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO entries (file_hash, kind, version, position, data) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        rows
+                    )
+                rows.clear()
+
+            rows = []
+            count = 0
+            for count, item in enumerate(items, 1):
+                rows.append((*key, count - 1, zlib.compress(item.encode('utf-8'))))
+                if len(rows) >= _STORE_BATCH_SIZE:
+                    flush(rows)
+                yield item
+
+            if rows:
+                flush(rows)
+            # O registro da extração marca o cache como completo
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extractions (file_hash, kind, version, entries) "
+                    "VALUES (?, ?, ?, ?)",
+                    (*key, count)
+                )
+        finally:
+            conn.close()
+        logger.debug(f"Extração armazenada em cache: {file_hash[:12]} ({kind}, {count} entradas)")
+
+    def clear(self):
+        """Remove todas as extrações do cache"""
+        with self.conn:
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("DELETE FROM extractions")
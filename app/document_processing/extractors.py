@@ -1,89 +1,681 @@
-from typing import List
+import os
+import re
+import sys
+import json
+import time
+import posixpath
+import zipfile
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import PyPDF2
-from docx import Document
+import docx
+from lxml import etree
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
 from pathlib import Path
+from ..core.config import settings
 from ..core.logging import logger
+from .extraction_cache import ExtractionCache
+
+# Parágrafos são separados por linhas em branco
+_PARAGRAPH_SEPARATOR = re.compile(r'\n\s*\n')
+
+# Estilos de título do Word (em inglês e em português), ex.: "Heading 2", "Título 1"
+_HEADING_STYLE = re.compile(r'^(?:heading|t[íi]tulo)\s*(\d*)$', re.IGNORECASE)
+_TITLE_STYLES = {"title", "título", "titulo"}
+
+# Tamanho dos blocos lidos de arquivos de texto e do texto agrupado por "página"
+# nos formatos sem paginação
+_READ_BLOCK_SIZE = 1024 * 1024
+
+# Espaços em branco (além da quebra de linha) onde um arquivo de texto sem linhas pode ser cortado
+_WHITESPACE = " \t\r\f\v"
+
+# Relações do pacote OOXML usadas para localizar o documento principal e os estilos
+_OFFICE_DOCUMENT_REL = "officeDocument"
+_STYLES_REL = "styles"
+_PACKAGE_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+def make_block(
+    text: str,
+    page: Optional[int] = None,
+    heading_path: Optional[List[str]] = None,
+    block_type: str = "paragraph"
+) -> Dict[str, Any]:
+    """Cria um bloco estruturado extraído de um documento"""
+    return {
+        "text": text,
+        "page": page,
+        "heading_path": list(heading_path or []),
+        "block_type": block_type  # paragraph, heading ou table
+    }
+
+# Leitor do PDF aberto em cada processo do pool, reaproveitado entre as tarefas e
+# identificado por (caminho, tamanho, mtime_ns, inode)
+_worker_reader: Dict[Tuple[str, int, int, int], Tuple[Any, PyPDF2.PdfReader]] = {}
+
+def _extract_pdf_pages(file_path: str, start: int, end: int) -> List[str]:
+    """
+    Extrai o texto das páginas [start, end) de um PDF
+
+    Executada nos processos do pool: cada worker abre o arquivo por conta própria,
+    pois o leitor do PyPDF2 não pode ser compartilhado entre processos, e o mantém
+    aberto para as próximas tarefas (montar a árvore de páginas é caro). O pool é
+    reaproveitado entre documentos: um arquivo substituído no mesmo caminho muda de
+    stat e é aberto novamente.
+    """
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    if key not in _worker_reader:
+        for file, _ in _worker_reader.values():
+            file.close()
+        _worker_reader.clear()
+        # O leitor recebe o arquivo aberto (e não o caminho) para ler sob demanda,
+        # sem carregar o PDF inteiro em memória
+        file = open(file_path, 'rb')
+        _worker_reader[key] = (file, PyPDF2.PdfReader(file))
+    _, reader = _worker_reader[key]
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def _import_pdfminer():
+    """Importa o pdfminer.six apenas quando o backend é usado"""
+    try:
+        import pdfminer
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+    except ImportError:
+        raise ImportError("Não foi possível importar pdfminer. Instale o pacote com: pip install pdfminer.six")
+    return pdfminer, extract_pages, LTTextContainer
+
+def _extract_pdfminer_pages(file_path: str, start: int = 0, end: Optional[int] = None) -> List[str]:
+    """Extrai com o pdfminer.six o texto das páginas [start, end) de um PDF (todas, se end for None)"""
+    _, extract_pages, LTTextContainer = _import_pdfminer()
+    page_numbers = range(start, end) if end is not None else None
+    return [
+        "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+        for layout in extract_pages(file_path, page_numbers=page_numbers)
+    ]
+
+def _check_memory(size: int, description: str):
+    """Levanta ValueError se o texto mantido em memória excede MAX_DOCUMENT_MEMORY_MB"""
+    if size > settings.MAX_DOCUMENT_MEMORY_MB * 1024 * 1024:
+        raise ValueError(
+            f"{description} excede o limite de {settings.MAX_DOCUMENT_MEMORY_MB} MB "
+            f"(MAX_DOCUMENT_MEMORY_MB)"
+        )
+
+def _limit_memory(items: Iterable[Any], file_path: str) -> Iterator[Any]:
+    """Repassa as páginas ou blocos do documento, verificando a memória de cada um"""
+    for item in items:
+        text = (item.get("text") or "") if isinstance(item, dict) else item
+        _check_memory(sys.getsizeof(text), f"Página ou bloco de {file_path}")
+        yield item
 
 class DocumentExtractor:
     """Classe base para extração de documentos"""
+    # Indica se o formato tem numeração de páginas própria
+    paged = False
+    # Indica se iter_blocks lê a estrutura do documento em vez de derivar os blocos das páginas
+    structured = False
+    # Versão da extração, parte da chave do cache; deve mudar quando o texto extraído mudar
+    version = "1"
+
     def extract_text(self, file_path: str) -> str:
         raise NotImplementedError
 
+    def close(self):
+        """Libera os recursos mantidos pelo extrator entre documentos"""
+
+    def iter_pages(self, file_path: str) -> Iterator[str]:
+        """Gera o texto do documento página a página (por padrão, uma única página)"""
+        yield self.extract_text(file_path)
+
+    def text_from_pages(self, pages: Iterable[str]) -> str:
+        """
+        Monta o texto do documento a partir das páginas extraídas
+
+        O texto completo fica em memória, por isso a memória ocupada pelas páginas é
+        limitada por MAX_DOCUMENT_MEMORY_MB; documentos maiores devem ser lidos com
+        iter_pages ou iter_blocks.
+        """
+        parts = []
+        size = 0
+        for page in pages:
+            if not page.strip():
+                continue
+            size += sys.getsizeof(page)
+            _check_memory(size, "Texto do documento (use a extração em streaming)")
+            parts.append(page)
+        return "\n".join(parts).strip()
+
+    def blocks_from_pages(self, pages: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Gera os parágrafos de cada página como blocos"""
+        for page_number, page_text in enumerate(pages, 1):
+            for paragraph in _PARAGRAPH_SEPARATOR.split(page_text or ""):
+                if paragraph.strip():
+                    yield make_block(paragraph, page=page_number if self.paged else None)
+
+    def iter_blocks(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Gera os blocos do documento (por padrão, os parágrafos de cada página)"""
+        return self.blocks_from_pages(self.iter_pages(file_path))
+
 class PDFExtractor(DocumentExtractor):
-    """Extrator para arquivos PDF"""
+    """
+    Extrator para arquivos PDF, com extração das páginas em paralelo
+
+    Os intervalos de páginas são enviados a um pool de processos criado uma única vez
+    e reaproveitado pelos documentos seguintes, ou ao executor informado (por exemplo,
+    o pool do pipeline de ingestão), que não é encerrado pelo extrator.
+    """
+    paged = True
+    version = f"1-pypdf2-{PyPDF2.__version__}"
+
+    def __init__(
+        self,
+        workers: int = settings.PDF_EXTRACTION_WORKERS,
+        pages_per_task: int = settings.PDF_PAGES_PER_TASK,
+        executor: Optional[Executor] = None
+    ):
+        # 0 usa todos os núcleos; 1 extrai as páginas no próprio processo
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
+        self.executor = executor
+        self._pool = None
+
+    def _get_executor(self) -> Executor:
+        """Retorna o executor das páginas, criando o pool próprio na primeira vez"""
+        if self.executor:
+            return self.executor
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        """Encerra o pool de processos próprio, se criado"""
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+
+    # Função executada nos processos do pool para extrair um intervalo de páginas
+    page_range_worker = staticmethod(_extract_pdf_pages)
+
+    def _iter_serial(self, file_path: str) -> Iterator[str]:
+        """Gera o texto de cada página no próprio processo, com um único leitor"""
+        with open(file_path, 'rb') as file:
+            for page in PyPDF2.PdfReader(file).pages:
+                yield page.extract_text() or ""
+
+    def _iter_page_texts(self, file_path: str) -> Iterator[str]:
+        """Gera o texto de cada página, na ordem, distribuindo intervalos de páginas entre processos"""
+        if self.workers > 1:
+            with open(file_path, 'rb') as file:
+                total_pages = len(PyPDF2.PdfReader(file).pages)
+        if self.workers <= 1 or total_pages <= self.pages_per_task:
+            yield from self._iter_serial(file_path)
+            return
+
+        ranges = [
+            (start, min(start + self.pages_per_task, total_pages))
+            for start in range(0, total_pages, self.pages_per_task)
+        ]
+
+        # Mantém poucos intervalos pendentes para não acumular o documento em memória
+        # quando o consumidor é mais lento que a extração
+        executor = self._get_executor()
+        pending = deque()
+        try:
+            remaining = iter(ranges)
+            for start, end in remaining:
+                pending.append(executor.submit(self.page_range_worker, file_path, start, end))
+                if len(pending) >= self.workers * 2:
+                    break
+            while pending:
+                pages = pending.popleft().result()
+                next_range = next(remaining, None)
+                if next_range:
+                    pending.append(executor.submit(self.page_range_worker, file_path, *next_range))
+                yield from pages
+        finally:
+            # Leitura interrompida: os intervalos ainda não iniciados são descartados
+            for future in pending:
+                future.cancel()
+
     def extract_text(self, file_path: str) -> str:
         logger.info(f"Extraindo texto do PDF: {file_path}")
         try:
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = ""
-                for i, page in enumerate(reader.pages):
-                    page_text = page.extract_text()
-                    if not page_text.strip():
-                        logger.warning(f"Página {i+1} do PDF está vazia ou ilegível")
-                        continue
-                    text += page_text + "\n"
-                    logger.info(f"Página {i+1} extraída com {len(page_text)} caracteres")
-                
-                final_text = text.strip()
-                if not final_text:
-                    raise ValueError("Nenhum texto legível foi extraído do PDF")
-                    
-                logger.info(f"PDF processado com {len(final_text)} caracteres totais")
-                return final_text
+            return self.text_from_pages(self.iter_pages(file_path))
         except Exception as e:
             logger.error(f"Erro ao extrair texto do PDF {file_path}: {str(e)}")
             raise
 
+    def text_from_pages(self, pages: Iterable[str]) -> str:
+        """Junta as páginas com texto, exigindo que ao menos uma seja legível"""
+        final_text = super().text_from_pages(pages)
+        if not final_text:
+            raise ValueError("Nenhum texto legível foi extraído do PDF")
+        logger.info(f"PDF processado com {len(final_text)} caracteres totais")
+        return final_text
+
+    def iter_pages(self, file_path: str) -> Iterator[str]:
+        """Gera o texto de cada página sem montar o documento inteiro em memória"""
+        logger.info(f"Extraindo páginas do PDF: {file_path}")
+        try:
+            start_time = time.perf_counter()
+            total_pages = 0
+            empty_pages = 0
+            for total_pages, page_text in enumerate(self._iter_page_texts(file_path), 1):
+                if not page_text.strip():
+                    empty_pages += 1
+                    logger.debug(f"Página {total_pages} do PDF está vazia ou ilegível")
+                else:
+                    logger.debug(f"Página {total_pages} extraída com {len(page_text)} caracteres")
+                # Páginas vazias também são emitidas para manter a numeração
+                yield page_text
+
+            elapsed = time.perf_counter() - start_time
+            if empty_pages:
+                logger.warning(f"{empty_pages} de {total_pages} páginas do PDF estão vazias ou ilegíveis")
+            logger.info(
+                f"{total_pages} páginas extraídas em {elapsed:.2f}s "
+                f"({total_pages / max(elapsed, 1e-9):.1f} páginas/s)"
+            )
+        except Exception as e:
+            logger.error(f"Erro ao extrair páginas do PDF {file_path}: {str(e)}")
+            raise
+
 class DOCXExtractor(DocumentExtractor):
-    """Extrator para arquivos DOCX"""
+    """
+    Extrator para arquivos DOCX
+
+    O XML do documento é lido em streaming (iterparse): cada parágrafo ou tabela do
+    corpo é processado e descartado em seguida, sem montar o documento inteiro em memória.
+    """
+    structured = True
+    version = f"2-python-docx-{docx.__version__}"
+
     def extract_text(self, file_path: str) -> str:
         logger.info(f"Extraindo texto do DOCX: {file_path}")
         try:
-            doc = Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
+            return self.text_from_pages(self.iter_pages(file_path))
         except Exception as e:
             logger.error(f"Erro ao extrair texto do DOCX {file_path}: {str(e)}")
             raise
 
+    def iter_pages(self, file_path: str) -> Iterator[str]:
+        """Gera o texto dos parágrafos do corpo, agrupado em blocos de até 1 MB"""
+        group = []
+        size = 0
+        for element in self._iter_body(file_path):
+            if element.tag != qn('w:p'):
+                continue
+            text = Paragraph(element, None).text
+            group.append(text)
+            size += len(text) + 1
+            if size >= _READ_BLOCK_SIZE:
+                yield "\n".join(group)
+                group, size = [], 0
+        if group:
+            yield "\n".join(group)
+
+    def _part_targets(self, archive: zipfile.ZipFile, rels_name: str, base: str) -> Dict[str, str]:
+        """Retorna o caminho no pacote de cada tipo de relação de um arquivo .rels"""
+        if rels_name not in archive.namelist():
+            return {}
+        targets = {}
+        for relationship in etree.fromstring(archive.read(rels_name)).iter(f"{_PACKAGE_RELS_NS}Relationship"):
+            target = relationship.get("Target", "")
+            path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+            targets.setdefault(relationship.get("Type", "").rsplit("/", 1)[-1], path)
+        return targets
+
+    def _open_parts(self, archive: zipfile.ZipFile) -> Tuple[str, Optional[str]]:
+        """Localiza o documento principal e a parte de estilos do pacote"""
+        main = self._part_targets(archive, "_rels/.rels", "").get(_OFFICE_DOCUMENT_REL, "word/document.xml")
+        directory, name = posixpath.split(main)
+        rels_name = posixpath.join(directory, "_rels", f"{name}.rels")
+        styles = self._part_targets(archive, rels_name, directory).get(_STYLES_REL)
+        return main, styles
+
+    def _style_names(self, archive: zipfile.ZipFile, styles_part: Optional[str]) -> Dict[str, str]:
+        """Mapeia o ID de cada estilo de parágrafo para o seu nome"""
+        if not styles_part or styles_part not in archive.namelist():
+            return {}
+        names = {}
+        for style in etree.fromstring(archive.read(styles_part)).iter(qn('w:style')):
+            name = style.find(qn('w:name'))
+            if name is not None:
+                names[style.get(qn('w:styleId'))] = name.get(qn('w:val'), "")
+        return names
+
+    def _iter_body(self, file_path: str, styles: Optional[Dict[str, str]] = None):
+        """
+        Gera os parágrafos e tabelas do corpo do documento, na ordem, como elementos
+        do python-docx; os já processados são descartados da árvore
+        """
+        with zipfile.ZipFile(file_path) as archive:
+            main, styles_part = self._open_parts(archive)
+            if styles is not None:
+                styles.update(self._style_names(archive, styles_part))
+            with archive.open(main) as xml:
+                for _, element in etree.iterparse(
+                    xml, events=("end",), tag=(qn('w:p'), qn('w:tbl')), huge_tree=True
+                ):
+                    body = element.getparent()
+                    if body is None or body.tag != qn('w:body'):
+                        continue
+                    yield parse_xml(etree.tostring(element))
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del body[0]
+
+    def _heading_level(self, style_name: str) -> Optional[int]:
+        """Retorna o nível do título para o nome do estilo, ou None se não for um título"""
+        style_name = (style_name or "").strip()
+        if style_name.lower() in _TITLE_STYLES:
+            return 1
+        match = _HEADING_STYLE.match(style_name)
+        if match:
+            return int(match.group(1) or 1)
+        return None
+
+    def _page_breaks(self, element, rendered: bool) -> Tuple[int, bool]:
+        """
+        Conta as quebras de página de um elemento do corpo do documento.
+
+        Returns:
+            Tupla (número de quebras, se a primeira ocorre antes de qualquer texto)
+        """
+        breaks = 0
+        leading = False
+        seen_text = False
+        for node in element.iter():
+            if node.tag == qn('w:t') and node.text and node.text.strip():
+                seen_text = True
+            elif (
+                (rendered and node.tag == qn('w:lastRenderedPageBreak'))
+                or (not rendered and node.tag == qn('w:br') and node.get(qn('w:type')) == 'page')
+            ):
+                if breaks == 0 and not seen_text:
+                    leading = True
+                breaks += 1
+        return breaks, leading
+
+    def _next_page(self, page: int, breaks: Tuple[int, bool]) -> Tuple[int, int]:
+        """Retorna (página do elemento, página após o elemento) a partir das suas quebras"""
+        count, leading = breaks
+        if leading:
+            return page + count, page + count
+        return page, page + count
+
+    def _table_text(self, table: Table) -> str:
+        """Converte uma tabela em texto, uma linha por linha da tabela"""
+        rows = []
+        for row in table.rows:
+            cells = []
+            for cell in row.cells:
+                cell_text = cell.text.strip()
+                # Células mescladas são repetidas pelo python-docx
+                if not cells or cells[-1] != cell_text:
+                    cells.append(cell_text)
+            if any(cells):
+                rows.append(" | ".join(cells))
+        return "\n".join(rows)
+
+    def iter_blocks(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Gera parágrafos, títulos e tabelas na ordem do documento, com página e seção"""
+        logger.info(f"Extraindo blocos do DOCX: {file_path}")
+        try:
+            # Quebras renderizadas pelo Word refletem a paginação real; até a primeira
+            # delas (ou em documentos sem elas), usa as quebras de página explícitas.
+            # As duas numerações são mantidas na mesma leitura do documento
+            styles = {}
+            headings = []
+            rendered_page = explicit_page = 1
+            for child in self._iter_body(file_path, styles):
+                if child.tag == qn('w:p'):
+                    block = Paragraph(child, None)
+                    text = block.text
+                    level = self._heading_level(styles.get(child.style, ""))
+                else:
+                    block = Table(child, None)
+                    text = self._table_text(block)
+                    level = None
+
+                rendered_block_page, rendered_page = self._next_page(
+                    rendered_page, self._page_breaks(child, rendered=True)
+                )
+                explicit_block_page, explicit_page = self._next_page(
+                    explicit_page, self._page_breaks(child, rendered=False)
+                )
+                block_page = rendered_block_page if rendered_page > 1 else explicit_block_page
+
+                if not text.strip():
+                    continue
+
+                if level is not None:
+                    headings = headings[:level - 1] + [text.strip()]
+                    yield make_block(text, block_page, headings, "heading")
+                elif isinstance(block, Table):
+                    yield make_block(text, block_page, headings, "table")
+                else:
+                    yield make_block(text, block_page, headings, "paragraph")
+        except Exception as e:
+            logger.error(f"Erro ao extrair blocos do DOCX {file_path}: {str(e)}")
+            raise
+
 class TXTExtractor(DocumentExtractor):
     """Extrator para arquivos TXT"""
     def extract_text(self, file_path: str) -> str:
         logger.info(f"Extraindo texto do TXT: {file_path}")
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read().strip()
+            return self.text_from_pages(self.iter_pages(file_path))
         except Exception as e:
             logger.error(f"Erro ao extrair texto do TXT {file_path}: {str(e)}")
             raise
 
+    def iter_pages(self, file_path: str) -> Iterator[str]:
+        """
+        Lê o arquivo em blocos e gera trechos terminados em fim de parágrafo
+
+        A quebra de linha que separa dois trechos não é incluída no segundo, pois
+        quem consome as páginas a recoloca ao juntá-las. Um texto sem quebras de linha
+        é cortado em um espaço em branco (que vira quebra de linha ao juntar as
+        páginas), nunca no meio de uma palavra.
+        """
+        with open(file_path, 'r', encoding='utf-8') as file:
+            buffer = ""
+            for block in iter(lambda: file.read(_READ_BLOCK_SIZE), ""):
+                buffer += block
+                cut = buffer.rfind("\n\n")
+                if cut != -1:
+                    yield buffer[:cut + 1]
+                    buffer = buffer[cut + 2:]
+                elif len(buffer) >= 4 * _READ_BLOCK_SIZE:
+                    # Sem parágrafos: corta na última linha ou no último espaço em branco;
+                    # sem nenhum deles, o texto segue para o próximo bloco
+                    cut = buffer.rfind("\n")
+                    if cut == -1:
+                        cut = max(buffer.rfind(char) for char in _WHITESPACE)
+                    if cut == -1:
+                        _check_memory(sys.getsizeof(buffer), f"Trecho sem espaços de {file_path}")
+                        continue
+                    yield buffer[:cut]
+                    buffer = buffer[cut + 1:]
+            if buffer:
+                yield buffer
+
+class PDFMinerExtractor(PDFExtractor):
+    """Extrator de PDF com pdfminer.six (análise de layout, em geral mais lento que o PyPDF2)"""
+    page_range_worker = staticmethod(_extract_pdfminer_pages)
+
+    @property
+    def version(self) -> str:
+        pdfminer, _, _ = _import_pdfminer()
+        return f"1-pdfminer-{pdfminer.__version__}"
+
+    def _iter_serial(self, file_path: str) -> Iterator[str]:
+        """Gera o texto de cada página no próprio processo"""
+        _, extract_pages, LTTextContainer = _import_pdfminer()
+        for layout in extract_pages(file_path):
+            yield "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+
+class DOCX2TxtExtractor(DocumentExtractor):
+    """Extrator de DOCX com docx2txt (mais rápido, sem títulos, tabelas estruturadas ou páginas)"""
+    @property
+    def version(self) -> str:
+        return f"1-docx2txt-{self._import().__version__}"
+
+    def _import(self):
+        """Importa o docx2txt apenas quando o backend é usado"""
+        try:
+            import docx2txt
+        except ImportError:
+            raise ImportError("Não foi possível importar docx2txt. Instale o pacote com: pip install docx2txt")
+        return docx2txt
+
+    def extract_text(self, file_path: str) -> str:
+        logger.info(f"Extraindo texto do DOCX com docx2txt: {file_path}")
+        try:
+            return self._import().process(file_path).strip()
+        except Exception as e:
+            logger.error(f"Erro ao extrair texto do DOCX {file_path}: {str(e)}")
+            raise
+
+# Backends de extração disponíveis por extensão; o primeiro de cada extensão é a referência
+EXTRACTOR_BACKENDS: Dict[str, Dict[str, type]] = {
+    '.pdf': {'pypdf2': PDFExtractor, 'pdfminer': PDFMinerExtractor},
+    '.docx': {'python-docx': DOCXExtractor, 'docx2txt': DOCX2TxtExtractor},
+    '.txt': {'text': TXTExtractor}
+}
+
+# Backends usados no modo auto: (arquivos pequenos, arquivos acima de EXTRACTOR_AUTO_THRESHOLD_MB)
+AUTO_BACKENDS: Dict[str, Tuple[str, str]] = {
+    '.pdf': ('pdfminer', 'pypdf2'),
+    '.docx': ('python-docx', 'docx2txt')
+}
+
+def register_extractor(extension: str, name: str, extractor_class: type):
+    """Registra um backend de extração para uma extensão de arquivo"""
+    EXTRACTOR_BACKENDS.setdefault(extension.lower(), {})[name] = extractor_class
+
 class DocumentProcessor:
     """Classe principal para processamento de documentos"""
-    def __init__(self):
-        self.extractors = {
-            '.pdf': PDFExtractor(),
-            '.docx': DOCXExtractor(),
-            '.txt': TXTExtractor()
-        }
+    def __init__(
+        self,
+        cache_dir: Optional[str] = settings.EXTRACTION_CACHE_DIR,
+        backends: Optional[Dict[str, str]] = None,
+        executor: Optional[Executor] = None
+    ):
+        # Backend por extensão: um nome registrado em EXTRACTOR_BACKENDS ou "auto"
+        self.backends = {'.pdf': settings.PDF_EXTRACTOR, '.docx': settings.DOCX_EXTRACTOR}
+        self.backends.update(backends or {})
+        for extension, name in self.backends.items():
+            available = EXTRACTOR_BACKENDS.get(extension, {})
+            if name != "auto" and name not in available:
+                raise ValueError(
+                    f"Backend de extração desconhecido para {extension}: {name}. "
+                    f"Disponíveis: auto, {', '.join(available)}"
+                )
+        
+        # Instâncias dos extratores, criadas sob demanda por (extensão, backend); os
+        # extratores de PDF usam o executor informado ou um pool próprio, reaproveitado
+        self.executor = executor
+        self.extractors: Dict[Tuple[str, str], DocumentExtractor] = {}
+        # Cache do texto extraído; um diretório vazio desativa o cache
+        self.cache = ExtractionCache(cache_dir) if cache_dir else None
     
-    def process_document(self, file_path: str) -> str:
-        """Processa um documento e retorna seu texto"""
+    def _get_extractor(self, file_path: str) -> DocumentExtractor:
+        """Retorna o extrator adequado à extensão do arquivo"""
         path = Path(file_path)
-        extractor = self.extractors.get(path.suffix.lower())
+        extension = path.suffix.lower()
+        available = EXTRACTOR_BACKENDS.get(extension)
         
-        if not extractor:
-            supported = ", ".join(self.extractors.keys())
+        if not available:
+            supported = ", ".join(EXTRACTOR_BACKENDS.keys())
             raise ValueError(
                 f"Formato de arquivo não suportado: {path.suffix}. "
                 f"Formatos suportados: {supported}"
             )
         
+        name = self.backends.get(extension, "auto")
+        if name == "auto":
+            if extension in AUTO_BACKENDS:
+                small, large = AUTO_BACKENDS[extension]
+                threshold = settings.EXTRACTOR_AUTO_THRESHOLD_MB * 1024 * 1024
+                name = large if path.stat().st_size > threshold else small
+            else:
+                name = next(iter(available))
+        
+        key = (extension, name)
+        if key not in self.extractors:
+            extractor_class = available[name]
+            if self.executor and issubclass(extractor_class, PDFExtractor):
+                self.extractors[key] = extractor_class(executor=self.executor)
+            else:
+                self.extractors[key] = extractor_class()
+            logger.debug(f"Backend de extração para {extension}: {name}")
+        return self.extractors[key]
+    
+    def _cached(self, file_path: str, kind: str, extractor: DocumentExtractor, extract) -> Iterator[str]:
+        """Lê as entradas extraídas do cache ou extrai o documento, gravando o resultado"""
+        if not self.cache:
+            return extract()
+        
+        content_hash = self.cache.hash_file(file_path)
+        cached = self.cache.get(content_hash, kind, extractor.version)
+        if cached is not None:
+            logger.info(f"Extração lida do cache: {file_path}")
+            return cached
+        return self.cache.store(content_hash, kind, extractor.version, extract())
+    
+    def _iter_pages(self, file_path: str, extractor: DocumentExtractor) -> Iterator[str]:
+        """Gera as páginas do documento, usando o cache quando disponível"""
+        return self._cached(file_path, "pages", extractor, lambda: extractor.iter_pages(file_path))
+    
+    def iter_pages(self, file_path: str) -> Iterator[str]:
+        """
+        Gera o texto do documento página a página, para chunking em streaming
+
+        Cada página é limitada por MAX_DOCUMENT_MEMORY_MB.
+        """
+        extractor = self._get_extractor(file_path)
+        logger.info(f"Iniciando processamento do documento em streaming: {file_path}")
+        return _limit_memory(self._iter_pages(file_path, extractor), file_path)
+    
+    def iter_blocks(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Gera os blocos estruturados do documento (página, seção e tipo de bloco)
+
+        Cada página e cada bloco são limitados por MAX_DOCUMENT_MEMORY_MB.
+        """
+        extractor = self._get_extractor(file_path)
+        logger.info(f"Iniciando extração estruturada do documento: {file_path}")
+        if not extractor.structured:
+            return extractor.blocks_from_pages(_limit_memory(self._iter_pages(file_path, extractor), file_path))
+        
+        blocks = self._cached(
+            file_path,
+            "blocks",
+            extractor,
+            lambda: (json.dumps(block, ensure_ascii=False) for block in extractor.iter_blocks(file_path))
+        )
+        return _limit_memory((json.loads(block) for block in blocks), file_path)
+    
+    def close(self):
+        """Libera os recursos dos extratores, como os pools de processos de PDF"""
+        for extractor in self.extractors.values():
+            extractor.close()
+
+    def process_document(self, file_path: str) -> str:
+        """Processa um documento e retorna seu texto"""
+        extractor = self._get_extractor(file_path)
+        
         logger.info(f"Iniciando processamento do documento: {file_path}")
         try:
-            text = extractor.extract_text(file_path)
+            text = extractor.text_from_pages(self._iter_pages(file_path, extractor))
             logger.info(
                 f"Documento processado com sucesso: {file_path}",
                 extra={"chars_extracted": len(text)}
@@ -1,67 +1,287 @@
 import os
 import json
+import time
+import sqlite3
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 import hashlib
+from ..core.config import settings
 from ..core.logging import logger
 
+# Tamanho dos blocos lidos ao calcular o hash dos arquivos
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+# Arquivos modificados há menos que isso não entram no cache de hashes: uma nova
+# escrita no mesmo instante poderia manter o tamanho e o mtime com outro conteúdo
+_HASH_CACHE_MIN_AGE_NS = 2 * 10**9
+
+_COLUMNS = (
+    "id", "filename", "file_type", "upload_date", "status", "size_bytes", "processed",
+    "embedding_count", "error_message", "mtime_ns", "content_hash"
+)
+
 class FileTracker:
-    def __init__(self):
+    """
+    Registro dos documentos em SQLite (modo WAL)
+
+    Cada operação lê ou grava apenas as linhas envolvidas, com índices por ID, nome do
+    arquivo, hash do conteúdo e status, e as gravações em lote ocorrem em uma única
+    transação. O WAL permite que a API, o monitor de arquivos e os workers leiam o
+    registro enquanto outro processo grava. Um documents/metadata.json de versões
+    anteriores é importado uma única vez.
+
+    Os hashes calculados ficam em cache por (caminho, tamanho, mtime_ns, inode):
+    verificar novamente um arquivo inalterado não lê o seu conteúdo, e arquivos com
+    o mesmo conteúdo podem ser localizados pelo hash.
+    """
+    def __init__(self, db_path: Optional[str] = None):
         self.documents_dir = Path("documents")
         self.metadata_file = self.documents_dir / "metadata.json"
+        self.db_path = db_path or settings.FILE_TRACKER_DB_PATH
         self._ensure_directories()
-        self._load_metadata()
+        # Compartilhado entre threads (chamadas via asyncio.to_thread), com acesso serializado
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL UNIQUE,
+                file_type TEXT,
+                upload_date TEXT,
+                status TEXT NOT NULL,
+                size_bytes INTEGER,
+                processed INTEGER NOT NULL DEFAULT 0,
+                embedding_count INTEGER,
+                error_message TEXT,
+                mtime_ns INTEGER,
+                content_hash TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_documents_content_hash ON documents (content_hash);
+            CREATE INDEX IF NOT EXISTS ix_documents_status ON documents (status);
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                file_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_file_hashes_content_hash ON file_hashes (content_hash);
+        """)
+        self._migrate_metadata_file()
 
     def _ensure_directories(self):
         """Garante que os diretórios necessários existam"""
         self.documents_dir.mkdir(exist_ok=True)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+    def _migrate_metadata_file(self):
+        """
+        Importa o metadata.json de versões anteriores e o renomeia para .migrated
+
+        A migração ocorre em uma transação exclusiva, com o arquivo renomeado antes do
+        commit: processos iniciados ao mesmo tempo esperam o primeiro terminar e não
+        encontram mais o arquivo.
+        """
         if not self.metadata_file.exists():
-            self._save_metadata({})
-
-    def _load_metadata(self) -> Dict:
-        """Carrega os metadados dos documentos"""
-        try:
-            with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Erro ao carregar metadados: {str(e)}")
-            return {}
-
-    def _save_metadata(self, metadata: Dict):
-        """Salva os metadados dos documentos"""
-        try:
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, default=str)
-        except Exception as e:
-            logger.error(f"Erro ao salvar metadados: {str(e)}")
-
-    def _generate_file_id(self, filename: str, content: bytes) -> str:
-        """Gera um ID único para o arquivo"""
-        hash_object = hashlib.sha256(content)
+            return
+
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if not self.metadata_file.exists():
+                    self.conn.rollback()
+                    return
+                try:
+                    with open(self.metadata_file, 'r', encoding='utf-8') as f:
+                        metadata = json.load(f)
+                except Exception as e:
+                    logger.error(f"Erro ao carregar metadados para migração: {str(e)}")
+                    self.conn.rollback()
+                    return
+
+                # Nomes repetidos no JSON: prevalece a última entrada
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO documents ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    [self._row_values(file_id, doc_data) for file_id, doc_data in metadata.items()]
+                )
+                self.metadata_file.rename(self.metadata_file.with_name(self.metadata_file.name + ".migrated"))
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        logger.info(f"{len(metadata)} documentos migrados de {self.metadata_file} para {self.db_path}")
+
+    def _row_values(self, file_id: str, doc_data: Dict) -> Tuple:
+        """Valores de uma linha da tabela documents, na ordem de _COLUMNS"""
+        return (
+            file_id,
+            doc_data["filename"],
+            doc_data.get("file_type"),
+            doc_data.get("upload_date"),
+            doc_data.get("status", "uploaded"),
+            doc_data.get("size_bytes"),
+            int(bool(doc_data.get("processed"))),
+            doc_data.get("embedding_count"),
+            doc_data.get("error_message"),
+            doc_data.get("mtime_ns"),
+            doc_data.get("content_hash")
+        )
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict:
+        """Converte uma linha em dicionário, com o ID"""
+        doc_data = dict(row)
+        doc_data["processed"] = bool(doc_data["processed"])
+        return doc_data
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        """Executa uma consulta e retorna as linhas como dicionários"""
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def _upsert(self, file_id: str, doc_data: Dict):
+        """Grava um documento, substituindo registros anteriores do mesmo arquivo (sem transação)"""
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO documents ({', '.join(_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+            self._row_values(file_id, doc_data)
+        )
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        self.conn.close()
+
+    def hash_file(self, filename: str, file_path: Path) -> Tuple[str, str]:
+        """
+        Retorna (hash do conteúdo, ID do arquivo)
+
+        Arquivos com tamanho, mtime e inode iguais aos do cache não são lidos; os
+        demais são lidos uma única vez, em blocos, e o resultado entra no cache.
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        # O ID inclui o nome do arquivo, então o cache só vale para o próprio nome
+        cacheable = filename == os.path.basename(path)
+        if cacheable:
+            with self._lock:
+                row = self.conn.execute(
+                    "SELECT content_hash, file_id FROM file_hashes "
+                    "WHERE path = ? AND size_bytes = ? AND mtime_ns = ? AND inode = ?",
+                    (path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+                ).fetchone()
+            if row:
+                return row["content_hash"], row["file_id"]
+
+        content_hash = hashlib.sha256()
+        hash_object = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+                content_hash.update(block)
+                hash_object.update(block)
         hash_object.update(filename.encode())
-        return hash_object.hexdigest()[:12]
-
-    def track_document(self, filename: str, file_path: Path, size_bytes: int) -> str:
-        """Registra um novo documento no sistema"""
-        metadata = self._load_metadata()
-        
-        with open(file_path, 'rb') as f:
-            content = f.read()
-            file_id = self._generate_file_id(filename, content)
-
-        metadata[file_id] = {
-            "filename": filename,
-            "file_type": file_path.suffix[1:],
-            "upload_date": datetime.now().isoformat(),
-            "status": "uploaded",
-            "size_bytes": size_bytes,
-            "processed": False,
-            "embedding_count": None,
-            "error_message": None
-        }
-
-        self._save_metadata(metadata)
+        content_hash, file_id = content_hash.hexdigest(), hash_object.hexdigest()[:12]
+        if cacheable:
+            self._cache_hash(path, stat, content_hash, file_id)
+        return content_hash, file_id
+
+    def remember_hash(self, file_path: Path, content_hash: str, file_id: str):
+        """
+        Registra no cache hashes calculados fora do FileTracker, a partir dos próprios
+        bytes gravados no arquivo (por exemplo, durante o upload)
+        """
+        path = os.path.abspath(file_path)
+        self._cache_hash(path, os.stat(path), content_hash, file_id, check_age=False)
+
+    def _cache_hash(
+        self,
+        path: str,
+        stat: os.stat_result,
+        content_hash: str,
+        file_id: str,
+        check_age: bool = True
+    ):
+        """Grava o hash de um arquivo no cache, exceto se ele acabou de ser modificado"""
+        if check_age and time.time_ns() - stat.st_mtime_ns < _HASH_CACHE_MIN_AGE_NS:
+            return
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO file_hashes "
+                    "(path, size_bytes, mtime_ns, inode, content_hash, file_id) VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime_ns, stat.st_ino, content_hash, file_id)
+                )
+
+    def find_files_by_hash(self, content_hash: str) -> List[str]:
+        """
+        Lista os arquivos em cache com o conteúdo informado
+
+        Somente arquivos que continuam com o mesmo tamanho, mtime e inode são
+        retornados; entradas de arquivos alterados ou removidos são descartadas.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path, size_bytes, mtime_ns, inode FROM file_hashes WHERE content_hash = ?",
+                (content_hash,)
+            ).fetchall()
+
+        paths, stale = [], []
+        for row in rows:
+            try:
+                stat = os.stat(row["path"])
+            except OSError:
+                stale.append(row["path"])
+                continue
+            if (stat.st_size, stat.st_mtime_ns, stat.st_ino) == (row["size_bytes"], row["mtime_ns"], row["inode"]):
+                paths.append(row["path"])
+            else:
+                stale.append(row["path"])
+        if stale:
+            with self._lock:
+                with self.conn:
+                    self.conn.executemany("DELETE FROM file_hashes WHERE path = ?", [(path,) for path in stale])
+        return paths
+
+    def _generate_file_id(self, filename: str, file_path: Path) -> str:
+        """Gera um ID único para o arquivo, lendo o conteúdo em blocos"""
+        return self.hash_file(filename, file_path)[1]
+
+    def track_document(
+        self,
+        filename: str,
+        file_path: Path,
+        size_bytes: int,
+        file_id: Optional[str] = None,
+        content_hash: Optional[str] = None
+    ) -> str:
+        """
+        Registra um novo documento no sistema
+
+        file_id e content_hash podem ser informados quando já calculados (por exemplo,
+        durante o upload), evitando ler o arquivo novamente. Um registro anterior com o
+        mesmo nome de arquivo é substituído, pois o arquivo foi sobrescrito.
+        """
+        if file_id is None:
+            content_hash, file_id = self.hash_file(filename, file_path)
+
+        with self._lock:
+            with self.conn:
+                self._upsert(file_id, {
+                    "filename": filename,
+                    "file_type": file_path.suffix[1:],
+                    "upload_date": datetime.now().isoformat(),
+                    "status": "uploaded",
+                    "size_bytes": size_bytes,
+                    "processed": False,
+                    "embedding_count": None,
+                    "error_message": None,
+                    "content_hash": content_hash
+                })
         return file_id
 
     def update_document_status(
@@ -73,54 +293,108 @@ class FileTracker:
         error_message: Optional[str] = None
     ):
         """Atualiza o status de processamento de um documento"""
-        metadata = self._load_metadata()
-        
-        if file_id not in metadata:
+        with self._lock:
+            with self.conn:
+                cursor = self.conn.execute(
+                    "UPDATE documents SET status = ?, processed = ?, embedding_count = ?, "
+                    "error_message = ? WHERE id = ?",
+                    (status, int(processed), embedding_count, error_message, file_id)
+                )
+        if not cursor.rowcount:
             raise ValueError(f"Documento não encontrado: {file_id}")
 
-        metadata[file_id].update({
-            "status": status,
-            "processed": processed,
-            "embedding_count": embedding_count,
-            "error_message": error_message
-        })
-
-        self._save_metadata(metadata)
-
     def get_document(self, file_id: str) -> Dict:
         """Obtém informações de um documento específico"""
-        metadata = self._load_metadata()
-        return metadata.get(file_id)
+        documents = self._query("SELECT * FROM documents WHERE id = ?", (file_id,))
+        if not documents:
+            return None
+        doc_data = documents[0]
+        del doc_data["id"]
+        return doc_data
+
+    def find_by_content_hash(self, content_hash: str) -> Optional[Dict]:
+        """Retorna um documento registrado com o mesmo conteúdo, se houver"""
+        documents = self._query(
+            "SELECT * FROM documents WHERE content_hash = ? LIMIT 1", (content_hash,)
+        )
+        return documents[0] if documents else None
+
+    def find_by_filename(self, filename: str) -> Optional[Dict]:
+        """Retorna o documento registrado para um nome de arquivo, se houver"""
+        documents = self._query("SELECT * FROM documents WHERE filename = ?", (filename,))
+        return documents[0] if documents else None
+
+    def get_documents_by_status(self, status: str) -> List[Dict]:
+        """Lista os documentos com um determinado status"""
+        return self._query(
+            "SELECT * FROM documents WHERE status = ? ORDER BY upload_date, id", (status,)
+        )
 
     def get_all_documents(self) -> List[Dict]:
         """Lista todos os documentos registrados"""
-        metadata = self._load_metadata()
-        return [
-            {"id": file_id, **doc_data}
-            for file_id, doc_data in metadata.items()
-        ]
+        return self._query("SELECT * FROM documents ORDER BY upload_date, id")
 
     def remove_document(self, file_id: str) -> bool:
         """Remove um documento do sistema"""
-        metadata = self._load_metadata()
-        
-        if file_id not in metadata:
+        document = self.get_document(file_id)
+        if document is None:
             return False
 
         # Remove o arquivo físico se existir
-        filename = metadata[file_id]["filename"]
-        file_path = self.documents_dir / filename
+        file_path = self.documents_dir / document["filename"]
         if file_path.exists():
             file_path.unlink()
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM file_hashes WHERE path = ?", (os.path.abspath(file_path),))
 
-        # Remove dos metadados
-        del metadata[file_id]
-        self._save_metadata(metadata)
+        # Remove do registro
+        self.forget_documents([file_id])
         return True
 
+    def get_ingestion_state(self) -> Dict[str, Dict]:
+        """Retorna os documentos registrados indexados pelo nome do arquivo, com uma única consulta"""
+        return {document["filename"]: document for document in self.get_all_documents()}
+
+    def record_ingestions(self, records: List[Dict]):
+        """
+        Registra documentos ingeridos, com tamanho, mtime e hash do conteúdo
+
+        Cada registro substitui as entradas anteriores do mesmo arquivo, cujo ID muda
+        quando o conteúdo muda. Todos os registros são gravados em uma única transação.
+        """
+        if not records:
+            return
+        with self._lock:
+            with self.conn:
+                for record in records:
+                    previous = self.conn.execute(
+                        "SELECT upload_date FROM documents WHERE id = ? OR filename = ?",
+                        (record["file_id"], record["filename"])
+                    ).fetchone()
+                    self._upsert(record["file_id"], {
+                        "filename": record["filename"],
+                        "file_type": Path(record["filename"]).suffix[1:],
+                        "upload_date": previous["upload_date"] if previous else datetime.now().isoformat(),
+                        "status": "processed",
+                        "size_bytes": record["size_bytes"],
+                        "processed": True,
+                        "embedding_count": record.get("embedding_count"),
+                        "error_message": None,
+                        "mtime_ns": record["mtime_ns"],
+                        "content_hash": record["content_hash"]
+                    })
+
+    def forget_documents(self, file_ids: List[str]):
+        """Remove documentos do registro sem apagar arquivos"""
+        with self._lock:
+            with self.conn:
+                self.conn.executemany(
+                    "DELETE FROM documents WHERE id = ?", [(file_id,) for file_id in file_ids]
+                )
+
     def get_processing_status(self, file_id: str) -> str:
         """Obtém o status de processamento de um documento"""
-        metadata = self._load_metadata()
-        if file_id in metadata:
-            return metadata[file_id]["status"]
-        return "not_found" 
\ No newline at end of file
+        with self._lock:
+            row = self.conn.execute("SELECT status FROM documents WHERE id = ?", (file_id,)).fetchone()
+        return row["status"] if row else "not_found"
@@ -1,46 +1,160 @@
-import time
+import os
+import asyncio
+import threading
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from pathlib import Path
-from typing import Callable
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+from ..core.config import settings
 from ..core.logging import logger
 from .extractors import DocumentProcessor
 from .chunking import TextChunker
+from .pipeline import IngestionPipeline
 
 class DocumentHandler(FileSystemEventHandler):
+    """
+    Envia ao pipeline de ingestão os arquivos criados, modificados ou movidos para o diretório
+
+    Os eventos de um mesmo arquivo são agrupados: o arquivo só é enviado depois de
+    debounce segundos sem novos eventos e quando seu tamanho para de mudar, evitando
+    processar arquivos ainda em cópia. Eventos recebidos enquanto o arquivo está no
+    pipeline geram um único reprocessamento ao final.
+
+    Com um FileTracker, arquivos já registrados com o mesmo conteúdo (por exemplo,
+    uploads da API, ingeridos pelos workers de ingestão) são ignorados, e os arquivos
+    ingeridos com sucesso são registrados.
+
+    Os eventos chegam na thread do observador e são repassados ao event loop do
+    pipeline; todo o estado do handler é manipulado apenas nesse loop.
+    """
     def __init__(
         self,
-        processor: DocumentProcessor,
-        chunker: TextChunker,
-        on_chunks_ready: Callable[[str, list[str]], None]
+        pipeline: IngestionPipeline,
+        loop: asyncio.AbstractEventLoop,
+        supported_extensions: Optional[Iterable[str]] = None,
+        debounce: float = settings.WATCHER_DEBOUNCE_SECONDS,
+        size_check_interval: float = settings.WATCHER_SIZE_CHECK_SECONDS,
+        file_tracker=None
     ):
-        self.processor = processor
-        self.chunker = chunker
-        self.on_chunks_ready = on_chunks_ready
-        self.supported_extensions = {'.pdf', '.docx'}
-    
+        self.pipeline = pipeline
+        self.file_tracker = file_tracker
+        self.loop = loop
+        self.supported_extensions = set(supported_extensions or {'.pdf', '.docx'})
+        self.debounce = debounce
+        self.size_check_interval = size_check_interval
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._rerun: Set[str] = set()
+
     def on_created(self, event):
+        self._schedule(event, event.src_path)
+
+    def on_modified(self, event):
+        self._schedule(event, event.src_path)
+
+    def on_moved(self, event):
+        self._schedule(event, event.dest_path)
+
+    def _schedule(self, event, path: str):
+        """Repassa o evento ao event loop (executado na thread do observador)"""
         if event.is_directory:
             return
-            
-        file_path = Path(event.src_path)
-        if file_path.suffix.lower() not in self.supported_extensions:
+
+        if Path(path).suffix.lower() not in self.supported_extensions:
+            logger.debug(f"Arquivo ignorado (formato não suportado): {path}")
+            return
+
+        self.loop.call_soon_threadsafe(self._debounce, str(path))
+
+    def _debounce(self, path: str):
+        """Reinicia a espera do arquivo a cada novo evento"""
+        timer = self._timers.pop(path, None)
+        if timer:
+            timer.cancel()
+        self._timers[path] = self.loop.call_later(self.debounce, self._dispatch, path)
+
+    def _dispatch(self, path: str):
+        """Envia o arquivo ao pipeline, ou agenda um reprocessamento se ele já estiver lá"""
+        del self._timers[path]
+        if path in self._in_flight:
+            self._rerun.add(path)
             return
-            
-        logger.info(f"Novo arquivo detectado: {file_path}")
-        
+        self._in_flight[path] = self.loop.create_task(self._process(path))
+
+    async def _wait_until_stable(self, path: str) -> bool:
+        """Aguarda o tamanho do arquivo parar de mudar; retorna False se ele deixar de existir"""
+        size = None
+        while True:
+            try:
+                current = os.stat(path).st_size
+            except FileNotFoundError:
+                return False
+            if current == size:
+                return True
+            size = current
+            await asyncio.sleep(self.size_check_interval)
+
+    def _check_tracked(self, path: str) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Retorna se o arquivo já está registrado no FileTracker com o mesmo conteúdo e o
+        registro da ingestão do arquivo (executado em uma thread)
+        """
+        filename = os.path.basename(path)
+        stat = os.stat(path)
+        content_hash, file_id = self.file_tracker.hash_file(filename, Path(path))
+        document = self.file_tracker.find_by_filename(filename)
+        tracked = (
+            document is not None
+            and document["content_hash"] == content_hash
+            and document["status"] != "error"
+        )
+        return tracked, {
+            "filename": filename,
+            "file_path": path,
+            "file_id": file_id,
+            "size_bytes": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "content_hash": content_hash
+        }
+
+    async def _process(self, path: str):
+        """Processa um arquivo no pipeline e, se houver novos eventos, o reprocessa"""
         try:
-            # Processa o documento
-            text = self.processor.process_document(str(file_path))
-            
-            # Cria chunks do texto
-            chunks = self.chunker.create_chunks(text)
-            
-            # Notifica que os chunks estão prontos
-            self.on_chunks_ready(str(file_path), chunks)
-            
+            while True:
+                if not await self._wait_until_stable(path):
+                    logger.info(f"Arquivo removido antes do processamento: {path}")
+                    return
+
+                # Eventos recebidos durante a espera já estão cobertos por este processamento
+                self._rerun.discard(path)
+                tracked, record = False, None
+                if self.file_tracker:
+                    tracked, record = await asyncio.to_thread(self._check_tracked, path)
+
+                if tracked:
+                    logger.info(f"Arquivo já registrado com o mesmo conteúdo, ignorado: {path}")
+                else:
+                    logger.info(f"Novo arquivo detectado: {path}")
+                    result = await (await self.pipeline.submit(path))
+                    if record and result["success"]:
+                        record["embedding_count"] = result["chunks"] - result["duplicates"]
+                        await asyncio.to_thread(self.file_tracker.record_ingestions, [record])
+
+                if path not in self._rerun:
+                    return
         except Exception as e:
-            logger.error(f"Erro ao processar arquivo {file_path}: {str(e)}")
+            logger.error(f"Erro ao processar arquivo {path}: {str(e)}")
+        finally:
+            del self._in_flight[path]
+
+    async def drain(self):
+        """Descarta os eventos ainda em espera e aguarda os arquivos em processamento"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._rerun.clear()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight.values())
 
 class FileWatcher:
     def __init__(
@@ -51,17 +165,32 @@ class FileWatcher:
         on_chunks_ready: Callable[[str, list[str]], None]
     ):
         self.watch_path = watch_path
-        self.event_handler = DocumentHandler(processor, chunker, on_chunks_ready)
+        # Os documentos são processados pelo pipeline de ingestão em um event loop próprio,
+        # para não bloquear a thread do observador
+        self.pipeline = IngestionPipeline(
+            document_processor=processor,
+            chunker=chunker,
+            on_chunks_ready=on_chunks_ready
+        )
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.event_handler = DocumentHandler(self.pipeline, self.loop)
         self.observer = Observer()
-    
+
     def start(self):
         """Inicia o monitoramento do diretório"""
         logger.info(f"Iniciando monitoramento do diretório: {self.watch_path}")
+        self.loop_thread.start()
+        asyncio.run_coroutine_threadsafe(self.pipeline.start(), self.loop).result()
         self.observer.schedule(self.event_handler, self.watch_path, recursive=False)
         self.observer.start()
-        
+
     def stop(self):
-        """Para o monitoramento"""
+        """Para o monitoramento, concluindo os documentos já enfileirados"""
         logger.info("Parando monitoramento de arquivos")
         self.observer.stop()
-        self.observer.join() 
\ No newline at end of file
+        self.observer.join()
+        asyncio.run_coroutine_threadsafe(self.event_handler.drain(), self.loop).result()
+        asyncio.run_coroutine_threadsafe(self.pipeline.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
@@ -0,0 +1,491 @@
+import os
+import json
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, exists, or_, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import aliased, sessionmaker
+from ..core.config import settings
+from ..core.logging import logger
+from .pipeline import IngestionPipeline, PRIORITY_BACKFILL
+
+# Base própria, para que a fila possa ser usada sem carregar os modelos de conversas
+JobBase = declarative_base()
+
+# Arquivo que identifica um diretório de estado da ingestão (manifestos, deduplicação, checkpoints)
+STATE_MARKER = ".ingestion_state_id"
+
+class IngestionJob(JobBase):
+    """Modelo para jobs de ingestão de documentos"""
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True)
+    file_path = Column(String(1024), nullable=False)
+    document_id = Column(String(64), nullable=True)  # ID do documento no FileTracker
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done ou failed
+    priority = Column(Integer, nullable=False, default=PRIORITY_BACKFILL)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    worker_id = Column(String(255), nullable=True)
+    progress = Column(Text, nullable=True)  # JSON com o andamento no pipeline
+    result = Column(Text, nullable=True)  # JSON com o resumo do processamento
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    available_at = Column(DateTime, default=datetime.utcnow)  # adiado entre tentativas
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_ingestion_jobs_claim", "status", "priority", "available_at"),
+        # Um único job em execução por arquivo, mesmo com workers obtendo jobs ao mesmo tempo
+        Index(
+            "ux_ingestion_jobs_running_file", "file_path", unique=True,
+            postgresql_where=text("status = 'running'"),
+            sqlite_where=text("status = 'running'")
+        ),
+    )
+
+class IngestionState(JobBase):
+    """Modelo para os diretórios de estado da ingestão compartilhados pelos workers"""
+    __tablename__ = "ingestion_state"
+
+    name = Column(String(64), primary_key=True)  # chunk_manifests, dedup_index ou checkpoints
+    marker = Column(String(64), nullable=False)  # conteúdo do arquivo STATE_MARKER do diretório
+    directory = Column(String(1024), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+def _state_marker(directory: str) -> str:
+    """Lê o identificador do diretório de estado, criando-o se ainda não existir"""
+    path = Path(directory) / STATE_MARKER
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(path, 'x', encoding='utf-8') as f:
+            marker = uuid.uuid4().hex
+            f.write(marker)
+            return marker
+    except FileExistsError:
+        return path.read_text(encoding='utf-8').strip()
+
+class JobQueue:
+    """
+    Fila persistente de jobs de ingestão no banco de dados (Postgres)
+
+    Os workers obtêm jobs com SELECT ... FOR UPDATE SKIP LOCKED: cada job é entregue
+    a um único worker, sem que os workers esperem uns pelos outros, de modo que a
+    ingestão escala com mais processos ou máquinas apontando para o mesmo banco.
+
+    Os workers enviam heartbeats com o andamento dos jobs em execução; jobs sem
+    heartbeat há mais de stale_seconds (worker encerrado ou máquina perdida) voltam
+    para a fila. Jobs com falha são tentados novamente após retry_delay segundos,
+    multiplicados pelo número de tentativas, até max_attempts.
+
+    Um arquivo tem no máximo um job na fila e um em execução: enqueue reaproveita o
+    job ainda na fila, e claim não entrega jobs de arquivos que já estão em execução.
+    """
+    def __init__(
+        self,
+        engine=None,
+        max_attempts: int = settings.JOB_MAX_ATTEMPTS,
+        retry_delay: float = settings.JOB_RETRY_DELAY_SECONDS,
+        stale_seconds: float = settings.JOB_STALE_SECONDS
+    ):
+        if engine is None:
+            from ..chat.database import engine
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine, expire_on_commit=False)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stale_seconds = stale_seconds
+        JobBase.metadata.create_all(bind=engine)
+        # Índices adicionados depois da criação da tabela em bancos existentes
+        for index in IngestionJob.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    def _to_dict(self, job: IngestionJob) -> Dict[str, Any]:
+        """Converte um job em dicionário"""
+        return {
+            "id": job.id,
+            "file_path": job.file_path,
+            "document_id": job.document_id,
+            "status": job.status,
+            "priority": job.priority,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "worker_id": job.worker_id,
+            "progress": json.loads(job.progress) if job.progress else None,
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.error,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "heartbeat_at": job.heartbeat_at,
+            "finished_at": job.finished_at
+        }
+
+    def enqueue(
+        self,
+        file_path: str,
+        document_id: Optional[str] = None,
+        priority: int = PRIORITY_BACKFILL
+    ) -> int:
+        """
+        Registra um documento para ingestão e retorna o ID do job
+
+        Se o arquivo já tiver um job na fila, ele é reaproveitado, com a maior das
+        prioridades e as tentativas zeradas, pois o arquivo pode ter mudado.
+        """
+        now = datetime.utcnow()
+        with self.Session.begin() as session:
+            job = (
+                session.query(IngestionJob)
+                .filter(IngestionJob.file_path == str(file_path), IngestionJob.status == "queued")
+                .order_by(IngestionJob.id)
+                .with_for_update()
+                .first()
+            )
+            if job is not None:
+                job.document_id = document_id or job.document_id
+                job.priority = min(job.priority, priority)
+                job.attempts = 0
+                job.available_at = now
+                logger.info(f"Job de ingestão {job.id} já estava na fila: {file_path}")
+                return job.id
+
+            job = IngestionJob(
+                file_path=str(file_path),
+                document_id=document_id,
+                status="queued",
+                priority=priority,
+                attempts=0,
+                max_attempts=self.max_attempts,
+                created_at=now,
+                available_at=now
+            )
+            session.add(job)
+            session.flush()
+            logger.info(f"Job de ingestão {job.id} criado: {file_path}")
+            return job.id
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Obtém um job pelo ID"""
+        with self.Session() as session:
+            job = session.get(IngestionJob, job_id)
+            return self._to_dict(job) if job else None
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Reserva o próximo job disponível para o worker, ou retorna None se não houver
+
+        Jobs de arquivos com outro job em execução ficam na fila; se dois workers
+        reservarem ao mesmo tempo jobs do mesmo arquivo, o índice único de jobs em
+        execução rejeita o segundo, que tenta novamente na próxima consulta.
+        """
+        now = datetime.utcnow()
+        running = aliased(IngestionJob)
+        try:
+            with self.Session.begin() as session:
+                job = (
+                    session.query(IngestionJob)
+                    .filter(
+                        IngestionJob.status == "queued",
+                        IngestionJob.available_at <= now,
+                        ~exists().where(
+                            running.file_path == IngestionJob.file_path,
+                            running.status == "running"
+                        )
+                    )
+                    .order_by(IngestionJob.priority, IngestionJob.id)
+                    .with_for_update(skip_locked=True, of=IngestionJob)
+                    .first()
+                )
+                if job is None:
+                    return None
+                job.status = "running"
+                job.worker_id = worker_id
+                job.attempts += 1
+                job.started_at = now
+                job.heartbeat_at = now
+                job.progress = None
+                claimed = self._to_dict(job)
+        except IntegrityError:
+            logger.info("Arquivo já em execução em outro worker; o job fica na fila")
+            return None
+        return claimed
+
+    def check_shared_state(self, directories: Dict[str, str]):
+        """
+        Verifica se os diretórios de estado da ingestão são os mesmos dos outros workers
+
+        Manifestos de chunks, o índice de deduplicação e os checkpoints ficam em disco e
+        precisam ser compartilhados por todos os workers (por exemplo, o mesmo volume
+        data/ montado em todas as máquinas): um worker com cópias locais não exclui os
+        vetores antigos dos documentos nem encontra as duplicatas já armazenadas. O
+        primeiro worker registra no banco o identificador de cada diretório (arquivo
+        STATE_MARKER); os demais só iniciam se encontrarem o mesmo identificador.
+        """
+        for name, directory in directories.items():
+            marker = _state_marker(directory)
+            try:
+                with self.Session.begin() as session:
+                    if session.get(IngestionState, name) is None:
+                        session.add(IngestionState(
+                            name=name, marker=marker, directory=str(directory), created_at=datetime.utcnow()
+                        ))
+            except IntegrityError:
+                # Registrado ao mesmo tempo por outro worker
+                pass
+            with self.Session() as session:
+                state = session.get(IngestionState, name)
+            if state.marker != marker:
+                raise ValueError(
+                    f"Diretório de estado da ingestão não compartilhado ({name}): {directory} não é o "
+                    f"diretório registrado pelos outros workers ({state.directory}). Monte o mesmo "
+                    f"diretório em todas as máquinas, ou remova o registro '{name}' da tabela "
+                    f"{IngestionState.__tablename__} para recomeçar com um estado novo."
+                )
+
+    def heartbeat(self, worker_id: str, progress: Dict[int, Optional[Dict[str, Any]]]) -> int:
+        """
+        Registra o heartbeat e o andamento dos jobs em execução no worker
+
+        Retorna quantos jobs ainda pertencem ao worker; jobs devolvidos à fila por
+        falta de heartbeat não são atualizados.
+        """
+        now = datetime.utcnow()
+        updated = 0
+        with self.Session.begin() as session:
+            for job_id, job_progress in progress.items():
+                values = {"heartbeat_at": now}
+                if job_progress is not None:
+                    values["progress"] = json.dumps(job_progress)
+                updated += session.query(IngestionJob).filter(
+                    IngestionJob.id == job_id,
+                    IngestionJob.worker_id == worker_id,
+                    IngestionJob.status == "running"
+                ).update(values, synchronize_session=False)
+        return updated
+
+    def complete(self, job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Marca o job como concluído; retorna False se ele não pertencer mais ao worker"""
+        with self.Session.begin() as session:
+            return bool(session.query(IngestionJob).filter(
+                IngestionJob.id == job_id,
+                IngestionJob.worker_id == worker_id,
+                IngestionJob.status == "running"
+            ).update({
+                "status": "done",
+                "result": json.dumps(result),
+                "error": None,
+                "finished_at": datetime.utcnow()
+            }, synchronize_session=False))
+
+    def fail(self, job_id: int, worker_id: str, error: str, result: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Registra a falha de uma tentativa: o job volta à fila com atraso crescente ou,
+        esgotadas as tentativas, é marcado como falho
+
+        Retorna o novo status, ou None se o job não pertencer mais ao worker.
+        """
+        now = datetime.utcnow()
+        with self.Session.begin() as session:
+            job = (
+                session.query(IngestionJob)
+                .filter(
+                    IngestionJob.id == job_id,
+                    IngestionJob.worker_id == worker_id,
+                    IngestionJob.status == "running"
+                )
+                .with_for_update()
+                .first()
+            )
+            if job is None:
+                return None
+            job.error = error
+            job.result = json.dumps(result) if result else None
+            if job.attempts < job.max_attempts:
+                job.status = "queued"
+                job.available_at = now + timedelta(seconds=self.retry_delay * job.attempts)
+                logger.warning(
+                    f"Job de ingestão {job_id} falhou (tentativa {job.attempts}/{job.max_attempts}), "
+                    f"nova tentativa agendada: {error}"
+                )
+            else:
+                job.status = "failed"
+                job.finished_at = now
+                logger.error(f"Job de ingestão {job_id} falhou após {job.attempts} tentativas: {error}")
+            return job.status
+
+    def requeue_stale(self) -> int:
+        """Devolve à fila os jobs em execução sem heartbeat recente e retorna quantos eram"""
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.stale_seconds)
+        error = "Worker sem heartbeat"
+        with self.Session.begin() as session:
+            stale = session.query(IngestionJob).filter(
+                IngestionJob.status == "running",
+                or_(IngestionJob.heartbeat_at.is_(None), IngestionJob.heartbeat_at < cutoff)
+            )
+            failed = stale.filter(IngestionJob.attempts >= IngestionJob.max_attempts).update(
+                {"status": "failed", "error": error, "finished_at": now},
+                synchronize_session=False
+            )
+            requeued = stale.filter(IngestionJob.attempts < IngestionJob.max_attempts).update(
+                {"status": "queued", "error": error, "available_at": now},
+                synchronize_session=False
+            )
+        if failed or requeued:
+            logger.warning(f"Jobs sem heartbeat: {requeued} devolvidos à fila, {failed} marcados como falhos")
+        return failed + requeued
+
+class JobWorker:
+    """
+    Worker que processa os jobs da fila no pipeline de ingestão
+
+    Mantém até concurrency jobs em execução no pipeline, envia heartbeats com o
+    andamento de cada um a cada heartbeat_interval segundos e atualiza o status dos
+    documentos no FileTracker ao fim de cada job. Vários workers podem rodar em
+    processos ou máquinas diferentes, desde que acessem o mesmo banco, o mesmo
+    diretório de documentos e os mesmos diretórios de estado da ingestão, verificados
+    ao iniciar (JobQueue.check_shared_state).
+    """
+    def __init__(
+        self,
+        queue: JobQueue,
+        pipeline: IngestionPipeline,
+        file_tracker=None,
+        worker_id: Optional[str] = None,
+        concurrency: int = settings.JOB_WORKER_CONCURRENCY,
+        poll_interval: float = settings.JOB_POLL_INTERVAL_SECONDS,
+        heartbeat_interval: float = settings.JOB_HEARTBEAT_SECONDS
+    ):
+        self.queue = queue
+        self.pipeline = pipeline
+        self.file_tracker = file_tracker
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._running: Dict[int, asyncio.Future] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._stop = None
+
+    def stop(self):
+        """Solicita o encerramento: o worker para de obter jobs e conclui os em execução"""
+        if self._stop:
+            self._stop.set()
+
+    async def run(self, drain: bool = False):
+        """
+        Processa jobs até stop ser chamado
+
+        Com drain, o worker termina quando a fila não tiver mais jobs disponíveis e
+        os jobs em execução tiverem sido concluídos.
+        """
+        self._stop = asyncio.Event()
+        await asyncio.to_thread(self.queue.check_shared_state, self._state_directories())
+        await self.pipeline.start()
+        heartbeat = asyncio.create_task(self._heartbeat_periodically())
+        logger.info(f"Worker de ingestão {self.worker_id} iniciado (concorrência {self.concurrency})")
+        try:
+            while not self._stop.is_set():
+                if len(self._tasks) >= self.concurrency:
+                    await self._wait_for_work()
+                    continue
+
+                job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+                if job is None:
+                    if drain and not self._tasks:
+                        break
+                    await self._wait_for_work()
+                    continue
+
+                logger.info(f"Job de ingestão {job['id']} iniciado: {job['file_path']}")
+                future = await self.pipeline.submit(job["file_path"], priority=job["priority"])
+                self._running[job["id"]] = future
+                self._tasks[job["id"]] = asyncio.create_task(self._finish(job, future))
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks.values())
+            heartbeat.cancel()
+            await self.pipeline.close()
+            logger.info(f"Worker de ingestão {self.worker_id} encerrado")
+
+    def _state_directories(self) -> Dict[str, str]:
+        """Diretórios do estado em disco usado pelo pipeline, que precisam ser compartilhados"""
+        directories = {}
+        if self.pipeline.manifest:
+            directories["chunk_manifests"] = str(self.pipeline.manifest.manifest_dir)
+        if self.pipeline.dedup_index:
+            directories["dedup_index"] = str(Path(self.pipeline.dedup_index.db_path).parent)
+        if self.pipeline.checkpoints:
+            directories["checkpoints"] = str(Path(self.pipeline.checkpoints.db_path).parent)
+        return directories
+
+    async def _wait_for_work(self):
+        """Aguarda o intervalo de consulta, a conclusão de um job ou o encerramento"""
+        waiters = [asyncio.create_task(self._stop.wait()), *self._tasks.values()]
+        await asyncio.wait(waiters, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+        waiters[0].cancel()
+
+    async def _heartbeat_periodically(self):
+        """Envia heartbeats dos jobs em execução e devolve à fila os jobs abandonados"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._heartbeat()
+                await asyncio.to_thread(self.queue.requeue_stale)
+            except Exception as e:
+                logger.error(f"Erro ao enviar heartbeat: {str(e)}")
+
+    async def _heartbeat(self):
+        """Envia o heartbeat e o andamento dos jobs em execução"""
+        progress = {job_id: self.pipeline.progress(future) for job_id, future in self._running.items()}
+        if progress:
+            owned = await asyncio.to_thread(self.queue.heartbeat, self.worker_id, progress)
+            if owned < len(progress):
+                logger.warning(f"{len(progress) - owned} jobs deste worker foram devolvidos à fila")
+
+    async def _finish(self, job: Dict[str, Any], future: asyncio.Future):
+        """Registra o resultado de um job ao fim do processamento"""
+        try:
+            result = await future
+            if result["success"]:
+                await asyncio.to_thread(self.queue.complete, job["id"], self.worker_id, result)
+                logger.info(f"Job de ingestão {job['id']} concluído: {job['file_path']}")
+                status = "done"
+            else:
+                status = await asyncio.to_thread(
+                    self.queue.fail, job["id"], self.worker_id, result["error"], result
+                )
+            if self.file_tracker and job["document_id"]:
+                await asyncio.to_thread(self._update_document, job["document_id"], status, result)
+        except Exception as e:
+            logger.error(f"Erro ao registrar o resultado do job {job['id']}: {str(e)}")
+        finally:
+            self._running.pop(job["id"], None)
+            self._tasks.pop(job["id"], None)
+
+    def _update_document(self, document_id: str, status: Optional[str], result: Dict[str, Any]):
+        """Atualiza o status do documento no FileTracker; falhas com nova tentativa não mudam o status"""
+        try:
+            if status == "done":
+                self.file_tracker.update_document_status(
+                    document_id,
+                    status="processed",
+                    processed=True,
+                    embedding_count=result["chunks"] - result["duplicates"]
+                )
+            elif status == "failed":
+                self.file_tracker.update_document_status(
+                    document_id,
+                    status="error",
+                    processed=False,
+                    error_message=result["error"]
+                )
+        except ValueError as e:
+            logger.warning(f"Status do documento não atualizado: {str(e)}")
@@ -0,0 +1,796 @@
+import asyncio
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from ..core.config import settings
+from ..core.logging import logger
+from .chunking import TextChunker, get_chunker
+from .chunk_manifest import ChunkManifest, make_chunk_id
+from .checkpoints import CheckpointStore
+from .extraction_cache import file_hash
+from .extractors import DocumentProcessor, PDFExtractor
+from .tokenization import split_by_token_budget
+
+# Etapas do pipeline, na ordem
+STAGES = ("extract", "chunk", "embed", "upsert")
+
+# Prioridades dos documentos: uploads interativos passam à frente da ingestão em massa
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKFILL = 1
+
+# Chave dos itens de encerramento das etapas, que saem depois de todos os demais
+_SHUTDOWN_KEY = (float("inf"),)
+
+def _extract_document(file_path: str, cache_dir: str, backends: Dict[str, str]) -> int:
+    """
+    Extrai um documento em um processo do pool, gravando os blocos no cache de extração
+
+    A etapa de chunking lê os blocos do cache em seguida, sem que o documento precise
+    ser transferido entre processos. As páginas dos PDFs são extraídas no próprio
+    processo, sem criar um pool dentro do pool.
+    """
+    processor = DocumentProcessor(cache_dir=cache_dir, backends=backends)
+    extractor = processor._get_extractor(file_path)
+    if isinstance(extractor, PDFExtractor):
+        extractor.workers = 1
+    return _extract_blocks(processor, file_path)
+
+def _extract_blocks(processor: DocumentProcessor, file_path: str) -> int:
+    """Extrai um documento, gravando os blocos no cache de extração, e retorna quantos são"""
+    return sum(1 for _ in processor.iter_blocks(file_path))
+
+class StageStats:
+    """Contadores de uma etapa do pipeline"""
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+
+    def record(self, items: int, elapsed: float):
+        """Registra itens processados e o tempo gasto"""
+        self.items += items
+        self.busy_seconds += elapsed
+
+class _StageQueue:
+    """
+    Fila de prioridade de uma etapa do pipeline
+
+    Os itens saem em ordem de chave. O limite de tamanho (backpressure) vale apenas
+    para os itens enfileirados com bounded: itens interativos e trechos retomados de
+    documentos entram sem esperar, para não ficarem atrás da ingestão em massa.
+    """
+    def __init__(self, maxsize: int):
+        self._queue = asyncio.PriorityQueue()
+        self._slots = asyncio.Semaphore(max(1, maxsize))
+        self._seq = itertools.count()
+
+    async def put(self, key: tuple, item: Any, bounded: bool = True):
+        """Enfileira um item, aguardando espaço se bounded"""
+        if bounded:
+            await self._slots.acquire()
+        self._queue.put_nowait((key, next(self._seq), bounded, item))
+
+    async def get(self) -> Any:
+        """Retorna o item de menor chave"""
+        _, _, bounded, item = await self._queue.get()
+        if bounded:
+            self._slots.release()
+        return item
+
+    def task_done(self):
+        self._queue.task_done()
+
+    async def join(self):
+        """Aguarda o processamento de todos os itens retirados da fila"""
+        await self._queue.join()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+class _DocumentJob:
+    """Estado de um documento em processamento no pipeline"""
+    def __init__(self, file_path: str, future: asyncio.Future, priority: int):
+        self.file_path = file_path
+        self.doc_id = os.path.splitext(os.path.basename(file_path))[0]
+        self.future = future
+        self.priority = priority
+        try:
+            self.size = os.path.getsize(file_path)
+        except OSError:
+            self.size = 0
+        # Estado do chunking, retomado a cada trecho
+        self.records = None
+        self.seen = {}
+        self.batch = None
+        self.slices = 0
+        self.file_hash = None
+        self.previous_ids = set()
+        self.previous_indexes = {}
+        self.chunk_ids = []
+        self.chunk_indexes = []
+        self.texts = []
+        self.total_chunks = 0
+        self.embedded = 0
+        self.new_chunks = 0
+        self.tokens = 0
+        self.text_bytes = 0
+        self.embedding_requests = 0
+        self.reused = 0
+        self.duplicates = 0
+        self.removed = 0
+        self.reingest = []
+        self.batches = 0
+        self.pending = 0
+        self.chunked = False
+        self.finalized = False
+        self.error = None
+
+    def fail(self, message: str):
+        """Marca o documento como falho, mantendo a primeira causa"""
+        if self.error is None:
+            self.error = message
+            logger.error(f"Erro ao processar arquivo {self.file_path}: {message}")
+
+    def result(self) -> Dict[str, Any]:
+        """Resumo do processamento do documento"""
+        return {
+            "file_path": self.file_path,
+            "doc_id": self.doc_id,
+            "success": self.error is None,
+            "chunks": self.total_chunks,
+            "embedded": self.embedded,
+            "reused": self.reused,
+            "duplicates": self.duplicates,
+            "removed": self.removed,
+            "reingest": self.reingest,
+            "new_chunks": self.new_chunks,
+            "tokens": self.tokens,
+            "text_bytes": self.text_bytes,
+            "embedding_requests": self.embedding_requests,
+            "upsert_requests": self.batches,
+            "error": self.error
+        }
+
+class IngestionPipeline:
+    """
+    Pipeline de ingestão em etapas ligadas por filas limitadas:
+    extração (pool de processos) → chunking → embeddings em lote → upsert em lote
+
+    Cada etapa tem sua própria concorrência, e as filas limitadas fazem as etapas mais
+    rápidas aguardarem as mais lentas (backpressure), mantendo a memória limitada.
+
+    As filas são de prioridade: documentos interativos passam à frente da ingestão em
+    massa e, na mesma prioridade, arquivos menores passam à frente dos maiores. O
+    chunking avança em trechos de slice_chunks chunks, e os lotes de cada documento
+    são intercalados pela ordem do lote, de modo que um documento grande não atrasa
+    um documento interativo por mais que um trecho.
+
+    Os IDs dos vetores são derivados do conteúdo dos chunks: chunks já registrados no
+    manifesto da ingestão anterior não geram novos embeddings (o chunk_index é atualizado
+    se a posição mudou), os que deixaram de existir são excluídos do índice e, com
+    dedup_index, chunks quase idênticos a chunks de outros documentos também são
+    ignorados. Na primeira ingestão de um documento sem manifesto, os vetores gravados
+    com IDs aleatórios por versões anteriores são excluídos pelo doc_id do metadata.
+
+    Cada lote armazenado é registrado em checkpoints; um documento interrompido é
+    retomado sem gerar novamente os embeddings dos lotes concluídos.
+
+    Sem embedding_generator e pinecone_manager, o pipeline apenas extrai e divide os
+    documentos, entregando os chunks de cada um a on_chunks_ready. Com dry_run, os
+    chunks também são comparados ao manifesto e agrupados em lotes como na ingestão,
+    sem chamar serviços externos nem gravar estado, e o resumo de cada documento traz
+    os chunks novos, tokens e requisições que a ingestão faria.
+    """
+    def __init__(
+        self,
+        document_processor: Optional[DocumentProcessor] = None,
+        chunker: Optional[TextChunker] = None,
+        embedding_generator=None,
+        pinecone_manager=None,
+        manifest: Optional[ChunkManifest] = None,
+        dedup_index=None,
+        checkpoints: Optional[CheckpointStore] = None,
+        file_tracker=None,
+        on_chunks_ready: Optional[Callable[[str, List[str]], None]] = None,
+        on_document_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+        dry_run: bool = False,
+        extract_workers: int = settings.PIPELINE_EXTRACT_WORKERS,
+        chunk_workers: int = settings.PIPELINE_CHUNK_WORKERS,
+        embed_workers: int = settings.PIPELINE_EMBED_WORKERS,
+        upsert_workers: int = settings.PIPELINE_UPSERT_WORKERS,
+        queue_size: int = settings.PIPELINE_QUEUE_SIZE,
+        batch_size: int = settings.INGESTION_BATCH_SIZE,
+        slice_chunks: int = settings.PIPELINE_SLICE_CHUNKS
+    ):
+        self.document_processor = document_processor or DocumentProcessor()
+        self.chunker = chunker or get_chunker()
+        self.embedding_generator = embedding_generator
+        self.pinecone_manager = pinecone_manager
+        self.dry_run = dry_run
+        self.stores_vectors = (
+            not dry_run and embedding_generator is not None and pinecone_manager is not None
+        )
+        # Os chunks recebem IDs e são agrupados em lotes na ingestão e no dry-run
+        self.batches_chunks = self.stores_vectors or dry_run
+        self.manifest = manifest or (ChunkManifest() if self.batches_chunks else None)
+        self.dedup_index = None if dry_run else dedup_index
+        self.checkpoints = None if dry_run else checkpoints or (
+            CheckpointStore() if self.stores_vectors and settings.CHECKPOINT_DB_PATH else None
+        )
+        # Registro dos documentos, consultado antes de procurar vetores de IDs aleatórios
+        self.file_tracker = file_tracker
+        self.on_chunks_ready = on_chunks_ready
+        self.on_document_done = on_document_done
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.slice_chunks = max(1, slice_chunks)
+
+        self.workers = {
+            "extract": max(1, extract_workers),
+            "chunk": max(1, chunk_workers),
+            "embed": max(1, embed_workers),
+            "upsert": max(1, upsert_workers)
+        }
+        self.stats = {name: StageStats(name) for name in STAGES}
+
+        self._loop = None
+        self._queues: Dict[str, _StageQueue] = {}
+        self._jobs: Dict[asyncio.Future, _DocumentJob] = {}
+        # Último job enviado de cada documento: jobs do mesmo doc_id são processados em sequência
+        self._latest: Dict[str, asyncio.Future] = {}
+        self._chained = set()
+        self._tasks: Dict[str, List[asyncio.Task]] = {}
+        self._stages = ()
+        self._pool = None
+        self._page_processor = None
+        self._reporter = None
+        self._started_at = None
+
+    async def start(self):
+        """Inicia os workers de cada etapa"""
+        if self._tasks:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._queues = {name: _StageQueue(self.queue_size) for name in STAGES}
+        self._started_at = time.perf_counter()
+
+        # A extração em processos separados grava os blocos no cache de extração,
+        # de onde a etapa de chunking os lê. Com vários workers de extração, cada
+        # documento é extraído em um processo do pool; com um único worker, o documento
+        # é lido em uma thread e as páginas dos PDFs são distribuídas pelo pool
+        if self.document_processor.cache:
+            if self.workers["extract"] > 1:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers["extract"])
+            else:
+                self._pool = ProcessPoolExecutor(max_workers=settings.PDF_EXTRACTION_WORKERS or os.cpu_count() or 1)
+                self._page_processor = DocumentProcessor(
+                    cache_dir=self.document_processor.cache.cache_dir,
+                    backends=self.document_processor.backends,
+                    executor=self._pool
+                )
+        else:
+            logger.warning("Cache de extração desativado: a extração ocorrerá na etapa de chunking")
+
+        workers = {
+            "extract": self._extract_worker,
+            "chunk": self._chunk_worker,
+            "embed": self._embed_worker,
+            "upsert": self._upsert_worker
+        }
+        self._stages = STAGES if self.stores_vectors else ("extract", "chunk")
+        self._tasks = {
+            name: [asyncio.create_task(workers[name]()) for _ in range(self.workers[name])]
+            for name in self._stages
+        }
+        if settings.PIPELINE_REPORT_INTERVAL > 0:
+            self._reporter = asyncio.create_task(self._report_periodically())
+
+        logger.info(
+            "Pipeline de ingestão iniciado: "
+            + ", ".join(f"{name}={len(tasks)}" for name, tasks in self._tasks.items())
+        )
+
+    async def submit(self, file_path: str, priority: int = PRIORITY_BACKFILL) -> asyncio.Future:
+        """
+        Enfileira um documento para processamento
+
+        Documentos da ingestão em massa aguardam enquanto a fila de entrada estiver
+        cheia; documentos interativos entram imediatamente. Retorna um Future com o
+        resumo do processamento do documento.
+        """
+        if not self._tasks:
+            await self.start()
+        job = _DocumentJob(str(file_path), self._loop.create_future(), priority)
+        await self._enqueue(job, self._bounded(job))
+        return job.future
+
+    async def _resubmit(self, file_path: str):
+        """
+        Enfileira novamente um documento cujo conteúdo saiu do índice vetorial, sem
+        aguardar espaço na fila (chamado pelas etapas, que não podem bloquear)
+        """
+        job = _DocumentJob(file_path, self._loop.create_future(), PRIORITY_BACKFILL)
+        await self._enqueue(job, bounded=False)
+
+    async def _enqueue(self, job: _DocumentJob, bounded: bool):
+        """
+        Enfileira o job na extração ou, se outro job do mesmo documento estiver em
+        andamento, somente após a conclusão dele: dois jobs do mesmo doc_id em paralelo
+        disputariam o manifesto, os checkpoints e os vetores do documento
+        """
+        self._jobs[job.future] = job
+        previous = self._latest.get(job.doc_id)
+        self._latest[job.doc_id] = job.future
+        if previous is None or previous.done():
+            await self._put("extract", (job.priority, job.size), job, bounded)
+            return
+
+        logger.info(f"{job.file_path} aguardará o processamento em andamento do mesmo documento")
+        task = asyncio.create_task(self._enqueue_after(previous, job))
+        self._chained.add(task)
+        task.add_done_callback(self._chained.discard)
+
+    async def _enqueue_after(self, previous: asyncio.Future, job: _DocumentJob):
+        """Enfileira o job quando o job anterior do mesmo documento terminar"""
+        await asyncio.wait([previous])
+        await self._put("extract", (job.priority, job.size), job, bounded=False)
+
+    async def close(self) -> Dict[str, Dict[str, float]]:
+        """Aguarda o processamento dos documentos enfileirados e encerra as etapas"""
+        # Inclui os documentos reenfileirados durante a finalização de outros
+        pending = [future for future in self._jobs if not future.done()]
+        while pending:
+            await asyncio.wait(pending)
+            pending = [future for future in self._jobs if not future.done()]
+        for name in STAGES:
+            tasks = self._tasks.get(name)
+            if not tasks:
+                continue
+            if name == "chunk":
+                # Documentos em andamento voltam à fila a cada trecho
+                await self._queues[name].join()
+            for _ in tasks:
+                await self._queues[name].put(_SHUTDOWN_KEY, None, bounded=False)
+            await asyncio.gather(*tasks)
+
+        if self._page_processor:
+            self._page_processor.close()
+            self._page_processor = None
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+        self.document_processor.close()
+        if self._reporter:
+            self._reporter.cancel()
+            self._reporter = None
+
+        report = self.report()
+        self._tasks = {}
+        return report
+
+    async def run(self, file_paths: Iterable[str]) -> List[Dict[str, Any]]:
+        """Processa um conjunto de documentos e retorna o resumo de cada um"""
+        await self.start()
+        futures = [await self.submit(file_path) for file_path in file_paths]
+        await self.close()
+        return [future.result() for future in futures]
+
+    def progress(self, future: asyncio.Future) -> Optional[Dict[str, Any]]:
+        """Andamento de um documento enviado com submit, ou None se ele já terminou"""
+        job = self._jobs.get(future)
+        if job is None:
+            return None
+        if job.records is None:
+            stage = "extract"
+        elif not job.chunked:
+            stage = "chunk"
+        else:
+            stage = "embed"
+        return {
+            "stage": stage,
+            "chunks": job.total_chunks,
+            "embedded": job.embedded,
+            "reused": job.reused,
+            "pending_batches": job.pending
+        }
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Registra no log e retorna a vazão e a profundidade das filas de cada etapa"""
+        elapsed = time.perf_counter() - (self._started_at or time.perf_counter())
+        report = {}
+        for name in self._stages:
+            stats = self.stats[name]
+            report[name] = {
+                "items": stats.items,
+                "busy_seconds": stats.busy_seconds,
+                "items_per_second": stats.items / elapsed if elapsed else 0.0,
+                "queue_depth": self._queues[name].qsize(),
+                "max_queue_depth": stats.max_queue_depth
+            }
+            logger.info(
+                f"Etapa {name}: {stats.items} itens em {stats.busy_seconds:.2f}s de trabalho "
+                f"({report[name]['items_per_second']:.1f} itens/s), "
+                f"fila máxima {stats.max_queue_depth}/{self.queue_size}"
+            )
+        return report
+
+    async def _report_periodically(self):
+        """Registra periodicamente a profundidade das filas"""
+        while True:
+            await asyncio.sleep(settings.PIPELINE_REPORT_INTERVAL)
+            logger.info(
+                "Filas do pipeline: "
+                + ", ".join(f"{name}={self._queues[name].qsize()}" for name in self._stages)
+            )
+
+    async def _put(self, stage: str, key: tuple, item: Any, bounded: bool = True):
+        """Enfileira um item para a etapa, aguardando se bounded e a fila estiver cheia"""
+        queue = self._queues[stage]
+        await queue.put(key, item, bounded)
+        stats = self.stats[stage]
+        stats.max_queue_depth = max(stats.max_queue_depth, queue.qsize())
+
+    def _bounded(self, job: _DocumentJob) -> bool:
+        """Somente a ingestão em massa está sujeita ao limite das filas"""
+        return job.priority > PRIORITY_INTERACTIVE
+
+    def _chunk_key(self, job: _DocumentJob) -> tuple:
+        """
+        Chave do documento na fila de chunking: documentos em andamento vêm antes dos
+        novos da mesma prioridade, alternando pelo número de trechos já processados
+        """
+        if job.records is None:
+            return (job.priority, 1, 0, job.size)
+        return (job.priority, 0, job.slices, job.size)
+
+    async def _extract_worker(self):
+        """Etapa de extração: grava os blocos de cada documento no cache, com o trabalho no pool de processos"""
+        while True:
+            job = await self._queues["extract"].get()
+            if job is None:
+                return
+
+            if self._pool:
+                start_time = time.perf_counter()
+                try:
+                    if self._page_processor:
+                        await asyncio.to_thread(_extract_blocks, self._page_processor, job.file_path)
+                    else:
+                        await self._loop.run_in_executor(
+                            self._pool,
+                            _extract_document,
+                            job.file_path,
+                            self.document_processor.cache.cache_dir,
+                            self.document_processor.backends
+                        )
+                except Exception as e:
+                    job.fail(f"Erro na extração: {str(e)}")
+                    job.chunked = True
+                    await self._maybe_finalize(job)
+                    continue
+                self.stats["extract"].record(1, time.perf_counter() - start_time)
+
+            await self._put("chunk", self._chunk_key(job), job, self._bounded(job))
+
+    async def _chunk_worker(self):
+        """Etapa de chunking: divide os documentos em trechos e envia os chunks novos em lotes"""
+        queue = self._queues["chunk"]
+        while True:
+            job = await queue.get()
+            if job is None:
+                queue.task_done()
+                return
+
+            start_time = time.perf_counter()
+            chunks_before = job.total_chunks
+            try:
+                done = await asyncio.to_thread(self._chunk_slice, job)
+            except Exception as e:
+                job.fail(f"Erro no chunking: {str(e)}")
+                done = True
+            self.stats["chunk"].record(job.total_chunks - chunks_before, time.perf_counter() - start_time)
+
+            if done:
+                job.chunked = True
+                await self._maybe_finalize(job)
+            else:
+                # O restante do documento volta à fila, atrás de documentos mais urgentes
+                job.slices += 1
+                await self._put("chunk", self._chunk_key(job), job, bounded=False)
+            queue.task_done()
+
+    def _chunk_slice(self, job: _DocumentJob) -> bool:
+        """
+        Divide o próximo trecho do documento em chunks (executado em uma thread)
+
+        Retorna True quando o documento termina.
+        """
+        if job.error:
+            return True
+        if job.records is None:
+            manifest = None
+            if self.manifest:
+                manifest = self.manifest.load(job.doc_id)
+                previous_ids = (manifest or {}).get("chunk_ids", [])
+                job.previous_ids = set(previous_ids)
+                job.previous_indexes = dict(zip(previous_ids, (manifest or {}).get("chunk_indexes", [])))
+            if self.checkpoints:
+                cache = self.document_processor.cache
+                job.file_hash = cache.hash_file(job.file_path) if cache else file_hash(job.file_path)
+                job.previous_ids.update(self.checkpoints.get_chunk_ids(job.doc_id, job.file_hash))
+                # Chunks regravados pela ingestão interrompida têm a posição daquela ingestão
+                job.previous_indexes.update(self.checkpoints.get_chunk_indexes(job.doc_id))
+            if self.stores_vectors and self.manifest and manifest is None and self._may_have_legacy_vectors(job):
+                self._delete_legacy_vectors(job)
+            blocks = self.document_processor.iter_blocks(job.file_path)
+            job.records = self.chunker.iter_block_chunks(blocks)
+            job.batch = self._new_batch(job)
+
+        seen = job.seen
+        processed = 0
+        for record in itertools.islice(job.records, self.slice_chunks):
+            processed += 1
+            batch = job.batch
+            text = record["text"]
+            job.total_chunks += 1
+            if self.on_chunks_ready:
+                job.texts.append(text)
+            if not self.batches_chunks:
+                continue
+
+            chunk_id = make_chunk_id(job.doc_id, text, seen)
+            if chunk_id in job.previous_ids:
+                job.chunk_ids.append(chunk_id)
+                job.chunk_indexes.append(job.total_chunks - 1)
+                job.reused += 1
+                continue
+
+            signature = None
+            if self.dedup_index:
+                signature = self.dedup_index.hasher.signature(text)
+                duplicate = self.dedup_index.find_duplicate(signature, exclude_doc_id=job.doc_id)
+                if duplicate:
+                    self._skip_duplicate(job, chunk_id, record, *duplicate)
+                    continue
+
+            job.chunk_ids.append(chunk_id)
+            job.chunk_indexes.append(job.total_chunks - 1)
+            batch["ids"].append(chunk_id)
+            batch["texts"].append(text)
+            batch["metadatas"].append({
+                "source": job.file_path,
+                "doc_id": job.doc_id,
+                "chunk_id": chunk_id,
+                "chunk_index": job.total_chunks - 1,
+                **record["metadata"]
+            })
+            batch["signatures"].append(signature)
+
+            if len(batch["ids"]) >= self.batch_size:
+                self._send_batch(batch)
+                job.batch = self._new_batch(job)
+
+        if processed == self.slice_chunks:
+            return False
+        if job.batch["ids"]:
+            self._send_batch(job.batch)
+        return True
+
+    def _may_have_legacy_vectors(self, job: _DocumentJob) -> bool:
+        """
+        Indica se o documento sem manifesto pode ter vetores de IDs aleatórios no índice
+
+        Documentos sem registro no FileTracker nunca foram ingeridos (como todos os de uma
+        instalação nova) e não são consultados no índice. Sem FileTracker, todos são.
+        """
+        if self.file_tracker is None:
+            return True
+        return self.file_tracker.find_by_filename(os.path.basename(job.file_path)) is not None
+
+    def _delete_legacy_vectors(self, job: _DocumentJob):
+        """
+        Exclui os vetores do documento gravados antes dos IDs derivados do conteúdo
+
+        Esses vetores têm IDs aleatórios e não estão em nenhum manifesto; sem a exclusão,
+        eles ficariam no índice ao lado dos novos. Os vetores gravados pelo pipeline têm o
+        chunk_id no metadata e ficam fora do filtro. Chunks de checkpoints gravados antes
+        desse campo são excluídos junto e gerados novamente.
+        """
+        deleted = self.pinecone_manager.delete_by_metadata(
+            {"doc_id": job.doc_id, "chunk_id": {"$exists": False}}
+        )
+        if deleted is None:
+            raise RuntimeError(f"Falha ao excluir os vetores antigos de {job.doc_id}")
+        if deleted:
+            job.previous_ids.difference_update(deleted)
+            for chunk_id in deleted:
+                job.previous_indexes.pop(chunk_id, None)
+            logger.info(f"{len(deleted)} vetores antigos de {job.doc_id} (IDs aleatórios) excluídos do índice")
+
+    def _skip_duplicate(self, job: _DocumentJob, chunk_id: str, record: Dict[str, Any], canonical_id: str, similarity: float):
+        """
+        Ignora um chunk quase duplicado de outro documento; ele fica fora do manifesto
+        e é verificado novamente na próxima ingestão
+        """
+        logger.debug(f"Chunk quase duplicado de {canonical_id} (similaridade {similarity:.2f})")
+        job.duplicates += 1
+        self.dedup_index.record_skip(record["text"], record["metadata"].get("token_count"))
+        sources = self.dedup_index.link(chunk_id, job.doc_id, job.file_path, canonical_id)
+        if settings.DEDUP_ACTION == "link":
+            self.pinecone_manager.update_metadata(canonical_id, {"duplicate_sources": sources})
+
+    def _new_batch(self, job: _DocumentJob) -> Dict[str, Any]:
+        """Cria um lote vazio de chunks do documento"""
+        return {"job": job, "ids": [], "texts": [], "metadatas": [], "signatures": []}
+
+    def _send_batch(self, batch: Dict[str, Any]):
+        """Envia um lote à etapa de embeddings a partir da thread de chunking, com backpressure"""
+        job = batch["job"]
+        batch["index"] = job.batches
+        job.batches += 1
+
+        token_counts = [metadata.get("token_count", 0) for metadata in batch["metadatas"]]
+        job.new_chunks += len(batch["ids"])
+        job.tokens += sum(token_counts)
+        job.text_bytes += sum(len(text.encode('utf-8')) for text in batch["texts"])
+        job.embedding_requests += len(split_by_token_budget(
+            token_counts,
+            token_counts,
+            settings.EMBEDDING_BATCH_SIZE,
+            settings.EMBEDDING_MAX_TOKENS_PER_REQUEST
+        ))
+        if self.dry_run:
+            return
+        asyncio.run_coroutine_threadsafe(self._enqueue_batch(batch), self._loop).result()
+
+    async def _enqueue_batch(self, batch: Dict[str, Any]):
+        """Registra o lote como pendente no documento e o enfileira"""
+        job = batch["job"]
+        job.pending += 1
+        await self._put("embed", self._batch_key(batch), batch, self._bounded(job))
+
+    def _batch_key(self, batch: Dict[str, Any]) -> tuple:
+        """Chave do lote: os lotes de documentos da mesma prioridade são intercalados"""
+        job = batch["job"]
+        return (job.priority, batch["index"], job.size)
+
+    async def _embed_worker(self):
+        """Etapa de embeddings: gera os embeddings de cada lote"""
+        while True:
+            batch = await self._queues["embed"].get()
+            if batch is None:
+                return
+
+            job = batch["job"]
+            if job.error:
+                await self._batch_done(job)
+                continue
+
+            start_time = time.perf_counter()
+            try:
+                token_counts = [metadata.get("token_count") for metadata in batch["metadatas"]]
+                batch["embeddings"] = await asyncio.to_thread(
+                    self.embedding_generator.generate_embeddings,
+                    batch["texts"],
+                    token_counts if all(count is not None for count in token_counts) else None
+                )
+            except Exception as e:
+                job.fail(f"Erro ao gerar embeddings: {str(e)}")
+                await self._batch_done(job)
+                continue
+            self.stats["embed"].record(len(batch["texts"]), time.perf_counter() - start_time)
+
+            await self._put("upsert", self._batch_key(batch), batch, self._bounded(job))
+
+    async def _upsert_worker(self):
+        """Etapa de upsert: insere os vetores de cada lote no índice"""
+        while True:
+            batch = await self._queues["upsert"].get()
+            if batch is None:
+                return
+
+            job = batch["job"]
+            if not job.error:
+                start_time = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self._store_batch, batch)
+                    job.embedded += len(batch["ids"])
+                except Exception as e:
+                    job.fail(str(e))
+                self.stats["upsert"].record(len(batch["ids"]), time.perf_counter() - start_time)
+
+            await self._batch_done(job)
+
+    def _store_batch(self, batch: Dict[str, Any]):
+        """Insere os vetores do lote e registra suas assinaturas (executado em uma thread)"""
+        if not self.pinecone_manager.upsert_embeddings(
+            batch["ids"], batch["embeddings"], batch["texts"], batch["metadatas"]
+        ):
+            raise RuntimeError("Falha ao inserir chunks no Pinecone")
+        if self.dedup_index:
+            for chunk_id, signature in zip(batch["ids"], batch["signatures"]):
+                self.dedup_index.add(chunk_id, batch["job"].doc_id, signature)
+        if self.checkpoints:
+            job = batch["job"]
+            self.checkpoints.record(
+                job.doc_id, job.file_hash, batch["index"], batch["ids"],
+                [metadata["chunk_index"] for metadata in batch["metadatas"]]
+            )
+
+    async def _batch_done(self, job: _DocumentJob):
+        """Conclui um lote do documento"""
+        job.pending -= 1
+        await self._maybe_finalize(job)
+
+    async def _maybe_finalize(self, job: _DocumentJob):
+        """Finaliza o documento quando o chunking e todos os lotes tiverem terminado"""
+        if not job.chunked or job.pending or job.finalized:
+            return
+        job.finalized = True
+
+        if not job.error and not job.total_chunks:
+            job.fail("Nenhum texto extraído")
+        if not job.error and self.stores_vectors:
+            try:
+                await asyncio.to_thread(self._commit_document, job)
+            except Exception as e:
+                job.fail(f"Erro ao finalizar documento: {str(e)}")
+            for source in job.reingest:
+                logger.info(f"Reingerindo {source}: chunks dos quais era duplicata foram removidos")
+                await self._resubmit(source)
+        if not job.error and self.on_chunks_ready:
+            try:
+                await asyncio.to_thread(self.on_chunks_ready, job.file_path, job.texts)
+            except Exception as e:
+                job.fail(f"Erro no callback de chunks: {str(e)}")
+
+        result = job.result()
+        if job.error is None:
+            logger.info(
+                f"Documento processado: {job.doc_id} ({job.total_chunks} chunks, "
+                f"{job.embedded} novos, {job.reused} reaproveitados, "
+                f"{job.duplicates} quase duplicados, {job.removed} removidos)"
+            )
+        if self.on_document_done:
+            try:
+                await asyncio.to_thread(self.on_document_done, result)
+            except Exception as e:
+                logger.error(f"Erro no callback de documento processado: {str(e)}")
+        self._jobs.pop(job.future, None)
+        if self._latest.get(job.doc_id) is job.future:
+            del self._latest[job.doc_id]
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def _commit_document(self, job: _DocumentJob):
+        """Exclui os chunks que deixaram de existir e salva o manifesto (executado em uma thread)"""
+        stale_ids = list(job.previous_ids.difference(job.chunk_ids))
+        if stale_ids:
+            self.pinecone_manager.delete_documents(stale_ids)
+            if self.dedup_index:
+                job.reingest = [
+                    source for source in self.dedup_index.remove(stale_ids)
+                    if source != job.file_path and os.path.exists(source)
+                ]
+        job.removed = len(stale_ids)
+
+        # Chunks reaproveitados mudam de posição quando o documento muda antes deles
+        moved = [
+            (chunk_id, chunk_index)
+            for chunk_id, chunk_index in zip(job.chunk_ids, job.chunk_indexes)
+            if chunk_id in job.previous_ids and job.previous_indexes.get(chunk_id) != chunk_index
+        ]
+        failed = sum(
+            not self.pinecone_manager.update_metadata(chunk_id, {"chunk_index": chunk_index})
+            for chunk_id, chunk_index in moved
+        )
+        if failed:
+            logger.warning(f"chunk_index não atualizado em {failed} de {len(moved)} chunks de {job.doc_id}")
+
+        self.manifest.save(job.doc_id, job.file_path, job.chunk_ids, job.chunk_indexes)
+        if self.checkpoints:
+            self.checkpoints.clear(job.doc_id)
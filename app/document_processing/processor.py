@@ -1,155 +1,77 @@
 import asyncio
+import os
 from pathlib import Path
-from typing import List, Dict, Optional
-import PyPDF2
-import docx
+from typing import Any, Dict
 from ..core.logging import logger
 from .file_tracker import FileTracker
+from .chunking import get_chunker
+from .pipeline import IngestionPipeline
 from ..vector_store.embeddings import EmbeddingGenerator
-from ..vector_store.store import VectorStore
+from ..vector_store.pinecone_store import PineconeManager
 
 class DocumentProcessor:
     def __init__(self):
         self.file_tracker = FileTracker()
-        self.embedding_generator = EmbeddingGenerator()
-        self.vector_store = VectorStore()
+        self.pipeline = IngestionPipeline(
+            chunker=get_chunker(),
+            embedding_generator=EmbeddingGenerator(),
+            pinecone_manager=PineconeManager(),
+            file_tracker=self.file_tracker,
+            on_document_done=self._update_status
+        )
+
+    def _update_status(self, result: Dict[str, Any]):
+        """Atualiza o status do documento ao fim do processamento no pipeline"""
+        # O doc_id do pipeline é o nome do arquivo sem extensão; o FileTracker usa o file_id
+        filename = os.path.basename(result["file_path"])
+        document = self.file_tracker.find_by_filename(filename)
+        if document is None:
+            logger.warning(f"Status do documento não atualizado: {filename} não está registrado")
+            return
+        try:
+            if result["success"]:
+                self.file_tracker.update_document_status(
+                    document["id"],
+                    status="processed",
+                    processed=True,
+                    embedding_count=result["chunks"] - result["duplicates"]
+                )
+            else:
+                self.file_tracker.update_document_status(
+                    document["id"],
+                    status="error",
+                    processed=False,
+                    error_message=result["error"]
+                )
+        except ValueError as e:
+            logger.warning(f"Status do documento não atualizado: {str(e)}")
 
     async def process_document(self, file_path: Path) -> bool:
         """Processa um documento e gera embeddings"""
         try:
-            # Extrai texto do documento
-            text_chunks = self._extract_text(file_path)
-            if not text_chunks:
-                raise ValueError("Não foi possível extrair texto do documento")
-
-            # Gera embeddings
-            embeddings = await self._generate_embeddings(text_chunks)
-            if not embeddings:
-                raise ValueError("Falha ao gerar embeddings")
-
-            # Salva no vector store
-            doc_id = file_path.stem
-            self.vector_store.add_embeddings(doc_id, text_chunks, embeddings)
-
-            # Atualiza status do documento
-            self.file_tracker.update_document_status(
-                doc_id,
-                status="processed",
-                processed=True,
-                embedding_count=len(embeddings)
-            )
-
-            return True
-
+            future = await self.pipeline.submit(str(file_path))
+            result = await future
+            return result["success"]
         except Exception as e:
             logger.error(f"Erro ao processar documento {file_path}: {str(e)}")
-            self.file_tracker.update_document_status(
-                file_path.stem,
-                status="error",
-                processed=False,
-                error_message=str(e)
-            )
             return False
 
-    def _extract_text(self, file_path: Path) -> List[str]:
-        """Extrai texto do documento em chunks"""
-        file_type = file_path.suffix.lower()
-        
-        if file_type == '.pdf':
-            return self._extract_from_pdf(file_path)
-        elif file_type in ['.doc', '.docx']:
-            return self._extract_from_word(file_path)
-        elif file_type in ['.txt', '.md', '.py', '.js', '.html', '.css']:
-            return self._extract_from_text(file_path)
-        else:
-            raise ValueError(f"Tipo de arquivo não suportado: {file_type}")
-
-    def _extract_from_pdf(self, file_path: Path) -> List[str]:
-        """Extrai texto de arquivos PDF"""
-        chunks = []
-        try:
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                for page in reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        # Divide o texto em chunks menores se necessário
-                        chunks.extend(self._split_into_chunks(text))
-        except Exception as e:
-            logger.error(f"Erro ao extrair texto do PDF {file_path}: {str(e)}")
-        return chunks
-
-    def _extract_from_word(self, file_path: Path) -> List[str]:
-        """Extrai texto de arquivos Word"""
-        chunks = []
-        try:
-            doc = docx.Document(file_path)
-            for paragraph in doc.paragraphs:
-                text = paragraph.text.strip()
-                if text:
-                    chunks.extend(self._split_into_chunks(text))
-        except Exception as e:
-            logger.error(f"Erro ao extrair texto do Word {file_path}: {str(e)}")
-        return chunks
-
-    def _extract_from_text(self, file_path: Path) -> List[str]:
-        """Extrai texto de arquivos de texto"""
-        chunks = []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                text = file.read()
-                chunks.extend(self._split_into_chunks(text))
-        except Exception as e:
-            logger.error(f"Erro ao extrair texto do arquivo {file_path}: {str(e)}")
-        return chunks
-
-    def _split_into_chunks(self, text: str, chunk_size: int = 1000) -> List[str]:
-        """Divide texto em chunks menores"""
-        chunks = []
-        words = text.split()
-        current_chunk = []
-        current_size = 0
-
-        for word in words:
-            word_size = len(word) + 1  # +1 para o espaço
-            if current_size + word_size > chunk_size and current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_size = word_size
-            else:
-                current_chunk.append(word)
-                current_size += word_size
-
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-
-        return chunks
-
-    async def _generate_embeddings(self, text_chunks: List[str]) -> List[List[float]]:
-        """Gera embeddings para chunks de texto"""
-        try:
-            embeddings = []
-            for chunk in text_chunks:
-                embedding = await self.embedding_generator.generate(chunk)
-                if embedding:
-                    embeddings.append(embedding)
-            return embeddings
-        except Exception as e:
-            logger.error(f"Erro ao gerar embeddings: {str(e)}")
-            return []
-
     async def process_directory(self, directory: Path):
         """Processa todos os documentos em um diretório"""
         try:
-            tasks = []
+            futures = []
             for file_path in directory.glob('*'):
-                if file_path.is_file() and not self.file_tracker.get_document(file_path.stem):
-                    tasks.append(self.process_document(file_path))
-            
-            if tasks:
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                return all(isinstance(r, bool) and r for r in results)
+                if file_path.is_file() and not self.file_tracker.find_by_filename(file_path.name):
+                    futures.append(await self.pipeline.submit(str(file_path)))
+
+            if futures:
+                results = await asyncio.gather(*futures)
+                return all(result["success"] for result in results)
             return True
         except Exception as e:
             logger.error(f"Erro ao processar diretório {directory}: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+
+    async def close(self):
+        """Conclui os documentos enfileirados e encerra o pipeline"""
+        await self.pipeline.close()
@@ -0,0 +1,139 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+from ..core.logging import logger
+from .chunk_manifest import ChunkManifest
+from .file_tracker import FileTracker
+
+def scan_directory(directory: str, extensions: Iterable[str]) -> Dict[str, os.stat_result]:
+    """Lista os arquivos do diretório com extensão suportada e seus stats, com os.scandir"""
+    extensions = {extension.lower() for extension in extensions}
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions:
+                files[entry.name] = entry.stat()
+    return files
+
+class CorpusReconciler:
+    """
+    Compara os arquivos de um diretório com os documentos registrados no FileTracker
+
+    Arquivos com o mesmo tamanho e mtime da última ingestão são considerados inalterados
+    sem leitura do conteúdo; os demais têm o hash do conteúdo comparado. Arquivos que
+    deixaram de existir têm seus vetores excluídos, usando o manifesto de chunks.
+    """
+    def __init__(
+        self,
+        file_tracker: FileTracker,
+        manifest: ChunkManifest,
+        pinecone_manager=None,
+        dedup_index=None
+    ):
+        self.file_tracker = file_tracker
+        self.manifest = manifest
+        self.pinecone_manager = pinecone_manager
+        self.dedup_index = dedup_index
+
+    def plan(self, directory: str, extensions: Iterable[str], full: bool = False) -> Dict[str, Any]:
+        """
+        Classifica os arquivos do diretório
+
+        Retorna "ingest" (arquivos novos, alterados ou ainda não processados, com stat
+        e hash), "touched" (stat alterado, mesmo conteúdo), "unchanged" (quantidade) e "removed"
+        (documentos registrados cujo arquivo não existe mais). Com full, todos os
+        arquivos são reingeridos.
+        """
+        extensions = {extension.lower() for extension in extensions}
+        state = self.file_tracker.get_ingestion_state()
+        plan = {"ingest": [], "touched": [], "unchanged": 0, "removed": []}
+
+        for filename, stat in sorted(scan_directory(directory, extensions).items()):
+            known = state.pop(filename, None)
+            # Documentos com erro ou ainda aguardando ingestão (por exemplo, na fila de
+            # jobs) são ingeridos, mesmo com o conteúdo registrado
+            if known and not known.get("processed"):
+                known = None
+            if (
+                not full and known and known.get("content_hash")
+                and known.get("size_bytes") == stat.st_size
+                and known.get("mtime_ns") == stat.st_mtime_ns
+            ):
+                plan["unchanged"] += 1
+                continue
+
+            file_path = os.path.join(directory, filename)
+            record = self._file_record(file_path, stat, known)
+            content_hash = record["content_hash"]
+            if not full and known and known.get("content_hash") == content_hash:
+                plan["touched"].append(record)
+            else:
+                plan["ingest"].append(record)
+
+        plan["removed"] = [
+            document for filename, document in state.items()
+            if os.path.splitext(filename)[1].lower() in extensions
+        ]
+        logger.info(
+            f"Reconciliação de {directory}: {len(plan['ingest'])} para ingerir, "
+            f"{plan['unchanged'] + len(plan['touched'])} inalterados, "
+            f"{len(plan['removed'])} removidos"
+        )
+        return plan
+
+    def _file_record(self, file_path: str, stat: os.stat_result, known: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Registro de um arquivo a ingerir, com stat e hash do conteúdo"""
+        filename = os.path.basename(file_path)
+        content_hash, file_id = self.file_tracker.hash_file(filename, Path(file_path))
+        return {
+            "filename": filename,
+            "file_path": file_path,
+            "file_id": file_id,
+            "size_bytes": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "content_hash": content_hash,
+            "embedding_count": known.get("embedding_count") if known else None
+        }
+
+    def remove_missing(self, documents: List[Dict[str, Any]], plan: Dict[str, Any] = None) -> int:
+        """
+        Exclui os vetores dos documentos cujo arquivo não existe mais e retorna quantos chunks saíram
+
+        Documentos que tinham chunks ignorados como quase duplicatas dos chunks removidos
+        perdem esse conteúdo no índice; com plan, eles são incluídos em plan["ingest"].
+        """
+        removed_chunks = 0
+        dependents = set()
+        for document in documents:
+            doc_id = os.path.splitext(document["filename"])[0]
+            chunk_ids = self.manifest.get_chunk_ids(doc_id)
+            if chunk_ids:
+                if self.pinecone_manager and not self.pinecone_manager.delete_documents(chunk_ids):
+                    raise RuntimeError(f"Falha ao excluir os vetores de {document['filename']}")
+                if self.dedup_index:
+                    dependents.update(self.dedup_index.remove(chunk_ids))
+                removed_chunks += len(chunk_ids)
+            self.manifest.delete(doc_id)
+            logger.info(f"Documento removido do índice: {document['filename']} ({len(chunk_ids)} chunks)")
+
+        self.file_tracker.forget_documents([document["id"] for document in documents])
+
+        if plan is not None:
+            planned = {record["file_path"] for record in plan["ingest"]}
+            for file_path in sorted(dependents - planned):
+                if not os.path.exists(file_path):
+                    continue
+                logger.info(f"Reingerindo {file_path}: chunks dos quais era duplicata foram removidos")
+                plan["touched"] = [record for record in plan["touched"] if record["file_path"] != file_path]
+                plan["ingest"].append(self._file_record(file_path, os.stat(file_path)))
+        return removed_chunks
+
+    def record(self, plan: Dict[str, Any], results: List[Dict[str, Any]]):
+        """Registra no FileTracker os arquivos ingeridos com sucesso e os apenas tocados"""
+        succeeded = {result["file_path"]: result for result in results if result["success"]}
+        records = list(plan["touched"])
+        for record in plan["ingest"]:
+            result = succeeded.get(record["file_path"])
+            if result:
+                records.append({**record, "embedding_count": result["chunks"] - result["duplicates"]})
+        self.file_tracker.record_ingestions(records)
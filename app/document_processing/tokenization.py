@@ -0,0 +1,58 @@
+from functools import lru_cache
+from typing import Any, List, Optional
+import tiktoken
+from ..core.config import settings
+from ..core.logging import logger
+
+DEFAULT_ENCODING = "cl100k_base"
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = None):
+    """Retorna o encoder do tiktoken para o modelo, carregado uma única vez por processo"""
+    model = model or settings.OPENAI_EMBEDDING_MODEL
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        logger.warning(f"Modelo sem encoder conhecido: {model}. Usando {DEFAULT_ENCODING}")
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+def count_tokens(texts: List[str], encoding=None) -> List[int]:
+    """Conta os tokens de uma lista de textos com uma única chamada a encode_batch"""
+    if not texts:
+        return []
+    encoding = encoding or get_encoding()
+    return [
+        len(tokens)
+        for tokens in encoding.encode_batch(texts, disallowed_special=())
+    ]
+
+def split_by_token_budget(
+    items: List[Any],
+    token_counts: Optional[List[int]],
+    max_items: int,
+    max_tokens: int
+) -> List[List[Any]]:
+    """
+    Agrupa itens em requisições respeitando o limite de itens e, quando as contagens
+    de tokens são conhecidas, o limite de tokens por requisição
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for i, item in enumerate(items):
+        tokens = token_counts[i] if token_counts else 0
+        if current and (
+            len(current) >= max_items
+            or current_tokens + tokens > max_tokens
+        ):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(item)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+
+    return batches
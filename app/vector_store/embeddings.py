@@ -1,16 +1,21 @@
-from typing import List
+from typing import List, Optional
 import openai
 from ..core.logging import logger
 from ..core.config import settings
+from ..document_processing.tokenization import split_by_token_budget
 
 class EmbeddingGenerator:
     def __init__(
         self,
         api_key: str = None,
-        model: str = None
+        model: str = None,
+        batch_size: int = None,
+        max_tokens_per_request: int = None
     ):
         self.api_key = api_key or settings.OPENAI_API_KEY
         self.model = model or settings.OPENAI_EMBEDDING_MODEL
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.max_tokens_per_request = max_tokens_per_request or settings.EMBEDDING_MAX_TOKENS_PER_REQUEST
         
         if not self.api_key:
             raise ValueError("OpenAI API Key não configurada")
@@ -20,12 +25,29 @@ class EmbeddingGenerator:
         
         logger.info(f"EmbeddingGenerator inicializado com modelo: {self.model}")
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def _batch_texts(
+        self,
+        texts: List[str],
+        token_counts: Optional[List[int]] = None
+    ) -> List[List[str]]:
+        """
+        Agrupa os textos em requisições respeitando o limite de entradas e,
+        quando as contagens de tokens são conhecidas, o limite de tokens por requisição
+        """
+        return split_by_token_budget(texts, token_counts, self.batch_size, self.max_tokens_per_request)
+    
+    def generate_embeddings(
+        self,
+        texts: List[str],
+        token_counts: Optional[List[int]] = None
+    ) -> List[List[float]]:
         """
         Gera embeddings para uma lista de textos
         
         Args:
             texts: Lista de textos para gerar embeddings
+            token_counts: Número de tokens de cada texto (opcional, usado no agrupamento
+                das requisições sem tokenizar novamente)
             
         Returns:
             List[List[float]]: Lista de embeddings
@@ -36,22 +58,27 @@ class EmbeddingGenerator:
                 return []
             
             # Filtra textos vazios
-            filtered_texts = [text for text in texts if text and text.strip()]
+            non_empty = [i for i, text in enumerate(texts) if text and text.strip()]
+            filtered_texts = [texts[i] for i in non_empty]
+            filtered_counts = [token_counts[i] for i in non_empty] if token_counts else None
             
             if not filtered_texts:
                 logger.warning("Todos os textos estão vazios")
                 return []
             
-            logger.info(f"Gerando embeddings para {len(filtered_texts)} textos")
+            batches = self._batch_texts(filtered_texts, filtered_counts)
+            logger.info(f"Gerando embeddings para {len(filtered_texts)} textos em {len(batches)} requisições")
             
             # Gera embeddings usando a API da OpenAI
-            response = openai.embeddings.create(
-                model=self.model,
-                input=filtered_texts
-            )
-            
-            # Extrai os embeddings da resposta
-            embeddings = [item.embedding for item in response.data]
+            embeddings = []
+            for batch in batches:
+                response = openai.embeddings.create(
+                    model=self.model,
+                    input=batch
+                )
+                
+                # Extrai os embeddings da resposta
+                embeddings.extend(item.embedding for item in response.data)
             
             logger.info(f"Embeddings gerados com sucesso: {len(embeddings)}")
             
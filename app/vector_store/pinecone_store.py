@@ -1,4 +1,5 @@
 from typing import List, Dict, Any, Optional
+import time
 import uuid
 
 # Tentativa de importar Pinecone com tratamento de erro
@@ -104,9 +105,39 @@ class PineconeManager:
             
             logger.info(f"Gerando embeddings para {len(texts)} textos")
             
-            # Gera embeddings para os textos
-            embeddings = embedding_generator.generate_embeddings(texts)
+            # Gera embeddings para os textos, reaproveitando a contagem de tokens do chunking
+            token_counts = [metadata.get("token_count") for metadata in metadatas]
+            embeddings = embedding_generator.generate_embeddings(
+                texts,
+                token_counts=token_counts if all(c is not None for c in token_counts) else None
+            )
+            
+            return self.upsert_embeddings(ids, embeddings, texts, metadatas)
             
+        except Exception as e:
+            logger.error(f"Erro ao inserir documentos no Pinecone: {str(e)}")
+            return False
+    
+    def upsert_embeddings(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        Insere no índice Pinecone vetores com embeddings já gerados
+        
+        Args:
+            ids: IDs dos vetores
+            embeddings: Embedding de cada texto
+            texts: Textos correspondentes, armazenados no metadata
+            metadatas: Metadados de cada vetor
+            
+        Returns:
+            bool: True se a operação foi bem-sucedida
+        """
+        try:
             # Prepara os vetores para inserção
             vectors = []
             for i, (text, embedding, metadata) in enumerate(zip(texts, embeddings, metadatas)):
@@ -124,7 +155,7 @@ class PineconeManager:
             return True
             
         except Exception as e:
-            logger.error(f"Erro ao inserir documentos no Pinecone: {str(e)}")
+            logger.error(f"Erro ao inserir vetores no Pinecone: {str(e)}")
             return False
     
     async def search(
@@ -198,6 +229,88 @@ class PineconeManager:
             logger.error(f"Erro ao excluir documentos do Pinecone: {str(e)}")
             return False
     
+    def delete_by_metadata(
+        self,
+        filter: Dict[str, Any],
+        page_size: int = 1000,
+        max_stale_pages: int = 30
+    ) -> Optional[List[str]]:
+        """
+        Exclui os vetores cujo metadata corresponde ao filtro
+        
+        Índices serverless não excluem por filtro: os IDs são obtidos em consultas com
+        o filtro, repetidas até não restarem vetores a excluir. Todos os vetores de uma
+        página são excluídos, então o filtro deve excluir por si só os vetores a manter.
+        Como a exclusão demora a refletir nas consultas, IDs já excluídos não são enviados
+        novamente; páginas só com esses IDs são consultadas de novo após uma pausa.
+        
+        Args:
+            filter: Filtro de metadata dos vetores a excluir
+            page_size: Vetores obtidos por consulta
+            max_stale_pages: Consultas seguidas sem IDs novos antes de desistir
+            
+        Returns:
+            Optional[List[str]]: IDs dos vetores excluídos, ou None em caso de erro
+        """
+        try:
+            probe = [1.0] * settings.EMBEDDING_DIMENSIONS
+            deleted = []
+            seen = set()
+            stale_pages = 0
+            while True:
+                results = self.index.query(
+                    vector=probe,
+                    top_k=page_size,
+                    include_metadata=False,
+                    filter=filter
+                )
+                matches = [match["id"] for match in results["matches"]]
+                ids = [chunk_id for chunk_id in matches if chunk_id not in seen]
+                if not ids:
+                    # Página incompleta: todos os vetores do filtro já foram excluídos
+                    if len(matches) < page_size:
+                        break
+                    stale_pages += 1
+                    if stale_pages > max_stale_pages:
+                        logger.error(
+                            f"O índice {self.index_name} não refletiu a exclusão de {len(deleted)} vetores "
+                            f"com o filtro {filter}"
+                        )
+                        return None
+                    time.sleep(1)
+                    continue
+                stale_pages = 0
+                self.index.delete(ids=ids)
+                seen.update(ids)
+                deleted.extend(ids)
+            
+            if deleted:
+                logger.info(f"{len(deleted)} vetores excluídos do índice {self.index_name} com o filtro {filter}")
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"Erro ao excluir vetores por metadata no Pinecone: {str(e)}")
+            return None
+    
+    def update_metadata(self, id: str, metadata: Dict[str, Any]) -> bool:
+        """
+        Atualiza campos do metadata de um documento do índice
+        
+        Args:
+            id: ID do documento
+            metadata: Campos a definir
+            
+        Returns:
+            bool: True se a operação foi bem-sucedida
+        """
+        try:
+            self.index.update(id=id, set_metadata=metadata)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Erro ao atualizar metadata no Pinecone: {str(e)}")
+            return False
+    
     def delete_all(self) -> bool:
         """
         Exclui todos os documentos do índice
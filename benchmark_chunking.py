@@ -0,0 +1,80 @@
+import argparse
+import random
+import time
+from app.document_processing.chunking import TextChunker
+
+SAMPLE_WORDS = [
+    "sistema", "documento", "processo", "usuário", "relatório", "cadastro",
+    "aprovação", "gestor", "política", "acesso", "arquivo", "módulo"
+]
+
+def generate_text(size_bytes, seed=42):
+    """Gera um texto sintético com sentenças e parágrafos de tamanhos variados"""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_bytes:
+        sentence = " ".join(rng.choice(SAMPLE_WORDS) for _ in range(rng.randint(5, 30)))
+        sentence = sentence.capitalize() + rng.choice([". ", ". ", ". ", "? ", "\n\n"])
+        parts.append(sentence)
+        total += len(sentence)
+    return "".join(parts)
+
+def legacy_create_chunks(text, chunk_size, chunk_overlap):
+    """Implementação anterior (quatro buscas com str.find a cada corte), para comparação"""
+    def find_sentence_end(position):
+        min_end = len(text)
+        for ending in ['. ', '! ', '? ', '\n\n']:
+            pos = text.find(ending, position)
+            if pos != -1 and pos < min_end:
+                min_end = pos + len(ending)
+        return min_end if min_end < len(text) else position
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        if end >= len(text):
+            chunk = text[start:].strip()
+            if chunk:
+                chunks.append(chunk)
+            break
+        end = find_sentence_end(end)
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end - chunk_overlap
+    return chunks
+
+def main():
+    """Mede o tempo de chunking para textos de vários megabytes"""
+    parser = argparse.ArgumentParser(description="Benchmark do TextChunker")
+    parser.add_argument("--sizes", default="1,2,4,8,16", help="Tamanhos dos textos em MB")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--legacy", action="store_true", help="Inclui a implementação anterior na comparação")
+    args = parser.parse_args()
+
+    chunker = TextChunker(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+
+    print(f"{'MB':>6} {'Chunks':>10} {'Tempo (s)':>10} {'s/MB':>8} {'Legado (s)':>11}")
+    print("-" * 50)
+    for size_mb in [float(s) for s in args.sizes.split(",")]:
+        text = generate_text(int(size_mb * 1024 * 1024))
+
+        start_time = time.perf_counter()
+        chunks = chunker.create_chunks(text)
+        elapsed = time.perf_counter() - start_time
+
+        legacy = "-"
+        if args.legacy:
+            start_time = time.perf_counter()
+            legacy_chunks = legacy_create_chunks(text, args.chunk_size, args.chunk_overlap)
+            legacy = f"{time.perf_counter() - start_time:.3f}"
+            if legacy_chunks != chunks:
+                legacy += " (!)"
+
+        print(f"{size_mb:>6.1f} {len(chunks):>10} {elapsed:>10.3f} {elapsed / size_mb:>8.3f} {legacy:>11}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import os
+import resource
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from app.document_processing.extractors import EXTRACTOR_BACKENDS, PDFExtractor
+
+def peak_rss_mb():
+    """Retorna o pico de memória residente do processo atual em MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é dado em bytes no macOS e em KB no Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_backend(extension, name, file_path):
+    """Extrai um arquivo com um backend e retorna páginas, tempo, pico de memória e caracteres"""
+    extractor_class = EXTRACTOR_BACKENDS[extension][name]
+    # Um único processo por backend, para medir o backend e não o paralelismo
+    extractor = extractor_class(workers=1) if issubclass(extractor_class, PDFExtractor) else extractor_class()
+
+    start_time = time.perf_counter()
+    pages = 0
+    chars = Counter()
+    for page_text in extractor.iter_pages(file_path):
+        pages += 1
+        chars.update(c for c in page_text if not c.isspace())
+    elapsed = time.perf_counter() - start_time
+    return pages, elapsed, peak_rss_mb(), chars
+
+def parity(chars, reference):
+    """Fração dos caracteres (sem espaços) em comum com o backend de referência"""
+    total = max(sum(chars.values()), sum(reference.values()))
+    return sum((chars & reference).values()) / total if total else 1.0
+
+def main():
+    """Compara os backends de extração sobre os arquivos de uma pasta"""
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de extração")
+    parser.add_argument("folder", nargs="?", default="documents", help="Pasta com arquivos de exemplo")
+    args = parser.parse_args()
+
+    files = sorted(
+        os.path.join(args.folder, name)
+        for name in os.listdir(args.folder)
+        if os.path.splitext(name)[1].lower() in EXTRACTOR_BACKENDS
+    )
+    if not files:
+        print(f"Nenhum arquivo suportado em {args.folder}")
+        return
+
+    results = {}
+    for file_path in files:
+        extension = os.path.splitext(file_path)[1].lower()
+        reference = None
+        for name in EXTRACTOR_BACKENDS[extension]:
+            # Cada execução em um processo novo, para que o pico de memória seja do backend
+            try:
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    pages, elapsed, peak, chars = executor.submit(run_backend, extension, name, file_path).result()
+            except Exception as e:
+                print(f"{name}: erro em {file_path}: {str(e)}")
+                continue
+
+            reference = reference if reference is not None else chars
+            totals = results.setdefault((extension, name), {
+                "files": 0, "pages": 0, "seconds": 0.0, "peak": 0.0, "chars": 0, "parity": 0.0
+            })
+            totals["files"] += 1
+            totals["pages"] += pages
+            totals["seconds"] += elapsed
+            totals["peak"] = max(totals["peak"], peak)
+            totals["chars"] += sum(chars.values())
+            totals["parity"] += parity(chars, reference)
+
+    print(f"{'Backend':<18} {'Arquivos':>8} {'Páginas':>8} {'Tempo (s)':>10} {'Págs/s':>8} {'RSS (MB)':>9} {'Caracteres':>11} {'Paridade':>9}")
+    print("-" * 89)
+    for (extension, name), totals in results.items():
+        pages_per_second = totals["pages"] / totals["seconds"] if totals["seconds"] else 0
+        print(
+            f"{extension + ' ' + name:<18} {totals['files']:>8} {totals['pages']:>8} "
+            f"{totals['seconds']:>10.3f} {pages_per_second:>8.1f} {totals['peak']:>9.1f} "
+            f"{totals['chars']:>11} {totals['parity'] / totals['files']:>9.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,7 @@ except ImportError:
 from app.chat.chat_manager import ChatManager
 from app.vector_store.pinecone_store import PineconeManager
 from app.vector_store.embeddings import EmbeddingGenerator
-from app.chat.conversation_store import ConversationStore
+from app.chat.conversation_store import get_conversation_store
 from app.core.logging import logger, log_with_context
 from app.core.config import settings
 
@@ -55,7 +55,7 @@ def initialize_components():
     """Inicializa os componentes necessários para o chat"""
     try:
         log_with_context("info", "Inicializando banco de dados")
-        conversation_store = ConversationStore()
+        conversation_store = get_conversation_store()
         log_with_context("info", "Banco de dados inicializado com sucesso")
         
         log_with_context("info", "Inicializando PineconeManager")
@@ -101,7 +101,9 @@ def display_sources(sources):
     if sources and len(sources) > 0:
         print(Fore.CYAN + "\nFontes utilizadas:" + Style.RESET_ALL)
         for i, source in enumerate(sources, 1):
-            print(f"{i}. {source['title']} (página {source.get('page', 'N/A')})")
+            page = source.get('page') or 'N/A'
+            section = f" - {source['section']}" if source.get('section') else ""
+            print(f"{i}. {source['title']} (página {page}){section}")
         print()
 
 async def main_async():
@@ -209,8 +211,9 @@ async def main_async():
                     print(Fore.BLUE + "Assistente: " + Style.RESET_ALL + response["content"])
                     
                     # Exibe as fontes, se disponíveis
-                    if "sources" in response and response["sources"]:
-                        display_sources(response["sources"])
+                    sources = response.get("sources") or response.get("metadata", {}).get("sources")
+                    if sources:
+                        display_sources(sources)
                     
                     # Registra métricas
                     processing_time = end_time - start_time
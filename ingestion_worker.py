@@ -0,0 +1,71 @@
+import asyncio
+import argparse
+import signal
+from app.document_processing.dedup import NearDuplicateIndex
+from app.document_processing.file_tracker import FileTracker
+from app.document_processing.jobs import JobQueue, JobWorker
+from app.document_processing.pipeline import IngestionPipeline
+from app.vector_store.embeddings import EmbeddingGenerator
+from app.vector_store.pinecone_store import PineconeManager
+from app.core.logging import logger
+from app.core.config import settings
+
+async def run_worker(worker: JobWorker, drain: bool):
+    """Executa o worker até a fila esvaziar (drain) ou até receber SIGINT/SIGTERM"""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            # Windows: o encerramento fica a cargo do KeyboardInterrupt
+            pass
+    await worker.run(drain=drain)
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(
+        description="Processa os jobs da fila de ingestão; execute vários workers para escalar a ingestão"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.JOB_WORKER_CONCURRENCY,
+        help="Número de documentos processados simultaneamente por este worker"
+    )
+    parser.add_argument(
+        "--drain",
+        action="store_true",
+        help="Encerra quando não houver mais jobs disponíveis na fila"
+    )
+    args = parser.parse_args()
+
+    # Inicializa componentes
+    embedding_generator = EmbeddingGenerator(
+        api_key=settings.OPENAI_API_KEY,
+        model=settings.OPENAI_EMBEDDING_MODEL
+    )
+    pinecone_manager = PineconeManager(
+        api_key=settings.PINECONE_API_KEY,
+        environment=settings.PINECONE_ENVIRONMENT,
+        index_name=settings.PINECONE_INDEX
+    )
+    dedup_index = NearDuplicateIndex() if settings.DEDUP_THRESHOLD > 0 else None
+    file_tracker = FileTracker()
+    pipeline = IngestionPipeline(
+        embedding_generator=embedding_generator,
+        pinecone_manager=pinecone_manager,
+        dedup_index=dedup_index,
+        file_tracker=file_tracker
+    )
+    worker = JobWorker(JobQueue(), pipeline, file_tracker, concurrency=args.concurrency)
+
+    try:
+        asyncio.run(run_worker(worker, args.drain))
+    except KeyboardInterrupt:
+        logger.info("Worker de ingestão interrompido")
+    finally:
+        if dedup_index:
+            dedup_index.close()
+
+if __name__ == "__main__":
+    main()
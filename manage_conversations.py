@@ -4,7 +4,8 @@ import json
 import asyncio
 import argparse
 from datetime import datetime
-from app.chat.conversation_store import ConversationStore
+from app.chat.conversation_store import ConversationStore, get_conversation_store
+from app.chat.sqlite_conversation_store import SQLiteConversationStore
 from app.core.logging import logger
 
 def format_timestamp(timestamp_str):
@@ -37,9 +38,44 @@ def list_conversations(store, limit=10, offset=0):
         print(f"{conv['conversation_id']:<36} {title[:30]:<30} {created_at:<20} {message_count:<10} {updated_at:<20}")
     
     print("-" * 120)
-    total = len(store.list_conversations(limit=0))
+    total = store.count_conversations()
     print(f"Exibindo {len(conversations)} de {total} conversas")
 
+def search_conversations(store, query, limit=10):
+    """Busca mensagens nas conversas"""
+    results = store.search_messages(query, limit=limit)
+    
+    if not results:
+        print(f"\nNenhuma mensagem encontrada para '{query}'.")
+        return
+    
+    print(f"\n🔎 Resultados para '{query}':")
+    print("-" * 100)
+    for result in results:
+        title = result.get("title") or "Sem título"
+        timestamp = format_timestamp(result.get("timestamp", "N/A"))
+        print(f"{result['conversation_id']}  {title[:30]}  ({timestamp}, {result['role']})")
+        print(f"    {result['snippet']}")
+    print("-" * 100)
+
+def import_conversations(source_dir, db_path=None):
+    """Copia as conversas dos arquivos JSONL para o banco SQLite"""
+    source = ConversationStore(source_dir)
+    target = SQLiteConversationStore(db_path)
+    imported = 0
+    
+    for user_id in sorted(os.listdir(source_dir)):
+        if not os.path.isdir(os.path.join(source_dir, user_id)):
+            continue
+        for summary in source.list_conversations(user_id, limit=0):
+            conversation = source.get_conversation(summary["conversation_id"], user_id)
+            if conversation and target.save_conversation(conversation):
+                imported += 1
+    
+    source.close()
+    target.close()
+    print(f"\n✅ {imported} conversas importadas para '{target.db_path}'")
+
 def view_conversation(store, conversation_id):
     """Exibe o conteúdo de uma conversa"""
     conversation = store.get_conversation(conversation_id)
@@ -137,6 +173,16 @@ def main():
     list_parser.add_argument("--limit", type=int, default=10, help="Limite de conversas a exibir")
     list_parser.add_argument("--offset", type=int, default=0, help="Offset para paginação")
     
+    # Comando search
+    search_parser = subparsers.add_parser("search", help="Busca mensagens nas conversas")
+    search_parser.add_argument("query", help="Termos a buscar")
+    search_parser.add_argument("--limit", type=int, default=10, help="Limite de resultados")
+    
+    # Comando import
+    import_parser = subparsers.add_parser("import", help="Copia as conversas dos arquivos JSONL para o banco SQLite")
+    import_parser.add_argument("--source", default="data/conversations", help="Diretório das conversas em JSONL")
+    import_parser.add_argument("--db", help="Caminho do banco SQLite (padrão: CONVERSATION_DB_PATH)")
+    
     # Comando view
     view_parser = subparsers.add_parser("view", help="Exibe o conteúdo de uma conversa")
     view_parser.add_argument("id", help="ID da conversa a visualizar")
@@ -152,12 +198,18 @@ def main():
     
     args = parser.parse_args()
     
+    if args.command == "import":
+        import_conversations(args.source, args.db)
+        return
+    
     # Inicializa o armazenamento de conversas
-    store = ConversationStore()
+    store = get_conversation_store()
     
     # Executa o comando apropriado
     if args.command == "list":
         list_conversations(store, args.limit, args.offset)
+    elif args.command == "search":
+        search_conversations(store, args.query, args.limit)
     elif args.command == "view":
         view_conversation(store, args.id)
     elif args.command == "delete":
@@ -1,70 +1,53 @@
 import os
 import sys
+import asyncio
+import argparse
+import time
 from app.document_processing.extractors import DocumentProcessor
-from app.document_processing.chunking import TextChunker
+from app.document_processing.chunking import get_chunker
+from app.document_processing.chunk_manifest import ChunkManifest
+from app.document_processing.dedup import NearDuplicateIndex
+from app.document_processing.file_tracker import FileTracker
+from app.document_processing.reconcile import CorpusReconciler
+from app.document_processing.estimate import estimate_ingestion, log_estimate
+from app.document_processing.pipeline import IngestionPipeline
 from app.vector_store.embeddings import EmbeddingGenerator
 from app.vector_store.pinecone_store import PineconeManager
 from app.core.logging import logger
 from app.core.config import settings
 
-def process_file(file_path, document_processor, chunker, embedding_generator, pinecone_manager):
-    """Processa um arquivo e armazena no Pinecone"""
-    try:
-        # Extrai o nome do arquivo para usar como ID do documento
-        file_name = os.path.basename(file_path)
-        doc_id = os.path.splitext(file_name)[0]
-        
-        logger.info(f"Processando arquivo: {file_path}")
-        
-        # Extrai o texto do arquivo
-        text = document_processor.process_document(file_path)
-        if not text:
-            logger.warning(f"Nenhum texto extraído de {file_path}")
-            return False
-        
-        logger.info(f"Texto extraído com sucesso: {len(text)} caracteres")
-        
-        # Divide o texto em chunks
-        chunks = chunker.create_chunks(text)
-        logger.info(f"Texto dividido em {len(chunks)} chunks")
-        
-        # Prepara metadados para cada chunk
-        metadatas = []
-        for i in range(len(chunks)):
-            metadatas.append({
-                "source": file_path,
-                "doc_id": doc_id,
-                "chunk_index": i
-            })
-        
-        # Armazena os chunks no Pinecone
-        pinecone_manager.upsert_documents(
-            embedding_generator=embedding_generator,
-            texts=chunks,
-            metadatas=metadatas
-        )
-        
-        logger.info(f"Documento armazenado com sucesso no Pinecone: {doc_id}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Erro ao processar arquivo {file_path}: {str(e)}")
-        return False
-
 def main():
     """Função principal"""
-    # Inicializa componentes
-    document_processor = DocumentProcessor()
-    chunker = TextChunker()
-    embedding_generator = EmbeddingGenerator(
-        api_key=settings.OPENAI_API_KEY,
-        model=settings.OPENAI_EMBEDDING_MODEL
+    parser = argparse.ArgumentParser(description="Processa os documentos existentes")
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="Ingere apenas arquivos novos ou alterados e remove os vetores de arquivos excluídos"
     )
-    pinecone_manager = PineconeManager(
-        api_key=settings.PINECONE_API_KEY,
-        environment=settings.PINECONE_ENVIRONMENT,
-        index_name=settings.PINECONE_INDEX
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Extrai e divide os documentos e estima tokens, requisições e tempo, sem chamar serviços externos"
     )
+    args = parser.parse_args()
+    
+    # Inicializa componentes
+    document_processor = DocumentProcessor()
+    chunker = get_chunker()
+    manifest = ChunkManifest()
+    if args.dry_run:
+        embedding_generator = pinecone_manager = dedup_index = None
+    else:
+        embedding_generator = EmbeddingGenerator(
+            api_key=settings.OPENAI_API_KEY,
+            model=settings.OPENAI_EMBEDDING_MODEL
+        )
+        pinecone_manager = PineconeManager(
+            api_key=settings.PINECONE_API_KEY,
+            environment=settings.PINECONE_ENVIRONMENT,
+            index_name=settings.PINECONE_INDEX
+        )
+        dedup_index = NearDuplicateIndex() if settings.DEDUP_THRESHOLD > 0 else None
     
     # Diretório de documentos
     documents_dir = "documents"
@@ -77,26 +60,39 @@ def main():
     # Lista de extensões suportadas
     supported_extensions = [".txt", ".pdf", ".docx", ".md"]
     
-    # Processa todos os arquivos no diretório
-    files_processed = 0
-    for file_name in os.listdir(documents_dir):
-        file_path = os.path.join(documents_dir, file_name)
-        
-        # Verifica se é um arquivo e tem extensão suportada
-        if os.path.isfile(file_path):
-            file_ext = os.path.splitext(file_name)[1].lower()
-            if file_ext in supported_extensions:
-                success = process_file(
-                    file_path, 
-                    document_processor, 
-                    chunker, 
-                    embedding_generator, 
-                    pinecone_manager
-                )
-                if success:
-                    files_processed += 1
+    # Compara os arquivos com os documentos registrados; sem --reconcile, todos
+    # os arquivos são reingeridos
+    file_tracker = FileTracker()
+    reconciler = CorpusReconciler(file_tracker, manifest, pinecone_manager, dedup_index)
+    plan = reconciler.plan(documents_dir, supported_extensions, full=not args.reconcile)
+    if args.reconcile and plan["removed"] and not args.dry_run:
+        reconciler.remove_missing(plan["removed"], plan)
+    files = [record["file_path"] for record in plan["ingest"]]
+    
+    # Processa os arquivos no pipeline de ingestão (extração, chunking, embeddings
+    # e upsert em etapas concorrentes)
+    pipeline = IngestionPipeline(
+        document_processor=document_processor,
+        chunker=chunker,
+        embedding_generator=embedding_generator,
+        pinecone_manager=pinecone_manager,
+        manifest=manifest,
+        dedup_index=dedup_index,
+        file_tracker=file_tracker,
+        dry_run=args.dry_run
+    )
+    start_time = time.perf_counter()
+    results = asyncio.run(pipeline.run(files)) if files else []
+    if args.dry_run:
+        log_estimate(estimate_ingestion(results, time.perf_counter() - start_time))
+        return
+    reconciler.record(plan, results)
+    files_processed = sum(1 for result in results if result["success"])
     
     logger.info(f"Processamento concluído. {files_processed} arquivos processados.")
+    if dedup_index:
+        dedup_index.report()
+        dedup_index.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,248 @@
+import random
+from app.document_processing.chunking import TextChunker, TokenChunker
+from benchmark_chunking import generate_text, legacy_create_chunks
+
+def test_create_chunks_matches_legacy_semantics():
+    """Os chunks devem ser idênticos aos da implementação anterior"""
+    for seed in range(20):
+        text = generate_text(20000, seed=seed)
+        chunk_size = random.Random(seed).randint(50, 800)
+        chunk_overlap = chunk_size // 4
+        chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        assert chunker.create_chunks(text) == legacy_create_chunks(text, chunk_size, chunk_overlap)
+
+def test_create_chunks_always_moves_forward():
+    """Mesmo com overlap próximo do tamanho do chunk o chunking termina"""
+    text = "a" * 5000 + ". " + "b" * 5000
+    chunker = TextChunker(chunk_size=100, chunk_overlap=99)
+    chunks = chunker.create_chunks(text)
+    assert chunks
+    assert chunks[-1].endswith("b")
+
+def test_create_chunks_overlapping_newlines():
+    """Sequências de quebras de linha são tratadas como str.find faria"""
+    text = ("x" * 9 + "\n\n\n") * 50
+    chunker = TextChunker(chunk_size=10, chunk_overlap=2)
+    assert chunker.create_chunks(text) == legacy_create_chunks(text, 10, 2)
+
+def test_invalid_overlap_is_rejected():
+    """Overlap maior ou igual ao tamanho do chunk é inválido"""
+    try:
+        TextChunker(chunk_size=100, chunk_overlap=100)
+    except ValueError:
+        return
+    raise AssertionError("ValueError esperado")
+
+class CharEncoding:
+    """Encoder de teste (um token por caractere), dispensa o download do tiktoken"""
+    def encode_batch(self, texts, disallowed_special=()):
+        return [[ord(c) for c in text] for text in texts]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+def test_token_chunker_respects_token_budget():
+    """Chunks por tokens não excedem o tamanho alvo e cobrem todo o texto"""
+    text = generate_text(20000, seed=7)
+    chunker = TokenChunker(chunk_size=300, chunk_overlap=50, encoding=CharEncoding())
+    chunks = chunker.create_chunks(text)
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert chunks[0] == text[:len(chunks[0])]
+    assert chunks[-1] == text.strip()[-len(chunks[-1]):]
+
+def test_token_chunker_splits_long_sentences():
+    """Sentenças maiores que o chunk são divididas em janelas de tokens"""
+    chunker = TokenChunker(chunk_size=100, chunk_overlap=10, encoding=CharEncoding())
+    chunks = chunker.create_chunks("x" * 450)
+    assert [len(c) for c in chunks] == [100, 100, 100, 100, 90]
+
+class ByteEncoding:
+    """Encoder de teste (um token por byte UTF-8), que decodifica como o tiktoken"""
+    def encode_batch(self, texts, disallowed_special=()):
+        return [list(text.encode("utf-8")) for text in texts]
+
+    def decode(self, tokens):
+        return bytes(tokens).decode("utf-8", errors="replace")
+
+class WordEncoding:
+    """Encoder de teste com um token a cada quatro caracteres"""
+    def encode_batch(self, texts, disallowed_special=()):
+        return [[text[i:i + 4] for i in range(0, len(text), 4)] for text in texts]
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+def test_token_chunker_splits_long_sentences_on_character_boundaries():
+    """As janelas de uma sentença longa não cortam caracteres multibyte"""
+    text = "ação" * 100
+    chunker = TokenChunker(chunk_size=15, chunk_overlap=4, encoding=ByteEncoding())
+    chunks = chunker.create_chunks(text)
+    assert chunks and all("\ufffd" not in chunk for chunk in chunks)
+    assert all(len(chunk.encode("utf-8")) <= 15 and chunk in text for chunk in chunks)
+    assert chunks[0] == text[:len(chunks[0])] and chunks[-1] == text[-len(chunks[-1]):]
+
+def test_token_chunker_measures_pending_text_in_tokens():
+    """O texto sem fim de sentença só é cortado na quebra de página acima de 2 chunks em tokens"""
+    chunker = TokenChunker(chunk_size=200, chunk_overlap=0, encoding=WordEncoding())
+    pages = ["a" * 250, "b" * 250, "c" * 400 + ". "]
+    text = "\n".join(pages).strip()
+    chunks = [record["text"] for record in chunker.iter_chunks(pages)]
+    # Os 501 caracteres pendentes têm 126 tokens: a sentença é dividida em janelas de tokens
+    assert chunks == [text[:800], text[800:]]
+
+def test_chunks_with_metadata_carry_token_count():
+    """A contagem de tokens é anexada aos metadados de cada chunk"""
+    chunker = TextChunker(chunk_size=200, chunk_overlap=20, encoding=CharEncoding())
+    records = chunker.create_chunks_with_metadata(generate_text(3000))
+    assert records
+    assert all(r["metadata"]["token_count"] == len(r["text"]) for r in records)
+
+def _pages(seed, count=30):
+    rng = random.Random(seed)
+    return [generate_text(rng.randint(0, 3000), seed=seed * 100 + i).strip() for i in range(count)]
+
+def test_iter_chunks_matches_create_chunks():
+    """O chunking em streaming produz os mesmos chunks do texto concatenado"""
+    for seed in range(10):
+        pages = _pages(seed)
+        text = "".join(page + "\n" for page in pages if page)
+        for chunker in (
+            TextChunker(chunk_size=500, chunk_overlap=100, encoding=CharEncoding()),
+            TokenChunker(chunk_size=400, chunk_overlap=60, encoding=CharEncoding())
+        ):
+            streamed = [record["text"] for record in chunker.iter_chunks(iter(pages))]
+            assert streamed == chunker.create_chunks(text)
+
+def test_iter_chunks_page_metadata():
+    """Cada chunk informa as páginas em que começa e termina"""
+    pages = ["Primeira página. " * 10, "", "Terceira página. " * 10]
+    chunker = TextChunker(chunk_size=100, chunk_overlap=10, encoding=CharEncoding())
+    records = list(chunker.iter_chunks(pages))
+    assert records[0]["metadata"]["page"] == 1
+    assert records[-1]["metadata"]["page_end"] == 3
+    for record in records:
+        metadata = record["metadata"]
+        expected = {1} if "Primeira" in record["text"] else set()
+        if "Terceira" in record["text"]:
+            expected.add(3)
+        assert {metadata["page"], metadata["page_end"]} == expected
+
+def test_block_chunks_respect_sections_and_tables(tmp_path):
+    """Chunks de blocos não misturam seções e carregam página e título"""
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+    from app.document_processing.extractors import DocumentProcessor
+
+    doc = Document()
+    doc.add_heading("Manual", level=1)
+    doc.add_heading("Acesso", level=2)
+    doc.add_paragraph("Para acessar o sistema, use seu login. " * 3)
+    doc.add_paragraph("Solicite a senha ao administrador.")
+    doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+    doc.add_heading("Relatórios", level=2)
+    doc.add_paragraph("Os relatórios ficam no menu principal.")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text, table.cell(0, 1).text = "Relatório", "Periodicidade"
+    table.cell(1, 0).text, table.cell(1, 1).text = "Vendas", "Mensal"
+    file_path = tmp_path / "manual.docx"
+    doc.save(file_path)
+
+    blocks = list(DocumentProcessor(cache_dir="").iter_blocks(str(file_path)))
+    chunker = TextChunker(chunk_size=500, chunk_overlap=50, encoding=CharEncoding())
+    records = list(chunker.iter_block_chunks(blocks))
+
+    # Títulos consecutivos entram no chunk do conteúdo seguinte
+    assert [r["metadata"]["section"] for r in records] == [
+        "Manual > Acesso",
+        "Manual > Relatórios",
+        "Manual > Relatórios"
+    ]
+    assert records[0]["text"].startswith("Manual\nAcesso\nPara acessar o sistema")
+    assert records[0]["metadata"]["page"] == 1
+    assert records[1]["metadata"]["page"] == 2
+    assert records[2]["metadata"]["block_type"] == "table"
+    assert records[2]["text"] == "Relatório | Periodicidade\nVendas | Mensal"
+
+    # Um título seguido de uma tabela também não forma um chunk próprio
+    blocks = [
+        {"text": "Preços", "heading_path": ["Preços"], "block_type": "heading"},
+        {"text": "Item | Valor\nA | 1", "heading_path": ["Preços"], "block_type": "table"}
+    ]
+    assert [r["text"] for r in chunker.iter_block_chunks(blocks)] == ["Preços\nItem | Valor\nA | 1"]
+
+def test_block_chunks_split_large_blocks():
+    """Blocos maiores que o chunk são divididos e mantêm a página de origem"""
+    blocks = [
+        {"text": "Título", "page": 4, "heading_path": ["Título"], "block_type": "heading"},
+        {"text": generate_text(2000), "page": 4, "heading_path": ["Título"], "block_type": "paragraph"}
+    ]
+    chunker = TextChunker(chunk_size=300, chunk_overlap=30, encoding=CharEncoding())
+    records = list(chunker.iter_block_chunks(blocks))
+    assert len(records) > 1
+    assert records[0]["text"].startswith("Título\n")
+    assert all(r["metadata"]["page"] == 4 and r["metadata"]["section"] == "Título" for r in records)
+    # O corte avança até o fim da sentença, como em create_chunks
+    assert all(len(r["text"]) <= 300 + 350 for r in records)
+
+def test_streaming_without_sentence_ends_does_not_buffer_document():
+    """Texto sem fim de sentença gera chunks durante a leitura, sem esperar o fim do documento"""
+    from app.document_processing.chunking import ContentDefinedChunker
+
+    for chunker in (
+        TextChunker(chunk_size=300, chunk_overlap=50, encoding=CharEncoding()),
+        TokenChunker(chunk_size=300, chunk_overlap=50, encoding=CharEncoding()),
+        ContentDefinedChunker(chunk_size=300, encoding=CharEncoding())
+    ):
+        consumed = []
+
+        def pages():
+            for page in range(50):
+                consumed.append(page)
+                # Uma página só com palavras e outra com uma única "palavra" enorme
+                yield "registro " * 40 if page % 2 else "x" * 700
+
+        records = iter(chunker.iter_chunks(pages(), batch_size=1))
+        next(records)
+        assert len(consumed) <= 3
+        texts = [record["text"] for record in records]
+        assert len(consumed) == 50
+        assert all(len(text) <= 2 * 300 for text in texts)
+
+def test_content_defined_chunks_survive_local_edits():
+    """Uma edição local altera apenas os chunks vizinhos"""
+    from app.document_processing.chunking import ContentDefinedChunker
+
+    text = generate_text(100000, seed=11)
+    chunker = ContentDefinedChunker(chunk_size=800, encoding=CharEncoding())
+    original = chunker.create_chunks(text)
+    middle = text.index(". ", len(text) // 2) + 2
+    edited = chunker.create_chunks(text[:middle] + "Parágrafo novo inserido. " + text[middle:])
+
+    assert len(set(edited) - set(original)) <= 2
+    assert all(len(chunk) <= chunker.max_size for chunk in original)
+
+def test_content_defined_streaming_matches_create_chunks():
+    """O chunking definido pelo conteúdo não depende da divisão em páginas"""
+    from app.document_processing.chunking import ContentDefinedChunker
+
+    chunker = ContentDefinedChunker(chunk_size=500, encoding=CharEncoding())
+    for seed in range(5):
+        pages = _pages(seed)
+        text = "".join(page + "\n" for page in pages if page)
+        streamed = [record["text"] for record in chunker.iter_chunks(iter(pages))]
+        assert streamed == chunker.create_chunks(text)
+
+def test_chunk_ids_are_stable(tmp_path):
+    """IDs derivados do conteúdo são estáveis e distinguem textos repetidos"""
+    from app.document_processing.chunk_manifest import ChunkManifest, make_chunk_id
+
+    seen = {}
+    ids = [make_chunk_id("manual", text, seen) for text in ["a", "b", "a"]]
+    assert ids[0] == make_chunk_id("manual", "a", {})
+    assert len(set(ids)) == 3
+
+    manifest = ChunkManifest(str(tmp_path))
+    manifest.save("manual", "documents/manual.pdf", ids)
+    assert manifest.get_chunk_ids("manual") == ids
+    manifest.delete("manual")
+    assert manifest.get_chunk_ids("manual") == []
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+from app.chat.conversation_store import ConversationStore
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_messages_are_appended_as_lines(tmp_path):
+    """Cada mensagem acrescenta uma linha; a conversa é reconstruída a partir do log"""
+    store = ConversationStore(str(tmp_path), compact_after=3)
+    conversation = store.create_conversation(metadata={"title": "Suporte"})
+    path = store._get_conversation_path(conversation.conversation_id, "default_user")
+
+    first = store.add_message_to_conversation(conversation.conversation_id, "user", "Olá")
+    store.add_message_to_conversation(conversation.conversation_id, "assistant", "Oi!")
+    assert [record["type"] for record in read_lines(path)] == ["conversation", "message", "message"]
+
+    loaded = ConversationStore(str(tmp_path)).get_conversation(conversation.conversation_id)
+    assert [message["content"] for message in loaded.messages] == ["Olá", "Oi!"]
+    assert loaded.messages[0]["id"] == first
+    assert loaded.updated_at == loaded.messages[-1]["timestamp"]
+    assert loaded.metadata == {"title": "Suporte"}
+
+    # Alterações de metadados viram registros de atualização, compactados após compact_after
+    for i in range(3):
+        loaded.metadata = {"title": f"Suporte {i}"}
+        assert store.save_conversation(loaded)
+    records = read_lines(path)
+    assert [record["type"] for record in records] == ["conversation", "message", "message"]
+    assert records[0]["metadata"] == {"title": "Suporte 2"}
+
+def test_recovers_partial_line_and_migrates_json(tmp_path):
+    """Linhas incompletas são descartadas e conversas no formato anterior são convertidas"""
+    store = ConversationStore(str(tmp_path))
+    conversation = store.create_conversation()
+    path = store._get_conversation_path(conversation.conversation_id, "default_user")
+    store.add_message_to_conversation(conversation.conversation_id, "user", "primeira")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "message", "mess')
+    store.add_message_to_conversation(conversation.conversation_id, "user", "segunda")
+
+    loaded = ConversationStore(str(tmp_path)).get_conversation(conversation.conversation_id)
+    assert [message["content"] for message in loaded.messages] == ["primeira", "segunda"]
+    assert len(read_lines(path)) == 3
+
+    legacy = {
+        "conversation_id": "antiga", "user_id": "default_user",
+        "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:01:00",
+        "messages": [{"id": "m1", "role": "user", "content": "oi", "timestamp": "2024-01-01T00:01:00", "metadata": {}}],
+        "metadata": {"title": "Antiga"}
+    }
+    with open(tmp_path / "default_user" / "antiga.json", "w", encoding="utf-8") as f:
+        json.dump(legacy, f)
+    assert store.add_message_to_conversation("antiga", "assistant", "olá")
+    assert not os.path.exists(tmp_path / "default_user" / "antiga.json")
+    migrated = store.get_conversation("antiga")
+    assert [message["content"] for message in migrated.messages] == ["oi", "olá"]
+    assert migrated.metadata == {"title": "Antiga"}
+
+def test_cache_avoids_reads_and_detects_external_changes(tmp_path, monkeypatch):
+    """Um turno lê a conversa no máximo uma vez; alterações de outro processo invalidam o cache"""
+    store = ConversationStore(str(tmp_path))
+    conversation_id = store.create_conversation().conversation_id
+    loads = []
+    original_load = store._load
+    monkeypatch.setattr(store, "_load", lambda path: loads.append(path) or original_load(path))
+
+    # Turno: leitura, mensagem do usuário e resposta gravadas juntas
+    conversation = store.get_conversation(conversation_id)
+    conversation.add_message("user", "pergunta")
+    conversation.add_message("assistant", "resposta")
+    assert store.save_conversation(conversation)
+    store.add_message_to_conversation(conversation_id, "user", "outra pergunta")
+    cached = store.get_conversation(conversation_id)
+    assert cached is not conversation and len(cached.messages) == 3
+    assert not loads
+
+    # O cache entrega cópias: mensagens não gravadas não aparecem para outras leituras
+    cached.add_message("user", "não gravada")
+    assert len(store.get_conversation(conversation_id).messages) == 3
+
+    # Outro processo acrescenta uma mensagem: a conversa é lida novamente
+    other = ConversationStore(str(tmp_path))
+    other.add_message_to_conversation(conversation_id, "assistant", "de outro processo")
+    reloaded = store.get_conversation(conversation_id)
+    assert len(loads) == 1
+    assert [message["content"] for message in reloaded.messages][-1] == "de outro processo"
+
+    # O cache é limitado a cache_size conversas
+    small = ConversationStore(str(tmp_path), cache_size=1)
+    small.get_conversation(conversation_id)
+    small.create_conversation()
+    assert len(small._cache) == 1
+
+def test_save_keeps_messages_saved_by_others(tmp_path):
+    """Salvar acrescenta só as mensagens novas, sem perder as gravadas por outro turno ou processo"""
+    store = ConversationStore(str(tmp_path))
+    conversation_id = store.create_conversation().conversation_id
+    first = store.get_conversation(conversation_id)
+    second = store.get_conversation(conversation_id)
+    first.add_message("user", "a")
+    second.add_message("user", "b")
+    assert store.save_conversation(first) and store.save_conversation(second)
+    assert [message["content"] for message in store.get_conversation(conversation_id).messages] == ["a", "b"]
+
+    # Sem a conversa em cache, o arquivo é lido e apenas as mensagens ausentes são acrescentadas
+    other = ConversationStore(str(tmp_path))
+    other.add_message_to_conversation(conversation_id, "assistant", "de outro processo")
+    second.add_message("user", "c")
+    second.metadata = {"title": "Atualizada"}
+    assert ConversationStore(str(tmp_path)).save_conversation(second)
+    reloaded = ConversationStore(str(tmp_path)).get_conversation(conversation_id)
+    assert [message["content"] for message in reloaded.messages] == ["a", "b", "de outro processo", "c"]
+    assert reloaded.metadata == {"title": "Atualizada"}
+
+    # Descartar mensagens exige reescrever a conversa
+    reloaded.messages = reloaded.messages[:1]
+    assert store.save_conversation(reloaded)
+    assert len(store.get_conversation(conversation_id).messages) == 4
+    assert store.rewrite_conversation(reloaded)
+    assert len(ConversationStore(str(tmp_path)).get_conversation(conversation_id).messages) == 1
+
+def test_summary_index_lists_and_counts_without_loading(tmp_path, monkeypatch):
+    """Listar e contar conversas usa o índice de resumos, reconstruído a partir dos arquivos se necessário"""
+    store = ConversationStore(str(tmp_path))
+    first = store.create_conversation(metadata={"title": "Primeira"}).conversation_id
+    second = store.create_conversation().conversation_id
+    store.add_message_to_conversation(first, "user", "x" * 1000)
+    monkeypatch.setattr(store, "_load", lambda path: (_ for _ in ()).throw(AssertionError(path)))
+
+    assert store.count_conversations() == 2
+    listed = store.list_conversations()
+    assert [item["conversation_id"] for item in listed] == [first, second]
+    assert listed[0]["message_count"] == 1
+    assert listed[0]["metadata"] == {"title": "Primeira"}
+    assert len(listed[0]["last_message"]["content"]) == 200
+    assert listed[1]["last_message"] is None
+    assert [item["conversation_id"] for item in store.list_conversations(limit=1, offset=1)] == [second]
+
+    store.delete_conversation(second)
+    assert store.count_conversations() == 1
+
+    store.close()
+    os.remove(tmp_path / "default_user" / "_index.sqlite")
+    rebuilt = ConversationStore(str(tmp_path))
+    assert rebuilt.count_conversations() == 1
+    assert not rebuilt._cache
+    assert rebuilt.list_conversations()[0]["message_count"] == 1
+
+def test_async_methods_keep_order_per_conversation(tmp_path):
+    """Os métodos assíncronos rodam fora do loop de eventos, na ordem de chamada de cada conversa"""
+    store = ConversationStore(str(tmp_path), cache_size=1)
+
+    async def scenario():
+        first = await store.acreate_conversation(metadata={"title": "Primeira"})
+        second = await store.acreate_conversation()
+        ids = await asyncio.gather(*[
+            store.aadd_message_to_conversation(conversation.conversation_id, "user", str(index))
+            for index in range(20)
+            for conversation in (first, second)
+        ])
+        assert all(ids)
+
+        conversation = await store.aget_conversation(first.conversation_id)
+        assert [message["content"] for message in conversation.messages] == [str(index) for index in range(20)]
+        conversation.add_message("assistant", "resposta")
+        assert await store.asave_conversation(conversation)
+        assert await store.acount_conversations() == 2
+        listed = await store.alist_conversations()
+        assert listed[0]["last_message"]["content"] == "resposta"
+        assert await store.adelete_conversation(second.conversation_id)
+
+    asyncio.run(scenario())
+    reloaded = ConversationStore(str(tmp_path))
+    assert reloaded.count_conversations() == 1
+    assert len(reloaded.list_conversations()[0]["metadata"]) == 1
+    store.close()
+
+def test_conversation_lock_runs_turns_in_sequence(tmp_path):
+    """Turnos com conversation_lock veem as mensagens do turno anterior da mesma conversa"""
+    store = ConversationStore(str(tmp_path))
+
+    async def turn(conversation_id, content):
+        async with store.conversation_lock(conversation_id):
+            conversation = await store.aget_conversation(conversation_id)
+            seen = len(conversation.messages)
+            conversation.add_message("user", content)
+            await asyncio.sleep(0.01)
+            conversation.add_message("assistant", f"resposta {content}")
+            assert await store.asave_conversation(conversation)
+            return seen
+
+    async def scenario():
+        conversation = await store.acreate_conversation()
+        seen = await asyncio.gather(*[turn(conversation.conversation_id, str(index)) for index in range(3)])
+        assert seen == [0, 2, 4]
+        assert store.conversation_lock(conversation.conversation_id) is not store.conversation_lock("outra")
+
+    asyncio.run(scenario())
+    store.close()
@@ -0,0 +1,43 @@
+from app.document_processing.dedup import NearDuplicateIndex, _optimal_bands
+from benchmark_chunking import generate_text
+
+def test_near_duplicates_are_found(tmp_path):
+    """Chunks quase idênticos de outro documento são encontrados; textos diferentes não"""
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"), threshold=0.8)
+    original = generate_text(3000, seed=1)
+    index.add("v1-0", "politica_v1", index.hasher.signature(original))
+
+    edited = original.replace("sistema", "Sistema", 1) + " Revisado em 2024."
+    duplicate = index.find_duplicate(index.hasher.signature(edited), exclude_doc_id="politica_v2")
+    assert duplicate is not None and duplicate[0] == "v1-0"
+
+    unrelated = index.hasher.signature(generate_text(3000, seed=2))
+    assert index.find_duplicate(unrelated, exclude_doc_id="outro") is None
+
+    # Chunks do próprio documento não contam como duplicatas
+    assert index.find_duplicate(index.hasher.signature(edited), exclude_doc_id="politica_v1") is None
+
+    index.remove(["v1-0"])
+    assert index.find_duplicate(index.hasher.signature(edited)) is None
+    index.close()
+
+def test_link_returns_all_sources(tmp_path):
+    """Duplicatas vinculadas acumulam as fontes na cópia existente e voltam a ser ingeridas sem ela"""
+    index = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"))
+    index.link("a", "v2", "documents/v2.pdf", "canonical")
+    assert index.link("b", "final", "documents/final.pdf", "canonical") == [
+        "documents/final.pdf",
+        "documents/v2.pdf"
+    ]
+    # Removida a cópia existente, os documentos vinculados precisam ser reingeridos
+    assert index.remove(["canonical"]) == ["documents/final.pdf", "documents/v2.pdf"]
+    assert index.remove(["canonical"]) == []
+    index.record_skip("texto", token_count=3)
+    assert index.report()["tokens_saved"] == 3
+    index.close()
+
+def test_optimal_bands_favor_recall():
+    """O corte do LSH fica abaixo do threshold"""
+    bands, rows = _optimal_bands(128, 0.9)
+    assert bands * rows == 128
+    assert (1 / bands) ** (1 / rows) <= 0.9
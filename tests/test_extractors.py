@@ -0,0 +1,269 @@
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app.document_processing.extraction_cache import ExtractionCache
+from app.document_processing.extractors import DocumentProcessor, PDFExtractor
+
+def make_pdf(path, pages):
+    """Gera um PDF mínimo com uma linha de texto por página (páginas vazias com "")"""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1") if text else b""
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    content = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(content))
+        body = obj if isinstance(obj, bytes) else obj.encode("latin-1")
+        content += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    content += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    content += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(content))
+    return str(path)
+
+def test_parallel_pdf_extraction_keeps_page_order(tmp_path):
+    """A extração em paralelo devolve as mesmas páginas, na mesma ordem, que a serial"""
+    pages = [f"Pagina {i}" if i % 7 else "" for i in range(1, 41)]
+    file_path = make_pdf(tmp_path / "manual.pdf", pages)
+
+    serial = list(PDFExtractor(workers=1, pages_per_task=4).iter_pages(file_path))
+    parallel = list(PDFExtractor(workers=3, pages_per_task=4).iter_pages(file_path))
+    assert parallel == serial == pages
+
+def test_pdf_extractor_reuses_one_pool_or_the_given_executor(tmp_path):
+    """O pool de processos é criado uma vez por extrator; um executor informado não é encerrado"""
+    pages = [f"Pagina {i}" for i in range(1, 13)]
+    file_path = make_pdf(tmp_path / "manual.pdf", pages)
+
+    extractor = PDFExtractor(workers=2, pages_per_task=3)
+    assert list(extractor.iter_pages(file_path)) == pages
+    pool = extractor._pool
+    assert list(extractor.iter_pages(file_path)) == pages and extractor._pool is pool
+    extractor.close()
+    assert extractor._pool is None
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        processor = DocumentProcessor(cache_dir="", executor=executor)
+        assert list(processor.iter_pages(file_path)) == pages
+        processor.close()
+        assert processor._get_extractor(file_path)._pool is None
+        assert executor.submit(len, "abc").result() == 3
+
+def test_pdf_replaced_in_place_is_extracted_again(tmp_path):
+    """Um PDF substituído no mesmo caminho não é lido pelo leitor mantido nos processos do pool"""
+    file_path = make_pdf(tmp_path / "manual.pdf", ["Old 1", "Old 2", "Old 3"])
+    extractor = PDFExtractor(workers=2, pages_per_task=1)
+    try:
+        assert list(extractor.iter_pages(file_path)) == ["Old 1", "Old 2", "Old 3"]
+        replacement = make_pdf(tmp_path / "novo.pdf", ["New 1", "New 2", "New 3"])
+        os.replace(replacement, file_path)
+        assert list(extractor.iter_pages(file_path)) == ["New 1", "New 2", "New 3"]
+    finally:
+        extractor.close()
+
+def test_pdf_extract_text_skips_empty_pages(tmp_path):
+    """extract_text junta apenas as páginas com texto"""
+    file_path = make_pdf(tmp_path / "manual.pdf", ["Pagina 1", "", "Pagina 3"])
+    assert PDFExtractor(workers=2, pages_per_task=1).extract_text(file_path) == "Pagina 1\nPagina 3"
+
+def test_extraction_cache_avoids_reparsing(tmp_path):
+    """A segunda leitura do mesmo conteúdo vem do cache, sem abrir o PDF novamente"""
+    file_path = make_pdf(tmp_path / "manual.pdf", ["Pagina 1", "", "Pagina 3"])
+    processor = DocumentProcessor(cache_dir=str(tmp_path / "cache"))
+    assert processor.process_document(file_path) == "Pagina 1\nPagina 3"
+
+    def fail(file_path):
+        raise AssertionError("o PDF não deveria ser extraído novamente")
+
+    extractor = processor._get_extractor(file_path)
+    extractor.iter_pages = fail
+    assert processor.process_document(file_path) == "Pagina 1\nPagina 3"
+    assert [block["page"] for block in processor.iter_blocks(file_path)] == [1, 3]
+
+    # Uma nova versão do extrator invalida o cache
+    extractor.version = "2"
+    try:
+        processor.process_document(file_path)
+    except AssertionError:
+        return
+    raise AssertionError("extração esperada após mudança de versão")
+
+def test_interrupted_extraction_is_not_cached(tmp_path):
+    """Uma extração consumida parcialmente não é registrada no cache"""
+    file_path = make_pdf(tmp_path / "manual.pdf", ["Pagina 1", "Pagina 2"])
+    processor = DocumentProcessor(cache_dir=str(tmp_path / "cache"))
+    next(iter(processor.iter_pages(file_path)))
+    assert list(processor.iter_pages(file_path)) == ["Pagina 1", "Pagina 2"]
+    assert list(processor.iter_pages(file_path)) == ["Pagina 1", "Pagina 2"]
+
+def test_backend_selection(tmp_path, monkeypatch):
+    """O backend vem da configuração ou, no modo auto, do tamanho do arquivo"""
+    from app.core.config import settings
+    from app.document_processing.extractors import PDFMinerExtractor
+
+    file_path = make_pdf(tmp_path / "manual.pdf", ["Pagina 1", "Pagina 2"])
+    processor = DocumentProcessor(cache_dir="", backends={'.pdf': 'pdfminer'})
+    assert isinstance(processor._get_extractor(file_path), PDFMinerExtractor)
+    assert processor.process_document(file_path) == "Pagina 1\n\nPagina 2"
+
+    processor = DocumentProcessor(cache_dir="", backends={'.pdf': 'auto'})
+    assert isinstance(processor._get_extractor(file_path), PDFMinerExtractor)
+    monkeypatch.setattr(settings, "EXTRACTOR_AUTO_THRESHOLD_MB", 0)
+    assert type(processor._get_extractor(file_path)) is PDFExtractor
+
+    try:
+        DocumentProcessor(cache_dir="", backends={'.pdf': 'inexistente'})
+    except ValueError:
+        return
+    raise AssertionError("ValueError esperado")
+
+def test_txt_is_read_in_blocks(tmp_path, monkeypatch):
+    """O TXT é lido em blocos cortados em fim de parágrafo, sem perder texto"""
+    from app.document_processing import extractors
+    from app.document_processing.extractors import TXTExtractor
+
+    monkeypatch.setattr(extractors, "_READ_BLOCK_SIZE", 1000)
+    text = "".join(f"Parágrafo {i}. Linha um.\nLinha dois.\n\n" for i in range(500)) + "x" * 3000
+    file_path = tmp_path / "manual.txt"
+    file_path.write_text(text, encoding="utf-8")
+
+    pages = list(TXTExtractor().iter_pages(str(file_path)))
+    assert len(pages) > 10
+    assert all(len(page) <= 4 * 1000 + 1000 for page in pages)
+    assert "\n".join(pages) == text
+    assert TXTExtractor().extract_text(str(file_path)) == text.strip()
+
+def test_txt_without_newlines_is_cut_between_words(tmp_path, monkeypatch):
+    """Um TXT sem quebras de linha é cortado em espaços, sem dividir palavras"""
+    from app.document_processing import extractors
+    from app.document_processing.extractors import TXTExtractor
+
+    monkeypatch.setattr(extractors, "_READ_BLOCK_SIZE", 1000)
+    text = " ".join(f"palavra{i}" for i in range(3000))
+    file_path = tmp_path / "linha.txt"
+    file_path.write_text(text, encoding="utf-8")
+
+    pages = list(TXTExtractor().iter_pages(str(file_path)))
+    assert len(pages) > 1
+    assert "\n".join(pages).split() == text.split()
+
+def test_docx_pages_from_rendered_breaks_in_one_pass(tmp_path, monkeypatch):
+    """Com quebras renderizadas pelo Word, elas definem as páginas, lidas na mesma passada"""
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+    from docx.oxml import OxmlElement
+    from app.document_processing.extractors import DOCXExtractor
+
+    doc = Document()
+    doc.add_paragraph("Página um.")
+    doc.add_paragraph().add_run("Página dois.")._r.insert(0, OxmlElement("w:lastRenderedPageBreak"))
+    doc.add_paragraph("Ainda a página dois.")
+    # Quebras explícitas são ignoradas quando o documento tem quebras renderizadas
+    paragraph = doc.add_paragraph()
+    paragraph.add_run().add_break(WD_BREAK.PAGE)
+    paragraph.add_run("Sem quebra renderizada.")
+    file_path = tmp_path / "paginas.docx"
+    doc.save(file_path)
+
+    reads = []
+    original = DOCXExtractor._iter_body
+    monkeypatch.setattr(DOCXExtractor, "_iter_body", lambda self, *args: reads.append(1) or original(self, *args))
+    blocks = list(DOCXExtractor().iter_blocks(str(file_path)))
+    assert [block["page"] for block in blocks] == [1, 2, 2, 2]
+    assert len(reads) == 1
+
+def test_document_memory_ceiling(tmp_path, monkeypatch):
+    """O texto completo do documento respeita MAX_DOCUMENT_MEMORY_MB"""
+    from app.core.config import settings
+    from app.document_processing.extractors import TXTExtractor
+
+    file_path = tmp_path / "manual.txt"
+    file_path.write_text("Texto do manual.", encoding="utf-8")
+    monkeypatch.setattr(settings, "MAX_DOCUMENT_MEMORY_MB", 0)
+    try:
+        TXTExtractor().extract_text(str(file_path))
+    except ValueError:
+        # O extrator em streaming não acumula o texto; o DocumentProcessor limita cada página
+        assert list(TXTExtractor().iter_pages(str(file_path))) == ["Texto do manual."]
+        try:
+            list(DocumentProcessor(cache_dir="").iter_pages(str(file_path)))
+        except ValueError:
+            return
+    raise AssertionError("ValueError esperado")
+
+def test_file_id_is_hashed_in_blocks(tmp_path, monkeypatch):
+    """O ID calculado em blocos é o mesmo de quando o arquivo era lido inteiro"""
+    import hashlib
+    from app.document_processing.file_tracker import FileTracker
+
+    monkeypatch.chdir(tmp_path)
+    content = b"conteudo " * 300000
+    file_path = tmp_path / "manual.txt"
+    file_path.write_bytes(content)
+    expected = hashlib.sha256(content + b"manual.txt").hexdigest()[:12]
+    assert FileTracker().track_document("manual.txt", file_path, len(content)) == expected
+
+def test_extraction_cache_store_does_not_hold_write_lock(tmp_path):
+    """Gravar uma extração não bloqueia o banco entre as entradas, mesmo retomada em outra thread"""
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    entries = cache.store("hash", "pages", "1", (f"Pagina {index}" for index in range(40)))
+    assert next(entries) == "Pagina 0"
+
+    other = sqlite3.connect(cache.db_path, timeout=0)
+    other.execute("BEGIN IMMEDIATE")
+    other.rollback()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        rest = executor.submit(list, entries).result()
+    assert len(rest) == 39
+    other.execute("BEGIN IMMEDIATE")
+    other.rollback()
+    assert len(list(cache.get("hash", "pages", "1"))) == 40
+
+def test_extraction_cache_generators_do_not_share_connections(tmp_path):
+    """Geradores intercalados na mesma thread e retomados em outras usam conexões próprias"""
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    list(cache.store("a", "pages", "1", (f"A {index}" for index in range(40))))
+    reading = cache.get("a", "pages", "1")
+    writing = cache.store("b", "pages", "1", (f"B {index}" for index in range(40)))
+    assert next(reading) == "A 0" and next(writing) == "B 0"
+    assert reading.gi_frame.f_locals["conn"] is not writing.gi_frame.f_locals["conn"]
+    assert cache.conn not in (reading.gi_frame.f_locals["conn"], writing.gi_frame.f_locals["conn"])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        read_rest = executor.submit(list, reading)
+        write_rest = executor.submit(list, writing)
+        assert len(read_rest.result()) == len(write_rest.result()) == 39
+    assert list(cache.get("b", "pages", "1")) == [f"B {index}" for index in range(40)]
+
+def test_extraction_cache_hashes_unchanged_files_once(tmp_path, monkeypatch):
+    """O hash de um arquivo inalterado vem do cache, sem nova leitura; alterado, é recalculado"""
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    path = tmp_path / "doc.txt"
+    path.write_text("conteúdo", encoding="utf-8")
+    # mtime no passado: arquivos recém-modificados não entram no cache
+    os.utime(path, ns=(0, 10**18))
+    content_hash = cache.hash_file(str(path))
+
+    reads = []
+    with monkeypatch.context() as patch:
+        patch.setattr("builtins.open", lambda *args, **kwargs: reads.append(args))
+        assert cache.hash_file(str(path)) == content_hash
+    assert not reads
+
+    path.write_text("outro conteúdo", encoding="utf-8")
+    assert cache.hash_file(str(path)) != content_hash
@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from app.document_processing.file_tracker import FileTracker
+
+def test_track_document_with_precomputed_hash(tmp_path, monkeypatch):
+    """Hashes calculados no upload são reaproveitados e permitem localizar conteúdo idêntico"""
+    monkeypatch.chdir(tmp_path)
+    tracker = FileTracker()
+    file_path = tracker.documents_dir / "relatorio.txt"
+    file_path.write_text("conteúdo do relatório", encoding="utf-8")
+
+    content_hash, file_id = tracker.hash_file("relatorio.txt", file_path)
+    assert tracker.track_document(
+        "relatorio.txt", file_path, file_path.stat().st_size, file_id=file_id, content_hash=content_hash
+    ) == file_id
+    assert tracker.find_by_content_hash(content_hash)["id"] == file_id
+    assert tracker.find_by_content_hash("0" * 64) is None
+
+    # Reenvio com outro conteúdo substitui o registro anterior do mesmo arquivo
+    file_path.write_text("nova versão do relatório", encoding="utf-8")
+    new_id = tracker.track_document("relatorio.txt", file_path, file_path.stat().st_size)
+    assert new_id != file_id
+    assert [doc["id"] for doc in tracker.get_all_documents()] == [new_id]
+    assert tracker.find_by_content_hash(content_hash) is None
+
+def test_migrates_metadata_json(tmp_path, monkeypatch):
+    """O metadata.json de versões anteriores é importado uma única vez para o SQLite"""
+    monkeypatch.chdir(tmp_path)
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    (documents / "metadata.json").write_text(json.dumps({
+        "abc123": {
+            "filename": "a.pdf", "file_type": "pdf", "upload_date": "2024-01-01T00:00:00",
+            "status": "processed", "size_bytes": 10, "processed": True,
+            "embedding_count": 4, "error_message": None
+        },
+        "def456": {
+            "filename": "b.docx", "file_type": "docx", "upload_date": "2024-01-02T00:00:00",
+            "status": "error", "size_bytes": 20, "processed": False,
+            "embedding_count": None, "error_message": "falha"
+        }
+    }), encoding="utf-8")
+
+    tracker = FileTracker()
+    assert not (documents / "metadata.json").exists()
+    assert (documents / "metadata.json.migrated").exists()
+    assert tracker.get_document("abc123")["processed"] is True
+    assert tracker.get_processing_status("def456") == "error"
+    assert [doc["id"] for doc in tracker.get_documents_by_status("error")] == ["def456"]
+    assert tracker.find_by_filename("a.pdf")["embedding_count"] == 4
+
+    tracker.update_document_status("def456", status="processed", processed=True, embedding_count=7)
+    tracker.close()
+    tracker = FileTracker()
+    assert len(tracker.get_all_documents()) == 2
+    assert tracker.get_document("def456")["embedding_count"] == 7
+    assert tracker.get_processing_status("inexistente") == "not_found"
+
+def test_hash_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    """Arquivos inalterados não são lidos novamente; arquivos iguais são localizados pelo hash"""
+    monkeypatch.chdir(tmp_path)
+    tracker = FileTracker()
+    original = tracker.documents_dir / "a.txt"
+    copy = tracker.documents_dir / "b.txt"
+    for path in (original, copy):
+        path.write_text("mesmo conteúdo", encoding="utf-8")
+        # mtime no passado: arquivos recém-modificados não entram no cache
+        os.utime(path, ns=(0, 10**18))
+
+    content_hash, file_id = tracker.hash_file("a.txt", original)
+    assert tracker.hash_file("b.txt", copy)[0] == content_hash
+
+    reads = []
+    with monkeypatch.context() as patch:
+        patch.setattr("builtins.open", lambda *args, **kwargs: reads.append(args))
+        assert tracker.hash_file("a.txt", original) == (content_hash, file_id)
+    assert not reads
+
+    assert sorted(tracker.find_files_by_hash(content_hash)) == [str(original.resolve()), str(copy.resolve())]
+
+    # Arquivo alterado: o hash é recalculado e a entrada antiga deixa de valer
+    copy.write_text("outro conteúdo", encoding="utf-8")
+    assert tracker.find_files_by_hash(content_hash) == [str(original.resolve())]
+    assert tracker.hash_file("b.txt", copy)[0] != content_hash
+
+def test_concurrent_migration_waits_for_the_first_process(tmp_path, monkeypatch):
+    """Um processo que inicia durante a migração de outro espera o fim dela e não falha"""
+    monkeypatch.chdir(tmp_path)
+    FileTracker().close()
+    metadata = tmp_path / "documents" / "metadata.json"
+    metadata.write_text(json.dumps({
+        "abc123": {"filename": "a.pdf", "status": "processed", "processed": True}
+    }), encoding="utf-8")
+
+    # O segundo processo encontra o metadata.json enquanto o primeiro o migra
+    checked = threading.Event()
+    exists = Path.exists
+    def exists_and_signal(path, *args, **kwargs):
+        result = exists(path, *args, **kwargs)
+        if path.name == "metadata.json":
+            checked.set()
+        return result
+    monkeypatch.setattr(Path, "exists", exists_and_signal)
+
+    other = sqlite3.connect("data/file_tracker.sqlite", isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        starting = executor.submit(FileTracker)
+        assert checked.wait(10)
+        metadata.rename(metadata.with_name("metadata.json.migrated"))
+        other.execute("COMMIT")
+        tracker = starting.result()
+    other.close()
+    assert tracker.get_all_documents() == []
+    assert (tmp_path / "documents" / "metadata.json.migrated").exists()
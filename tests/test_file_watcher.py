@@ -0,0 +1,98 @@
+import asyncio
+from watchdog.events import FileCreatedEvent, FileModifiedEvent, FileMovedEvent
+from pathlib import Path
+from app.document_processing.file_tracker import FileTracker
+from app.document_processing.file_watcher import DocumentHandler
+
+class FakePipeline:
+    """Pipeline que registra os arquivos recebidos e o tamanho de cada um"""
+    def __init__(self, delay=0.0):
+        self.submitted = []
+        self.delay = delay
+
+    async def submit(self, file_path):
+        with open(file_path, 'rb') as f:
+            self.submitted.append((file_path, len(f.read())))
+        await asyncio.sleep(self.delay)
+        future = asyncio.get_running_loop().create_future()
+        future.set_result({"success": True, "chunks": 3, "duplicates": 1})
+        return future
+
+def test_handler_coalesces_events_per_file(tmp_path):
+    """Rajadas de eventos do mesmo arquivo geram um único processamento, com o arquivo completo"""
+    async def scenario():
+        pipeline = FakePipeline()
+        handler = DocumentHandler(
+            pipeline, asyncio.get_running_loop(), {'.txt', '.pdf'}, debounce=0.05, size_check_interval=0.05
+        )
+        growing = tmp_path / "a.txt"
+        growing.write_text("", encoding="utf-8")
+        handler.on_created(FileCreatedEvent(str(growing)))
+        for _ in range(5):
+            with open(growing, "a", encoding="utf-8") as f:
+                f.write("x" * 100)
+            await asyncio.to_thread(handler.on_modified, FileModifiedEvent(str(growing)))
+            await asyncio.sleep(0.01)
+
+        moved = tmp_path / "b.pdf"
+        moved.write_bytes(b"conteudo")
+        handler.on_moved(FileMovedEvent(str(tmp_path / "b.pdf.part"), str(moved)))
+        handler.on_created(FileCreatedEvent(str(tmp_path / "ignorado.json")))
+
+        await asyncio.sleep(0.5)
+        await handler.drain()
+        return pipeline.submitted
+
+    submitted = asyncio.run(scenario())
+    assert sorted(submitted) == [(str(tmp_path / "a.txt"), 500), (str(tmp_path / "b.pdf"), 8)]
+
+def test_handler_reprocesses_file_changed_during_processing(tmp_path):
+    """Um arquivo modificado enquanto está no pipeline é reprocessado uma única vez"""
+    async def scenario():
+        pipeline = FakePipeline(delay=0.2)
+        handler = DocumentHandler(
+            pipeline, asyncio.get_running_loop(), {'.txt'}, debounce=0.02, size_check_interval=0.02
+        )
+        path = tmp_path / "doc.txt"
+        path.write_text("versão 1", encoding="utf-8")
+        handler.on_created(FileCreatedEvent(str(path)))
+        await asyncio.sleep(0.15)
+
+        path.write_text("versão 2, maior", encoding="utf-8")
+        handler.on_modified(FileModifiedEvent(str(path)))
+        handler.on_modified(FileModifiedEvent(str(path)))
+        await asyncio.sleep(0.8)
+        await handler.drain()
+        return pipeline.submitted
+
+    sizes = [size for _, size in asyncio.run(scenario())]
+    assert sizes == [len("versão 1".encode()), len("versão 2, maior".encode())]
+
+def test_handler_skips_files_already_tracked(tmp_path, monkeypatch):
+    """Arquivos registrados com o mesmo conteúdo (uploads) são ignorados; os ingeridos são registrados"""
+    monkeypatch.chdir(tmp_path)
+    tracker = FileTracker(str(tmp_path / "tracker.sqlite"))
+    uploaded = tmp_path / "upload.txt"
+    uploaded.write_text("enviado pela API", encoding="utf-8")
+    content_hash, file_id = tracker.hash_file(uploaded.name, uploaded)
+    tracker.track_document(uploaded.name, uploaded, uploaded.stat().st_size, file_id=file_id, content_hash=content_hash)
+
+    async def scenario():
+        pipeline = FakePipeline()
+        handler = DocumentHandler(
+            pipeline, asyncio.get_running_loop(), {'.txt'}, debounce=0.02, size_check_interval=0.02,
+            file_tracker=tracker
+        )
+        copied = tmp_path / "copiado.txt"
+        copied.write_text("copiado para o diretório", encoding="utf-8")
+        handler.on_created(FileCreatedEvent(str(uploaded)))
+        handler.on_created(FileCreatedEvent(str(copied)))
+        await asyncio.sleep(0.3)
+        await handler.drain()
+        return pipeline.submitted
+
+    submitted = asyncio.run(scenario())
+    assert [Path(path).name for path, _ in submitted] == ["copiado.txt"]
+    document = tracker.find_by_filename("copiado.txt")
+    assert document["embedding_count"] == 2
+    assert tracker.find_by_filename("upload.txt")["status"] == "uploaded"
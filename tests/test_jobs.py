@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from app.document_processing.jobs import IngestionJob, JobQueue, JobWorker
+from app.document_processing.pipeline import PRIORITY_INTERACTIVE
+from benchmark_chunking import generate_text
+from tests.test_pipeline import FakeEmbeddingGenerator, FakePineconeManager, make_pipeline
+
+def make_queue(tmp_path, **kwargs):
+    """Fila de jobs em SQLite (o SKIP LOCKED é ignorado pelo dialeto, com um único worker)"""
+    return JobQueue(create_engine(f"sqlite:///{tmp_path / 'jobs.sqlite'}"), **kwargs)
+
+def test_worker_processes_and_retries_jobs(tmp_path):
+    """Jobs concluídos registram o resultado; jobs com falha são tentados até max_attempts"""
+    document = tmp_path / "doc.txt"
+    document.write_text(generate_text(3000, seed=1), encoding="utf-8")
+    queue = make_queue(tmp_path, max_attempts=2, retry_delay=0)
+    missing_id = queue.enqueue(str(tmp_path / "inexistente.txt"))
+    document_id = queue.enqueue(str(document), priority=PRIORITY_INTERACTIVE)
+
+    pinecone = FakePineconeManager()
+    pipeline = make_pipeline(tmp_path, FakeEmbeddingGenerator(), pinecone)
+    worker = JobWorker(queue, pipeline, concurrency=1, poll_interval=0.01, heartbeat_interval=0.01)
+    asyncio.run(worker.run(drain=True))
+
+    job = queue.get(document_id)
+    assert job["status"] == "done" and job["attempts"] == 1
+    assert job["result"]["chunks"] == len(pinecone.vectors) > 0
+    assert job["started_at"] <= job["finished_at"]
+
+    job = queue.get(missing_id)
+    assert job["status"] == "failed" and job["attempts"] == 2 and job["error"]
+    assert queue.get(12345) is None
+
+def test_stale_jobs_are_requeued(tmp_path):
+    """Jobs sem heartbeat voltam à fila e o worker original perde a posse do job"""
+    queue = make_queue(tmp_path, max_attempts=2, stale_seconds=60)
+    job_id = queue.enqueue("documents/a.txt")
+    assert queue.claim("worker-1")["id"] == job_id
+    assert queue.claim("worker-2") is None
+    assert queue.heartbeat("worker-1", {job_id: {"stage": "chunk", "chunks": 3}}) == 1
+    assert queue.get(job_id)["progress"] == {"stage": "chunk", "chunks": 3}
+    assert queue.requeue_stale() == 0
+
+    with queue.Session.begin() as session:
+        session.get(IngestionJob, job_id).heartbeat_at = datetime.utcnow() - timedelta(seconds=120)
+    assert queue.requeue_stale() == 1
+    assert queue.claim("worker-2")["attempts"] == 2
+    assert queue.heartbeat("worker-1", {job_id: None}) == 0
+    assert not queue.complete(job_id, "worker-1", {})
+    assert queue.complete(job_id, "worker-2", {"chunks": 1})
+    assert queue.get(job_id)["status"] == "done"
+
+def test_one_job_per_file_in_queue_and_running(tmp_path):
+    """Um arquivo tem um único job na fila, e jobs do mesmo arquivo não rodam ao mesmo tempo"""
+    queue = make_queue(tmp_path)
+    first_id = queue.enqueue("documents/a.txt")
+    assert queue.enqueue("documents/a.txt", document_id="doc-a", priority=PRIORITY_INTERACTIVE) == first_id
+    job = queue.get(first_id)
+    assert job["priority"] == PRIORITY_INTERACTIVE and job["document_id"] == "doc-a"
+
+    assert queue.claim("worker-1")["id"] == first_id
+    second_id = queue.enqueue("documents/a.txt")
+    other_id = queue.enqueue("documents/b.txt")
+    assert second_id != first_id
+    assert queue.claim("worker-2")["id"] == other_id
+    assert queue.claim("worker-2") is None
+
+    # Mesmo sem o filtro do claim, o índice único impede dois jobs em execução do mesmo arquivo
+    with queue.Session() as session:
+        session.get(IngestionJob, second_id).status = "running"
+        try:
+            session.commit()
+            raised = False
+        except IntegrityError:
+            raised = True
+    assert raised
+
+    assert queue.complete(first_id, "worker-1", {})
+    assert queue.claim("worker-2")["id"] == second_id
+
+def test_workers_require_shared_state_directories(tmp_path):
+    """Um worker com diretórios de estado diferentes dos registrados não inicia"""
+    queue = make_queue(tmp_path)
+    shared = {"chunk_manifests": str(tmp_path / "data" / "chunk_manifests")}
+    queue.check_shared_state(shared)
+    queue.check_shared_state(shared)
+
+    try:
+        queue.check_shared_state({"chunk_manifests": str(tmp_path / "local" / "chunk_manifests")})
+        raised = False
+    except ValueError:
+        raised = True
+    assert raised
@@ -0,0 +1,365 @@
+import asyncio
+import threading
+import time
+from app.document_processing.chunking import TextChunker
+from app.document_processing.chunk_manifest import ChunkManifest
+from app.document_processing.checkpoints import CheckpointStore
+from app.document_processing.dedup import NearDuplicateIndex
+from app.document_processing.extractors import DocumentProcessor
+from app.document_processing.pipeline import IngestionPipeline, PRIORITY_INTERACTIVE
+from benchmark_chunking import generate_text
+from tests.test_chunking import CharEncoding
+from tests.test_extractors import make_pdf
+
+class FakeEmbeddingGenerator:
+    """Gerador de embeddings que registra os textos recebidos"""
+    def __init__(self, delay=0.0):
+        self.texts = []
+        self.delay = delay
+        self.started = threading.Event()
+
+    def generate_embeddings(self, texts, token_counts=None):
+        self.started.set()
+        time.sleep(self.delay)
+        self.texts.extend(texts)
+        return [[float(len(text))] for text in texts]
+
+class FakePineconeManager:
+    """Índice vetorial em memória"""
+    def __init__(self):
+        self.vectors = {}
+        self.metadatas = {}
+        self.updated = []
+        self.filters = []
+
+    def upsert_embeddings(self, ids, embeddings, texts, metadatas):
+        for chunk_id, embedding, text, metadata in zip(ids, embeddings, texts, metadatas):
+            self.vectors[chunk_id] = (embedding, text)
+            self.metadatas[chunk_id] = dict(metadata)
+        return True
+
+    def delete_documents(self, ids):
+        for chunk_id in ids:
+            self.vectors.pop(chunk_id, None)
+            self.metadatas.pop(chunk_id, None)
+        return True
+
+    def delete_by_metadata(self, filter):
+        def matches(metadata, key, value):
+            if isinstance(value, dict):
+                return (key in metadata) == value["$exists"]
+            return metadata.get(key) == value
+
+        self.filters.append(filter)
+        ids = [
+            chunk_id for chunk_id, metadata in self.metadatas.items()
+            if all(matches(metadata, key, value) for key, value in filter.items())
+        ]
+        self.delete_documents(ids)
+        return ids
+
+    def update_metadata(self, id, metadata):
+        self.updated.append(id)
+        self.metadatas[id].update(metadata)
+        return True
+
+class FakeFileTracker:
+    """Registro de documentos com os nomes de arquivo informados"""
+    def __init__(self, filenames=()):
+        self.filenames = set(filenames)
+
+    def find_by_filename(self, filename):
+        return {"filename": filename} if filename in self.filenames else None
+
+def make_pipeline(tmp_path, embedding_generator, pinecone_manager, **kwargs):
+    """Cria um pipeline com filas pequenas, para exercitar o backpressure"""
+    return IngestionPipeline(
+        document_processor=DocumentProcessor(cache_dir=str(tmp_path / "cache")),
+        chunker=TextChunker(chunk_size=300, chunk_overlap=0, encoding=CharEncoding()),
+        embedding_generator=embedding_generator,
+        pinecone_manager=pinecone_manager,
+        manifest=ChunkManifest(str(tmp_path / "manifests")),
+        checkpoints=CheckpointStore(str(tmp_path / "checkpoints.sqlite")),
+        queue_size=1,
+        batch_size=4,
+        **kwargs
+    )
+
+def test_pipeline_stores_and_reuses_chunks(tmp_path):
+    """Todos os documentos passam pelas etapas; a reingestão só envia chunks alterados"""
+    files = []
+    for i in range(3):
+        path = tmp_path / f"doc{i}.txt"
+        path.write_text(generate_text(4000, seed=i), encoding="utf-8")
+        files.append(str(path))
+
+    embeddings = FakeEmbeddingGenerator()
+    pinecone = FakePineconeManager()
+    pipeline = make_pipeline(tmp_path, embeddings, pinecone)
+    results = asyncio.run(pipeline.run(files))
+
+    assert [result["file_path"] for result in results] == files
+    assert all(result["success"] for result in results)
+    total = sum(result["chunks"] for result in results)
+    assert len(pinecone.vectors) == len(embeddings.texts) == total
+    assert pipeline.stats["upsert"].items == total
+    assert pipeline.stats["embed"].max_queue_depth <= 1
+
+    # Reingestão com um documento alterado
+    with open(files[0], "a", encoding="utf-8") as f:
+        f.write("\n\nParágrafo novo no fim do documento.")
+    embeddings.texts = []
+    results = asyncio.run(make_pipeline(tmp_path, embeddings, pinecone).run(files))
+    assert all(result["success"] for result in results)
+    assert results[1]["reused"] == results[1]["chunks"]
+    assert 0 < len(embeddings.texts) < results[0]["chunks"]
+    assert len(pinecone.vectors) == sum(result["chunks"] for result in results)
+
+def test_duplicates_are_reingested_when_canonical_chunks_leave(tmp_path):
+    """Um documento cujos chunks eram duplicatas de chunks removidos volta a ser ingerido"""
+    text = generate_text(2000, seed=5)
+    original = tmp_path / "original.txt"
+    copy = tmp_path / "copia.txt"
+    original.write_text(text, encoding="utf-8")
+    copy.write_text(text, encoding="utf-8")
+
+    embeddings = FakeEmbeddingGenerator()
+    pinecone = FakePineconeManager()
+    dedup = NearDuplicateIndex(str(tmp_path / "dedup.sqlite"), threshold=0.95)
+    results = asyncio.run(make_pipeline(tmp_path, embeddings, pinecone, dedup_index=dedup).run([str(original)]))
+    results += asyncio.run(make_pipeline(tmp_path, embeddings, pinecone, dedup_index=dedup).run([str(copy)]))
+    assert results[1]["duplicates"] == results[1]["chunks"] and not results[1]["embedded"]
+    copy_chunks = results[1]["chunks"]
+
+    # O original muda por completo: seus chunks saem do índice e a cópia é reingerida
+    original.write_text(generate_text(2000, seed=6), encoding="utf-8")
+    embeddings.texts = []
+    results = asyncio.run(make_pipeline(tmp_path, embeddings, pinecone, dedup_index=dedup).run([str(original)]))
+    assert results[0]["reingest"] == [str(copy)]
+    copy_ids = ChunkManifest(str(tmp_path / "manifests")).get_chunk_ids("copia")
+    assert len(copy_ids) == copy_chunks and set(copy_ids) <= set(pinecone.vectors)
+    dedup.close()
+
+def test_jobs_of_the_same_document_run_in_sequence(tmp_path):
+    """Um segundo envio do mesmo documento espera o primeiro e reaproveita os chunks dele"""
+    path = tmp_path / "doc.txt"
+    path.write_text(generate_text(3000, seed=4), encoding="utf-8")
+    embeddings = FakeEmbeddingGenerator(delay=0.01)
+
+    async def scenario():
+        pipeline = make_pipeline(tmp_path, embeddings, FakePineconeManager())
+        futures = [await pipeline.submit(str(path)), await pipeline.submit(str(path))]
+        await pipeline.close()
+        return [future.result() for future in futures]
+
+    first, second = asyncio.run(scenario())
+    assert first["success"] and second["success"]
+    assert first["embedded"] == first["chunks"] > 0
+    assert second["embedded"] == 0 and second["reused"] == second["chunks"]
+    assert len(embeddings.texts) == first["chunks"]
+
+def test_pipeline_reports_failures_per_document(tmp_path):
+    """A falha de um documento não interrompe os demais"""
+    good = tmp_path / "bom.txt"
+    good.write_text(generate_text(2000, seed=1), encoding="utf-8")
+    broken = tmp_path / "quebrado.pdf"
+    broken.write_bytes(b"isto nao e um pdf")
+
+    pipeline = make_pipeline(tmp_path, FakeEmbeddingGenerator(), FakePineconeManager())
+    results = asyncio.run(pipeline.run([str(broken), str(good)]))
+    assert not results[0]["success"] and results[0]["error"]
+    assert results[1]["success"]
+
+class FailingPineconeManager(FakePineconeManager):
+    """Índice vetorial que falha a partir de um número de upserts, simulando uma interrupção"""
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def upsert_embeddings(self, ids, embeddings, texts, metadatas):
+        if self.fail_after == 0:
+            raise ConnectionError("conexão perdida")
+        self.fail_after -= 1
+        return super().upsert_embeddings(ids, embeddings, texts, metadatas)
+
+def test_pipeline_resumes_from_checkpoints(tmp_path):
+    """Uma ingestão interrompida é retomada sem refazer os embeddings dos lotes concluídos"""
+    path = tmp_path / "longo.txt"
+    path.write_text(generate_text(8000, seed=4), encoding="utf-8")
+
+    pinecone = FailingPineconeManager(fail_after=2)
+    results = asyncio.run(
+        make_pipeline(tmp_path, FakeEmbeddingGenerator(), pinecone, embed_workers=1, upsert_workers=1)
+        .run([str(path)])
+    )
+    assert not results[0]["success"]
+    stored = set(pinecone.vectors)
+    assert len(stored) == 8
+
+    pinecone.fail_after = -1
+    embeddings = FakeEmbeddingGenerator()
+    results = asyncio.run(make_pipeline(tmp_path, embeddings, pinecone).run([str(path)]))
+    assert results[0]["success"]
+    assert results[0]["reused"] == 8
+    assert len(embeddings.texts) == results[0]["chunks"] - 8
+    # Os chunks retomados continuam na mesma posição: nenhum metadata é atualizado
+    assert pinecone.updated == []
+    assert len(pinecone.vectors) == results[0]["chunks"]
+
+    # Com o documento concluído, os checkpoints são descartados
+    checkpoints = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    assert not checkpoints.get_chunk_ids("longo", "")
+
+def test_interactive_document_overtakes_backfill(tmp_path):
+    """Um upload interativo termina antes dos documentos grandes já em ingestão"""
+    backfill = []
+    for i in range(3):
+        path = tmp_path / f"grande{i}.txt"
+        path.write_text(generate_text(12000, seed=i), encoding="utf-8")
+        backfill.append(str(path))
+    urgent = tmp_path / "urgente.txt"
+    urgent.write_text(generate_text(600, seed=9), encoding="utf-8")
+    finished = []
+
+    async def scenario():
+        embedding_generator = FakeEmbeddingGenerator(delay=0.01)
+        pipeline = make_pipeline(
+            tmp_path,
+            embedding_generator,
+            FakePineconeManager(),
+            chunk_workers=1,
+            embed_workers=1,
+            upsert_workers=1,
+            slice_chunks=4,
+            on_document_done=lambda result: finished.append(result["doc_id"])
+        )
+        await pipeline.start()
+        futures = [await pipeline.submit(path) for path in backfill]
+        # O upload chega quando a ingestão em massa já gera embeddings
+        assert await asyncio.to_thread(embedding_generator.started.wait, 10)
+        futures.append(await pipeline.submit(str(urgent), priority=PRIORITY_INTERACTIVE))
+        await pipeline.close()
+        return [future.result() for future in futures]
+
+    results = asyncio.run(scenario())
+    assert all(result["success"] for result in results)
+    assert results[0]["chunks"] > 12
+    assert finished[0] == "urgente"
+
+def test_pipeline_without_vector_store_delivers_chunks(tmp_path):
+    """Sem embeddings e índice vetorial, os chunks são entregues a on_chunks_ready"""
+    path = tmp_path / "doc.txt"
+    path.write_text(generate_text(3000, seed=3), encoding="utf-8")
+    delivered = {}
+
+    pipeline = IngestionPipeline(
+        document_processor=DocumentProcessor(cache_dir=""),
+        chunker=TextChunker(chunk_size=500, chunk_overlap=0, encoding=CharEncoding()),
+        on_chunks_ready=lambda file_path, chunks: delivered.setdefault(file_path, chunks)
+    )
+    results = asyncio.run(pipeline.run([str(path)]))
+    assert results[0]["success"]
+    assert len(delivered[str(path)]) == results[0]["chunks"] > 1
+    assert set(pipeline.report()) == {"extract", "chunk"}
+
+def test_dry_run_estimates_without_side_effects(tmp_path, monkeypatch):
+    """O dry-run conta chunks, tokens e requisições sem gerar embeddings nem gravar o manifesto"""
+    from app.core.config import settings
+    from app.document_processing.estimate import estimate_ingestion
+
+    path = tmp_path / "doc.txt"
+    path.write_text(generate_text(5000, seed=5), encoding="utf-8")
+    embeddings = FakeEmbeddingGenerator()
+    delivered = {}
+    pipeline = make_pipeline(
+        tmp_path, embeddings, FakePineconeManager(), dry_run=True,
+        on_chunks_ready=lambda file_path, chunks: delivered.setdefault(file_path, chunks)
+    )
+    result = asyncio.run(pipeline.run([str(path)]))[0]
+
+    assert result["success"] and result["new_chunks"] == result["chunks"]
+    # Com o encoder de teste, cada caractere é um token
+    chunks = delivered[str(path)]
+    assert result["tokens"] == sum(len(chunk) for chunk in chunks)
+    assert result["text_bytes"] == sum(len(chunk.encode("utf-8")) for chunk in chunks)
+    assert result["upsert_requests"] == result["embedding_requests"] == -(-result["chunks"] // 4)
+    assert not embeddings.texts
+    assert not pipeline.manifest.get_chunk_ids("doc")
+
+    monkeypatch.setattr(settings, "EMBEDDING_REQUESTS_PER_MINUTE", 60)
+    monkeypatch.setattr(settings, "EMBEDDING_TOKENS_PER_MINUTE", 10**9)
+    estimate = estimate_ingestion([result], elapsed_seconds=0.5)
+    assert estimate["vector_bytes"] == result["chunks"] * settings.EMBEDDING_DIMENSIONS * 4
+    assert estimate["seconds"]["projected"] == estimate["seconds"]["embedding"] == result["embedding_requests"]
+
+def test_first_ingestion_removes_legacy_vectors_and_positions_stay_current(tmp_path):
+    """Vetores de IDs aleatórios do documento saem do índice; chunks reaproveitados têm o chunk_index atual"""
+    path = tmp_path / "doc.txt"
+    text = generate_text(3000, seed=8)
+    path.write_text(text, encoding="utf-8")
+    pinecone = FakePineconeManager()
+    pinecone.upsert_embeddings(
+        ["legado-1", "legado-2", "outro-1"], [[0.0]] * 3, ["a", "b", "c"],
+        [{"doc_id": "doc"}, {"doc_id": "doc"}, {"doc_id": "outro"}]
+    )
+
+    file_tracker = FakeFileTracker(["doc.txt"])
+
+    results = asyncio.run(
+        make_pipeline(tmp_path, FakeEmbeddingGenerator(), pinecone, file_tracker=file_tracker).run([str(path)])
+    )
+    assert results[0]["success"]
+    assert "legado-1" not in pinecone.vectors and "legado-2" not in pinecone.vectors
+    assert "outro-1" in pinecone.vectors
+    assert len(pinecone.vectors) == results[0]["chunks"] + 1
+
+    # Um parágrafo no início desloca os chunks seguintes, que são reaproveitados
+    path.write_text("Parágrafo novo no início do documento.\n\n" + text, encoding="utf-8")
+    results = asyncio.run(
+        make_pipeline(tmp_path, FakeEmbeddingGenerator(), pinecone, file_tracker=file_tracker).run([str(path)])
+    )
+    assert results[0]["success"] and results[0]["reused"] > 0
+    manifest = ChunkManifest(str(tmp_path / "manifests")).load("doc")
+    for chunk_id, chunk_index in zip(manifest["chunk_ids"], manifest["chunk_indexes"]):
+        assert pinecone.metadatas[chunk_id]["chunk_index"] == chunk_index
+    assert "outro-1" in pinecone.vectors
+    assert len(pinecone.filters) == 1
+
+def test_legacy_cleanup_keeps_checkpointed_vectors_and_skips_unknown_documents(tmp_path):
+    """Vetores do pipeline ficam fora da limpeza; documentos sem registro não consultam o índice"""
+    path = tmp_path / "doc.txt"
+    path.write_text(generate_text(3000, seed=9), encoding="utf-8")
+    pinecone = FakePineconeManager()
+
+    # Sem registro no FileTracker, o documento não é procurado no índice
+    pipeline = make_pipeline(tmp_path, FakeEmbeddingGenerator(), pinecone, file_tracker=FakeFileTracker())
+    results = asyncio.run(pipeline.run([str(path)]))
+    assert results[0]["success"] and pinecone.filters == []
+    stored = set(pinecone.vectors)
+
+    # Sem o manifesto, como em uma ingestão interrompida, os vetores do pipeline são mantidos
+    ChunkManifest(str(tmp_path / "manifests")).delete("doc")
+    pinecone.upsert_embeddings(["legado-1"], [[0.0]], ["a"], [{"doc_id": "doc"}])
+    pipeline = make_pipeline(tmp_path, FakeEmbeddingGenerator(), pinecone, file_tracker=FakeFileTracker(["doc.txt"]))
+    results = asyncio.run(pipeline.run([str(path)]))
+    assert results[0]["success"] and len(pinecone.filters) == 1
+    assert "legado-1" not in pinecone.vectors
+    assert stored <= set(pinecone.vectors)
+
+def test_single_extract_worker_spreads_pdf_pages_over_the_pipeline_pool(tmp_path):
+    """Com um worker de extração, as páginas do PDF vão para o pool do pipeline, sem outro pool"""
+    pages = [f"Pagina {i} " + generate_text(200, seed=i) for i in range(1, 41)]
+    file_path = make_pdf(tmp_path / "manual.pdf", pages)
+
+    async def scenario():
+        pipeline = make_pipeline(tmp_path, FakeEmbeddingGenerator(), FakePineconeManager(), extract_workers=1)
+        await pipeline.start()
+        extractor = pipeline._page_processor._get_extractor(file_path)
+        assert extractor.executor is pipeline._pool
+        future = await pipeline.submit(file_path)
+        await pipeline.close()
+        return extractor, future.result()
+
+    extractor, result = asyncio.run(scenario())
+    assert result["success"] and result["chunks"] > 0
+    assert extractor._pool is None
@@ -0,0 +1,85 @@
+import os
+from app.document_processing.chunk_manifest import ChunkManifest
+from app.document_processing.file_tracker import FileTracker
+from app.document_processing.reconcile import CorpusReconciler
+
+class FakePineconeManager:
+    """Registra os IDs excluídos"""
+    def __init__(self):
+        self.deleted = []
+
+    def delete_documents(self, ids):
+        self.deleted.extend(ids)
+        return True
+
+def ingest(reconciler, plan):
+    """Simula a ingestão bem-sucedida dos arquivos do plano"""
+    results = []
+    for record in plan["ingest"]:
+        doc_id = os.path.splitext(record["filename"])[0]
+        reconciler.manifest.save(doc_id, record["file_path"], [f"{doc_id}-0", f"{doc_id}-1"])
+        results.append({"file_path": record["file_path"], "success": True, "chunks": 2, "duplicates": 0})
+    reconciler.record(plan, results)
+
+def test_reconcile_ingests_only_changes(tmp_path, monkeypatch):
+    """Arquivos inalterados não são lidos; alterados e novos são ingeridos; removidos saem do índice"""
+    monkeypatch.chdir(tmp_path)
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (documents / name).write_text(f"conteúdo de {name}", encoding="utf-8")
+
+    pinecone = FakePineconeManager()
+    reconciler = CorpusReconciler(FileTracker(), ChunkManifest(str(tmp_path / "manifests")), pinecone)
+    plan = reconciler.plan("documents", [".txt"])
+    assert len(plan["ingest"]) == 3
+    ingest(reconciler, plan)
+
+    # Nada mudou: nenhum arquivo precisa de hash nem de ingestão
+    plan = reconciler.plan("documents", [".txt"])
+    assert plan["unchanged"] == 3 and not plan["ingest"] and not plan["removed"]
+
+    # mtime alterado sem mudança de conteúdo, conteúdo alterado, arquivo novo e arquivo removido
+    stat = (documents / "a.txt").stat()
+    os.utime(documents / "a.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (documents / "b.txt").write_text("conteúdo novo de b.txt, maior", encoding="utf-8")
+    (documents / "d.txt").write_text("arquivo novo", encoding="utf-8")
+    (documents / "c.txt").unlink()
+
+    plan = reconciler.plan("documents", [".txt"])
+    assert [record["filename"] for record in plan["touched"]] == ["a.txt"]
+    assert [record["filename"] for record in plan["ingest"]] == ["b.txt", "d.txt"]
+    assert [document["filename"] for document in plan["removed"]] == ["c.txt"]
+
+    assert reconciler.remove_missing(plan["removed"]) == 2
+    assert pinecone.deleted == ["c-0", "c-1"]
+    ingest(reconciler, plan)
+
+    plan = reconciler.plan("documents", [".txt"])
+    assert plan["unchanged"] == 3 and not plan["ingest"] and not plan["removed"]
+    assert sorted(doc["filename"] for doc in reconciler.file_tracker.get_all_documents()) == [
+        "a.txt", "b.txt", "d.txt"
+    ]
+
+def test_reconcile_ingests_documents_not_processed(tmp_path, monkeypatch):
+    """Documentos com erro ou apenas enviados (na fila de jobs) são ingeridos, e não marcados como processados"""
+    monkeypatch.chdir(tmp_path)
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    tracker = FileTracker()
+    for name in ("a.txt", "b.txt"):
+        path = documents / name
+        path.write_text(f"conteúdo de {name}", encoding="utf-8")
+        tracker.track_document(name, path, path.stat().st_size)
+    tracker.update_document_status(tracker.find_by_filename("a.txt")["id"], status="error", error_message="falha")
+
+    reconciler = CorpusReconciler(tracker, ChunkManifest(str(tmp_path / "manifests")), FakePineconeManager())
+    plan = reconciler.plan("documents", [".txt"])
+    assert [record["filename"] for record in plan["ingest"]] == ["a.txt", "b.txt"]
+    assert not plan["touched"] and not plan["unchanged"]
+
+    # Sem ingestão bem-sucedida, nenhum dos dois passa a constar como processado
+    reconciler.record(plan, [])
+    assert tracker.find_by_filename("a.txt")["status"] == "error"
+    assert tracker.find_by_filename("b.txt")["status"] == "uploaded"
+    assert not tracker.find_by_filename("b.txt")["processed"]
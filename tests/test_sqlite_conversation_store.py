@@ -0,0 +1,65 @@
+from app.chat.conversation_store import Conversation, ConversationStore
+from app.chat.sqlite_conversation_store import SQLiteConversationStore
+
+def test_sqlite_store_keeps_conversations_and_messages(tmp_path):
+    """O backend SQLite tem o mesmo comportamento do armazenamento em arquivos"""
+    store = SQLiteConversationStore(str(tmp_path / "conversas.sqlite"))
+    first = store.create_conversation(metadata={"title": "Primeira"})
+    second = store.create_conversation(user_id="outro")
+    assert store.add_message_to_conversation(first.conversation_id, "user", "pergunta")
+    assert store.add_message_to_conversation("inexistente", "user", "x") is None
+    assert store.add_message_to_conversation(second.conversation_id, "user", "x") is None
+
+    conversation = store.get_conversation(first.conversation_id)
+    conversation.add_message("assistant", "resposta")
+    conversation.metadata["title"] = "Renomeada"
+    assert store.save_conversation(conversation)
+
+    loaded = SQLiteConversationStore(str(tmp_path / "conversas.sqlite")).get_conversation(first.conversation_id)
+    assert [message["content"] for message in loaded.messages] == ["pergunta", "resposta"]
+    assert loaded.metadata == {"title": "Renomeada"}
+    assert loaded.updated_at == conversation.updated_at
+
+    listed = store.list_conversations()
+    assert [item["conversation_id"] for item in listed] == [first.conversation_id]
+    assert listed[0]["message_count"] == 2
+    assert listed[0]["last_message"]["content"] == "resposta"
+    assert store.count_conversations("outro") == 1
+
+    # Mensagens gravadas por outra requisição depois da leitura são preservadas
+    stale = store.get_conversation(first.conversation_id)
+    assert store.add_message_to_conversation(first.conversation_id, "user", "mensagem concorrente")
+    stale.add_message("user", "outra pergunta")
+    assert store.save_conversation(stale)
+    contents = [message["content"] for message in store.get_conversation(first.conversation_id).messages]
+    assert contents == ["pergunta", "resposta", "mensagem concorrente", "outra pergunta"]
+    assert store.list_conversations()[0]["message_count"] == 4
+    assert not store.save_conversation(Conversation(first.conversation_id, user_id="outro"))
+
+    conversation.messages = conversation.messages[:1]
+    assert store.save_conversation(conversation)
+    assert len(store.get_conversation(first.conversation_id).messages) == 4
+    assert store.rewrite_conversation(conversation)
+    assert len(store.get_conversation(first.conversation_id).messages) == 1
+    assert store.delete_conversation(first.conversation_id)
+    assert not store.delete_conversation(first.conversation_id)
+    assert store.get_conversation(first.conversation_id) is None
+
+def test_search_messages_ranks_matches(tmp_path):
+    """A busca encontra mensagens com todos os termos, ordenadas pela relevância, nos dois backends"""
+    for store in (SQLiteConversationStore(str(tmp_path / "conversas.sqlite")), ConversationStore(str(tmp_path / "jsonl"))):
+        relevant = store.create_conversation(metadata={"title": "Relatórios"}).conversation_id
+        other = store.create_conversation().conversation_id
+        store.add_message_to_conversation(relevant, "user", "Como exportar o relatório? O relatório mensal não abre")
+        store.add_message_to_conversation(other, "assistant", "O relatório fica no menu Arquivos")
+        store.add_message_to_conversation(other, "user", "Obrigado")
+        store.create_conversation(user_id="outro")
+
+        results = store.search_messages("relatório")
+        assert [result["conversation_id"] for result in results] == [relevant, other]
+        assert results[0]["title"] == "Relatórios"
+        assert results[0]["score"] > results[1]["score"]
+        assert store.search_messages("relatório menu")[0]["conversation_id"] == other
+        assert store.search_messages("relatório", user_id="outro") == []
+        assert "relatório" in results[1]["snippet"]
+        assert store.search_messages("' * \"") == []